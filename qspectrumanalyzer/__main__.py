@@ -2,20 +2,18 @@
 
 import sys, os, signal, time, argparse
 
+# Measure startup time from the beginning (before all heavy imports)
+from qspectrumanalyzer.profiler import StartupTimer
+startup_timer = StartupTimer()
+
 from Qt import QtCore, QtGui, QtWidgets
 
-from qspectrumanalyzer import backends
+from qspectrumanalyzer import backends, profiler
 from qspectrumanalyzer.version import __version__
 from qspectrumanalyzer.data import DataStorage
 from qspectrumanalyzer.plot import SpectrumPlotWidget, WaterfallPlotWidget
 from qspectrumanalyzer.utils import str_to_color, human_time
 
-from qspectrumanalyzer.settings import QSpectrumAnalyzerSettings
-from qspectrumanalyzer.smoothing import QSpectrumAnalyzerSmoothing
-from qspectrumanalyzer.persistence import QSpectrumAnalyzerPersistence
-from qspectrumanalyzer.colors import QSpectrumAnalyzerColors
-from qspectrumanalyzer.baseline import QSpectrumAnalyzerBaseline
-
 from qspectrumanalyzer.ui_qspectrumanalyzer import Ui_QSpectrumAnalyzerMainWindow
 
 debug = False
@@ -31,6 +29,7 @@ class QSpectrumAnalyzerMainWindow(QtWidgets.QMainWindow, Ui_QSpectrumAnalyzerMai
         # Initialize UI
         super().__init__(parent)
         self.setupUi(self)
+        startup_timer.mark("main window UI")
 
         # Set window icon
         icon_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "qspectrumanalyzer.svg")
@@ -48,6 +47,7 @@ class QSpectrumAnalyzerMainWindow(QtWidgets.QMainWindow, Ui_QSpectrumAnalyzerMai
 
         # Link main spectrum plot to waterfall plot
         self.spectrumPlotWidget.plot.setXLink(self.waterfallPlotWidget.plot)
+        startup_timer.mark("plot widgets")
 
         # Setup power thread and connect signals
         self.update_status_timer = QtCore.QTimer()
@@ -56,12 +56,23 @@ class QSpectrumAnalyzerMainWindow(QtWidgets.QMainWindow, Ui_QSpectrumAnalyzerMai
         self.prev_data_timestamp = None
         self.start_timestamp = None
         self.data_storage = None
+        self.rollup = None
         self.power_thread = None
         self.backend = None
         self.setup_power_thread()
+        startup_timer.mark("backend")
+
+        # Start metrics server (disabled by default)
+        self.metrics_server = None
+        settings = QtCore.QSettings()
+        if settings.value("metrics_port", 0, int):
+            from qspectrumanalyzer.metrics import MetricsServer
+            self.metrics_server = MetricsServer(self, settings.value("metrics_port", 0, int))
+            self.metrics_server.start()
 
         self.update_buttons()
         self.load_settings()
+        startup_timer.mark("settings")
 
     def setup_power_thread(self):
         """Create power_thread and connect signals to slots"""
@@ -69,18 +80,45 @@ class QSpectrumAnalyzerMainWindow(QtWidgets.QMainWindow, Ui_QSpectrumAnalyzerMai
             self.stop()
 
         settings = QtCore.QSettings()
-        self.data_storage = DataStorage(max_history_size=settings.value("waterfall_history_size", 100, int))
-        self.data_storage.data_updated.connect(self.update_data)
-        self.data_storage.data_updated.connect(self.spectrumPlotWidget.update_plot)
-        self.data_storage.data_updated.connect(self.spectrumPlotWidget.update_persistence)
-        self.data_storage.data_recalculated.connect(self.spectrumPlotWidget.recalculate_plot)
-        self.data_storage.data_recalculated.connect(self.spectrumPlotWidget.recalculate_persistence)
-        self.data_storage.history_updated.connect(self.waterfallPlotWidget.update_plot)
-        self.data_storage.history_recalculated.connect(self.waterfallPlotWidget.recalculate_plot)
-        self.data_storage.average_updated.connect(self.spectrumPlotWidget.update_average)
-        self.data_storage.baseline_updated.connect(self.spectrumPlotWidget.update_baseline)
-        self.data_storage.peak_hold_max_updated.connect(self.spectrumPlotWidget.update_peak_hold_max)
-        self.data_storage.peak_hold_min_updated.connect(self.spectrumPlotWidget.update_peak_hold_min)
+        params = {
+            "max_history_size": settings.value("waterfall_history_size", 100, int),
+            "dtype": settings.value("precision", "float64"),
+            "history_storage": settings.value("history_storage", "full"),
+            "processing_threads": settings.value("processing_threads", 1, int),
+            "rebin_size": settings.value("rebin_size", 0, float) * 1e3,
+            "rebin_reducer": settings.value("rebin_reducer", "max"),
+            "history_decimation": settings.value("history_decimation", 1, int),
+            "history_reducer": settings.value("history_reducer", "max"),
+            "history_range": (settings.value("history_range_min", -150.0, float),
+                              settings.value("history_range_max", 50.0, float)),
+        }
+
+        # Data storage is reconfigured in place, so that history is not lost
+        if self.data_storage:
+            self.data_storage.reconfigure(**params)
+        else:
+            self.data_storage = DataStorage(**params)
+            self.data_storage.data_updated.connect(self.update_data)
+            self.data_storage.data_updated.connect(self.spectrumPlotWidget.update_plot)
+            self.data_storage.data_updated.connect(self.spectrumPlotWidget.update_persistence)
+            self.data_storage.data_recalculated.connect(self.spectrumPlotWidget.recalculate_plot)
+            self.data_storage.data_recalculated.connect(self.spectrumPlotWidget.recalculate_persistence)
+            self.data_storage.history_updated.connect(self.waterfallPlotWidget.update_plot)
+            self.data_storage.history_recalculated.connect(self.waterfallPlotWidget.recalculate_plot)
+            self.data_storage.average_updated.connect(self.spectrumPlotWidget.update_average)
+            self.data_storage.baseline_updated.connect(self.spectrumPlotWidget.update_baseline)
+            self.data_storage.peak_hold_max_updated.connect(self.spectrumPlotWidget.update_peak_hold_max)
+            self.data_storage.peak_hold_min_updated.connect(self.spectrumPlotWidget.update_peak_hold_min)
+
+        # Rollup recorder keeps its open time buckets unless rollup directory is changed
+        rollup_directory = settings.value("rollup_directory", "")
+        if self.rollup and self.rollup.directory != rollup_directory:
+            self.data_storage.remove_recorder(self.rollup)
+            self.rollup = None
+        if rollup_directory and not self.rollup:
+            from qspectrumanalyzer.rollup import Rollup
+            self.rollup = Rollup(rollup_directory)
+            self.data_storage.add_recorder(self.rollup)
 
         # Setup default values and limits in case that backend is changed
         backend = settings.value("backend", "soapy_power")
@@ -133,7 +171,11 @@ class QSpectrumAnalyzerMainWindow(QtWidgets.QMainWindow, Ui_QSpectrumAnalyzerMai
         if stop_freq < stop_freq_min or stop_freq > stop_freq_max:
             self.stopFreqSpinBox.setValue(stop_freq_max)
 
-        self.power_thread = backend_module.PowerThread(self.data_storage)
+        if settings.value("parse_process", 0, int):
+            from qspectrumanalyzer.backends import process
+            self.power_thread = process.PowerThread(self.data_storage, backend_module)
+        else:
+            self.power_thread = backend_module.PowerThread(self.data_storage)
         self.power_thread.powerThreadStarted.connect(self.on_power_thread_started)
         self.power_thread.powerThreadStopped.connect(self.on_power_thread_stopped)
 
@@ -180,6 +222,7 @@ class QSpectrumAnalyzerMainWindow(QtWidgets.QMainWindow, Ui_QSpectrumAnalyzerMai
         self.persistenceCheckBox.setChecked(settings.value("persistence", 0, int))
         self.baselineCheckBox.setChecked(settings.value("baseline", 0, int))
         self.subtractBaselineCheckBox.setChecked(settings.value("subtract_baseline", 0, int))
+        self.action_PerformanceHUD.setChecked(settings.value("performance_hud", 0, int))
 
         # Restore window state
         if settings.value("window_state"):
@@ -221,6 +264,7 @@ class QSpectrumAnalyzerMainWindow(QtWidgets.QMainWindow, Ui_QSpectrumAnalyzerMai
         settings.setValue("persistence", int(self.persistenceCheckBox.isChecked()))
         settings.setValue("baseline", int(self.baselineCheckBox.isChecked()))
         settings.setValue("subtract_baseline", int(self.subtractBaselineCheckBox.isChecked()))
+        settings.setValue("performance_hud", int(self.action_PerformanceHUD.isChecked()))
 
         # Save window state and geometry
         settings.setValue("window_geometry", self.saveGeometry())
@@ -257,6 +301,12 @@ class QSpectrumAnalyzerMainWindow(QtWidgets.QMainWindow, Ui_QSpectrumAnalyzerMai
             self.prev_sweep_time,
             (1 / self.prev_sweep_time) if self.prev_sweep_time else 0
         ))
+        latency = self.data_storage.tracer.mean("total")
+        status.append(self.tr("Latency: {} | Queue: {}").format(
+            "{:.1f} ms".format(latency * 1000) if latency is not None else "-",
+            self.data_storage.tracer.queue_depth
+        ))
+        self.spectrumPlotWidget.update_hud(self.data_storage)
 
         self.show_status(" | ".join(status), timeout=0)
         self.update_progress(timestamp - self.prev_data_timestamp)
@@ -330,7 +380,11 @@ class QSpectrumAnalyzerMainWindow(QtWidgets.QMainWindow, Ui_QSpectrumAnalyzerMai
         self.spectrumPlotWidget.clear_baseline()
         self.spectrumPlotWidget.clear_persistence()
 
-        self.data_storage.reset()
+        # History can be kept between measurements (derived traces are always started from scratch)
+        self.data_storage.reset(keep_history=bool(settings.value("keep_history", 0, int)))
+        self.data_storage.set_trace_enabled("peak_hold_max", self.spectrumPlotWidget.peak_hold_max)
+        self.data_storage.set_trace_enabled("peak_hold_min", self.spectrumPlotWidget.peak_hold_min)
+        self.data_storage.set_trace_enabled("average", self.spectrumPlotWidget.average)
         self.data_storage.set_smooth(
             bool(self.smoothCheckBox.isChecked()),
             settings.value("smooth_length", 11, int),
@@ -385,22 +439,25 @@ class QSpectrumAnalyzerMainWindow(QtWidgets.QMainWindow, Ui_QSpectrumAnalyzerMai
     @QtCore.Slot(bool)
     def on_peakHoldMaxCheckBox_toggled(self, checked):
         self.spectrumPlotWidget.peak_hold_max = checked
-        if self.spectrumPlotWidget.curve_peak_hold_max.xData is None:
-            self.spectrumPlotWidget.update_peak_hold_max(self.data_storage)
+        if not checked:
+            self.spectrumPlotWidget.clear_peak_hold_max()
+        self.data_storage.set_trace_enabled("peak_hold_max", checked)
         self.spectrumPlotWidget.curve_peak_hold_max.setVisible(checked)
 
     @QtCore.Slot(bool)
     def on_peakHoldMinCheckBox_toggled(self, checked):
         self.spectrumPlotWidget.peak_hold_min = checked
-        if self.spectrumPlotWidget.curve_peak_hold_min.xData is None:
-            self.spectrumPlotWidget.update_peak_hold_min(self.data_storage)
+        if not checked:
+            self.spectrumPlotWidget.clear_peak_hold_min()
+        self.data_storage.set_trace_enabled("peak_hold_min", checked)
         self.spectrumPlotWidget.curve_peak_hold_min.setVisible(checked)
 
     @QtCore.Slot(bool)
     def on_averageCheckBox_toggled(self, checked):
         self.spectrumPlotWidget.average = checked
-        if self.spectrumPlotWidget.curve_average.xData is None:
-            self.spectrumPlotWidget.update_average(self.data_storage)
+        if not checked:
+            self.spectrumPlotWidget.clear_average()
+        self.data_storage.set_trace_enabled("average", checked)
         self.spectrumPlotWidget.curve_average.setVisible(checked)
 
     @QtCore.Slot(bool)
@@ -437,6 +494,7 @@ class QSpectrumAnalyzerMainWindow(QtWidgets.QMainWindow, Ui_QSpectrumAnalyzerMai
 
     @QtCore.Slot()
     def on_baselineButton_clicked(self):
+        from qspectrumanalyzer.baseline import QSpectrumAnalyzerBaseline
         dialog = QSpectrumAnalyzerBaseline(self)
         if dialog.exec_():
             settings = QtCore.QSettings()
@@ -447,6 +505,7 @@ class QSpectrumAnalyzerMainWindow(QtWidgets.QMainWindow, Ui_QSpectrumAnalyzerMai
 
     @QtCore.Slot()
     def on_smoothButton_clicked(self):
+        from qspectrumanalyzer.smoothing import QSpectrumAnalyzerSmoothing
         dialog = QSpectrumAnalyzerSmoothing(self)
         if dialog.exec_():
             settings = QtCore.QSettings()
@@ -459,6 +518,7 @@ class QSpectrumAnalyzerMainWindow(QtWidgets.QMainWindow, Ui_QSpectrumAnalyzerMai
     @QtCore.Slot()
     def on_persistenceButton_clicked(self):
         prev_persistence_length = self.spectrumPlotWidget.persistence_length
+        from qspectrumanalyzer.persistence import QSpectrumAnalyzerPersistence
         dialog = QSpectrumAnalyzerPersistence(self)
         if dialog.exec_():
             settings = QtCore.QSettings()
@@ -474,6 +534,7 @@ class QSpectrumAnalyzerMainWindow(QtWidgets.QMainWindow, Ui_QSpectrumAnalyzerMai
 
     @QtCore.Slot()
     def on_colorsButton_clicked(self):
+        from qspectrumanalyzer.colors import QSpectrumAnalyzerColors
         dialog = QSpectrumAnalyzerColors(self)
         if dialog.exec_():
             settings = QtCore.QSettings()
@@ -487,10 +548,42 @@ class QSpectrumAnalyzerMainWindow(QtWidgets.QMainWindow, Ui_QSpectrumAnalyzerMai
 
     @QtCore.Slot()
     def on_action_Settings_triggered(self):
+        from qspectrumanalyzer.settings import QSpectrumAnalyzerSettings
         dialog = QSpectrumAnalyzerSettings(self)
         if dialog.exec_():
             self.setup_power_thread()
 
+    @QtCore.Slot(bool)
+    def on_action_PerformanceHUD_toggled(self, checked):
+        self.spectrumPlotWidget.hud = checked
+        self.spectrumPlotWidget.update_hud(self.data_storage, force=True)
+
+    @QtCore.Slot()
+    def on_action_ClearHistory_triggered(self):
+        self.data_storage.reset()
+        self.waterfallPlotWidget.clear_plot()
+        self.spectrumPlotWidget.clear_plot()
+        self.spectrumPlotWidget.clear_peak_hold_max()
+        self.spectrumPlotWidget.clear_peak_hold_min()
+        self.spectrumPlotWidget.clear_average()
+        self.spectrumPlotWidget.clear_persistence()
+
+    @QtCore.Slot()
+    def on_action_RollupTrend_triggered(self):
+        from qspectrumanalyzer.rollup import Rollup
+        from qspectrumanalyzer.trend import QSpectrumAnalyzerTrend
+
+        # Rollups written by headless instances can be viewed even if recording is disabled here
+        rollup = self.rollup
+        if not rollup:
+            directory = QtWidgets.QFileDialog.getExistingDirectory(self, self.tr("Select rollup directory"))
+            if not directory:
+                return
+            rollup = Rollup(directory)
+
+        dialog = QSpectrumAnalyzerTrend(rollup, self)
+        dialog.exec_()
+
     @QtCore.Slot()
     def on_action_About_triggered(self):
         QtWidgets.QMessageBox.information(self, self.tr("About - QSpectrumAnalyzer"),
@@ -503,6 +596,9 @@ class QSpectrumAnalyzerMainWindow(QtWidgets.QMainWindow, Ui_QSpectrumAnalyzerMai
     def closeEvent(self, event):
         """Save settings when main window is closed"""
         self.stop()
+        self.data_storage.close()
+        if self.metrics_server:
+            self.metrics_server.stop()
         self.save_settings()
 
 
@@ -516,10 +612,18 @@ def main():
     )
     parser.add_argument("--debug", action="store_true",
                         help="detailed debugging messages")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="profile all threads and write profiles to directory on exit "
+                             "(sampling of all threads can be toggled with Ctrl+Shift+P)")
+    parser.add_argument("--profile-mode", choices=["deterministic", "statistical"], default="deterministic",
+                        help="profiling mode (default: %(default)s)")
+    parser.add_argument("--startup-timing", action="store_true",
+                        help="print report of time spent in startup phases")
     parser.add_argument("--version", action="version",
                         version="%(prog)s {}".format(__version__))
     args, unparsed_args = parser.parse_known_args()
     debug = args.debug
+    startup_timer.mark("imports")
 
     try:
         # Hide console window on Windows
@@ -527,13 +631,31 @@ def main():
             from qspectrumanalyzer import windows
             windows.set_attached_console_visible(False)
 
+        # Start profiling of all threads
+        if args.profile:
+            profiler.Profiler(args.profile, mode=args.profile_mode).start()
+
         # Start PyQt application
         app = QtWidgets.QApplication(sys.argv[:1] + unparsed_args)
         app.setOrganizationName("QSpectrumAnalyzer")
         app.setOrganizationDomain("qspectrumanalyzer.eutopia.cz")
         app.setApplicationName("QSpectrumAnalyzer")
+        startup_timer.mark("application")
         window = QSpectrumAnalyzerMainWindow()
-        sys.exit(app.exec_())
+        if args.startup_timing:
+            # Report is printed when event loop is running (after window is shown)
+            def print_startup_timing():
+                startup_timer.mark("first event loop")
+                print(startup_timer.report(), file=sys.stderr)
+            QtCore.QTimer.singleShot(0, print_startup_timing)
+        if profiler.current:
+            profile_shortcut = QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+Shift+P"), window)
+            profile_shortcut.activated.connect(profiler.current.toggle_sampling)
+
+        exit_code = app.exec_()
+        if profiler.current:
+            profiler.current.stop()
+        sys.exit(exit_code)
     finally:
         # Unhide console window on Windows (we don't want to leave zombies behind)
         if sys.platform == 'win32' and not debug:
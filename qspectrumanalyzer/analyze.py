@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+
+import sys, os, time, datetime, argparse, concurrent.futures
+
+import numpy as np
+
+from qspectrumanalyzer.version import __version__
+from qspectrumanalyzer.recording import RecordingIndex
+from qspectrumanalyzer.grid import FrequencyGrid, GridResampler
+from qspectrumanalyzer.backends import soapy_power
+
+
+class Report:
+    """Partial (or merged) statistics of recorded sweeps"""
+    def __init__(self, x, percentiles=None, threshold=None, hist_min=-150.0, hist_max=50.0, hist_step=0.5):
+        self.grid = FrequencyGrid(x)
+        self.x = self.grid.x
+        self.resampler = GridResampler(self.grid)
+        self.percentiles = percentiles or []
+        self.threshold = threshold
+        self.hist_min = hist_min
+        self.hist_step = hist_step
+        self.hist_bins = int(round((hist_max - hist_min) / hist_step))
+
+        bins = len(self.x)
+        self.count = 0
+        self.dropped = 0
+        self.resampled = 0
+        self.sum = np.zeros(bins, dtype=np.float64)
+        self.peak_hold_max = np.full(bins, -np.inf)
+        self.peak_hold_min = np.full(bins, np.inf)
+        self.occupancy = np.zeros(bins, dtype=np.uint64) if threshold is not None else None
+        self.histogram = np.zeros((bins, self.hist_bins), dtype=np.uint32) if self.percentiles else None
+        self._hist_rows = np.arange(bins) * self.hist_bins
+
+    def update(self, y, grid=None):
+        """Add one sweep to statistics (sweep with different frequency axis is resampled onto report grid)"""
+        y = np.asarray(y, dtype=np.float64)
+        if grid is not None and grid is not self.grid and not self.grid.matches(grid.x):
+            y = self.resampler.resample(y, grid)
+            if y is None:
+                self.dropped += 1
+                return
+            self.resampled += 1
+        elif len(y) != len(self.x):
+            self.dropped += 1
+            return
+
+        self.count += 1
+        self.sum += y
+        np.maximum(self.peak_hold_max, y, out=self.peak_hold_max)
+        np.minimum(self.peak_hold_min, y, out=self.peak_hold_min)
+
+        if self.occupancy is not None:
+            self.occupancy += y > self.threshold
+
+        if self.histogram is not None:
+            i = np.clip(((y - self.hist_min) / self.hist_step).astype(np.int64), 0, self.hist_bins - 1)
+            self.histogram.ravel()[self._hist_rows + i] += 1
+
+    def merge(self, other):
+        """Merge statistics from other report"""
+        if len(other.x) != len(self.x):
+            print("Can't merge report with {:d} bins (expected {:d} bins)".format(len(other.x), len(self.x)),
+                  file=sys.stderr)
+            self.dropped += other.count + other.dropped
+            return
+
+        self.count += other.count
+        self.dropped += other.dropped
+        self.resampled += other.resampled
+        self.sum += other.sum
+        np.maximum(self.peak_hold_max, other.peak_hold_max, out=self.peak_hold_max)
+        np.minimum(self.peak_hold_min, other.peak_hold_min, out=self.peak_hold_min)
+        if self.occupancy is not None:
+            self.occupancy += other.occupancy
+        if self.histogram is not None:
+            self.histogram += other.histogram
+
+    @property
+    def average(self):
+        """Average of all sweeps"""
+        return self.sum / self.count
+
+    def percentile(self, q):
+        """Approximate percentile of all sweeps (computed from histogram)"""
+        cumsum = np.cumsum(self.histogram, axis=1)
+        rank = np.ceil(q / 100 * self.count)
+        i = np.argmax(cumsum >= max(rank, 1), axis=1)
+        return self.hist_min + (i + 0.5) * self.hist_step
+
+    def columns(self):
+        """Return list of (name, values) pairs of all computed statistics"""
+        columns = [
+            ("frequency", self.x),
+            ("average", self.average),
+            ("peak_hold_max", self.peak_hold_max),
+            ("peak_hold_min", self.peak_hold_min),
+        ]
+        for q in self.percentiles:
+            columns.append(("p{:g}".format(q), self.percentile(q)))
+        if self.occupancy is not None:
+            columns.append(("occupancy", self.occupancy / self.count))
+        return columns
+
+    def write_csv(self, f):
+        """Write report to file in CSV format"""
+        columns = self.columns()
+        f.write(",".join(name for name, values in columns) + "\n")
+        np.savetxt(f, np.column_stack([values for name, values in columns]), delimiter=",", fmt="%.6f")
+
+
+def analyze_chunk(filename, start_offset, stop_offset, x, options):
+    """Compute statistics of sweeps stored in given byte range of recording (on frequency axis x)"""
+    report = Report(x, **options)
+    with open(filename, 'rb') as f:
+        f.seek(start_offset)
+        for data in soapy_power.read_from_file(f, stop_offset=stop_offset):
+            report.update(data["y"], data["grid"])
+    return report
+
+
+def first_sweep_axis(filename, start_offset, stop_offset):
+    """Return frequency axis of first sweep stored in given byte range of recording (or None)"""
+    with open(filename, 'rb') as f:
+        f.seek(start_offset)
+        for data in soapy_power.read_from_file(f, stop_offset=stop_offset):
+            return data["x"]
+    return None
+
+
+def split_chunks(filenames, start_time=None, stop_time=None, chunks=1):
+    """Split sweeps from recordings in given time range to byte ranges of (nearly) same size"""
+    result = []
+    for filename in filenames:
+        index = RecordingIndex(filename)
+        start_offset, stop_offset = index.offsets(start_time, stop_time)
+        if start_offset >= stop_offset:
+            continue
+
+        first = index.find(start_time) if start_time is not None else 0
+        sweeps = index[first:first + np.searchsorted(index[first:]["offset"], stop_offset)]
+        bounds = np.linspace(0, len(sweeps), min(chunks, len(sweeps)) + 1).astype(int)
+        offsets = [int(sweeps[i]["offset"]) for i in bounds[:-1]] + [stop_offset]
+        result.extend((filename, offsets[i], offsets[i + 1]) for i in range(len(offsets) - 1))
+    return result
+
+
+def analyze(filenames, start_time=None, stop_time=None, jobs=None, chunks=None, **options):
+    """Compute statistics of all sweeps in recordings (in parallel in multiple processes)
+
+    All sweeps are resampled onto frequency axis of first sweep, so that partial reports can be merged.
+    Partial reports are merged as soon as they are finished (only few of them are kept in memory).
+    """
+    jobs = jobs or os.cpu_count() or 1
+    chunks = split_chunks(filenames, start_time, stop_time, chunks or jobs * 4)
+    if not chunks:
+        return None
+
+    x = first_sweep_axis(*chunks[0])
+    if x is None:
+        return None
+
+    report = Report(x, **options)
+    if jobs == 1:
+        for chunk in chunks:
+            report.merge(analyze_chunk(*chunk, x, options))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {executor.submit(analyze_chunk, *chunk, x, options) for chunk in chunks}
+            for future in concurrent.futures.as_completed(futures):
+                futures.remove(future)
+                report.merge(future.result())
+    return report if report.count else None
+
+
+def parse_time(value):
+    """Parse Unix timestamp or ISO 8601 date and time (in local timezone)"""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.strptime(value, "%Y-%m-%d %H:%M:%S").timestamp()
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(
+        prog="qspectrumanalyzer-analyze",
+        description="Offline analysis of spectrum recordings (in soapy_power binary format)",
+    )
+    parser.add_argument("files", metavar="FILE", nargs="+",
+                        help="recordings to analyze")
+    parser.add_argument("-o", "--output", metavar="FILE", type=argparse.FileType("w"), default=sys.stdout,
+                        help="write CSV report to file (default: stdout)")
+    parser.add_argument("--start", metavar="TIME", type=parse_time,
+                        help="analyze only sweeps recorded after this time "
+                             "(Unix timestamp or 'YYYY-MM-DD HH:MM:SS')")
+    parser.add_argument("--stop", metavar="TIME", type=parse_time,
+                        help="analyze only sweeps recorded before this time "
+                             "(Unix timestamp or 'YYYY-MM-DD HH:MM:SS')")
+    parser.add_argument("-p", "--percentile", metavar="Q", type=float, action="append", default=[],
+                        help="compute Q-th percentile of power in every bin (can be repeated)")
+    parser.add_argument("-t", "--threshold", metavar="DB", type=float,
+                        help="compute occupancy (fraction of sweeps with power above threshold)")
+    parser.add_argument("--hist-min", metavar="DB", type=float, default=-150.0,
+                        help="lower limit of histogram used for percentiles (default: %(default)s)")
+    parser.add_argument("--hist-max", metavar="DB", type=float, default=50.0,
+                        help="upper limit of histogram used for percentiles (default: %(default)s)")
+    parser.add_argument("--hist-step", metavar="DB", type=float, default=0.5,
+                        help="resolution of histogram used for percentiles (default: %(default)s)")
+    parser.add_argument("-j", "--jobs", type=int,
+                        help="number of worker processes (default: number of CPU cores)")
+    parser.add_argument("--chunks", type=int,
+                        help="number of time chunks per recording (default: 4 * number of jobs)")
+    parser.add_argument("--version", action="version",
+                        version="%(prog)s {}".format(__version__))
+    args = parser.parse_args()
+
+    t = time.time()
+    report = analyze(args.files, start_time=args.start, stop_time=args.stop, jobs=args.jobs, chunks=args.chunks,
+                     percentiles=args.percentile, threshold=args.threshold,
+                     hist_min=args.hist_min, hist_max=args.hist_max, hist_step=args.hist_step)
+    if report is None:
+        print("No sweeps found!", file=sys.stderr)
+        sys.exit(1)
+
+    report.write_csv(args.output)
+    print("Analyzed {:d} sweeps ({:d} resampled, {:d} dropped) in {:.2f} s".format(
+        report.count, report.resampled, report.dropped, time.time() - t), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
-import os, threading, shlex
+import os, time, threading, shlex, functools, importlib
 
+import numpy as np
 from Qt import QtCore
 
-from qspectrumanalyzer import subprocess
+from qspectrumanalyzer import subprocess, profiler
+from qspectrumanalyzer.grid import GridCache
 
 
 class BaseInfo:
@@ -36,6 +38,7 @@ class BaseInfo:
     crop = 0
     additional_params = ''
     help_device = None
+    executable = None
 
     @classmethod
     def help_params(cls, executable):
@@ -61,8 +64,14 @@ class BasePowerThread(QtCore.QThread):
         self.data_storage = data_storage
         self.alive = False
         self.process = None
+        self.read_timestamp = None
+        self.grid_cache = GridCache()
         self._shutdown_lock = threading.Lock()
 
+        # Register power thread with profiler (signals are emitted from inside of thread)
+        self.started.connect(functools.partial(profiler.thread_started, "power_thread"), QtCore.Qt.DirectConnection)
+        self.finished.connect(profiler.thread_finished, QtCore.Qt.DirectConnection)
+
     def stop(self):
         """Stop power process thread"""
         self.process_stop()
@@ -94,6 +103,29 @@ class BasePowerThread(QtCore.QThread):
         """Parse one line of output from power process"""
         raise NotImplementedError
 
+    def update_data_storage(self, databuffer):
+        """Pass complete sweep to data storage (with timestamps for latency tracing)
+
+        Databuffer contains list of y values of every hop and either grid of whole sweep,
+        keys of hop axes (in grid cache) or frequency axis of whole sweep.
+        """
+        if "grid" in databuffer:
+            grid = databuffer["grid"]
+        elif "hops" in databuffer:
+            grid = self.grid_cache.grid(databuffer["hops"])
+        else:
+            grid = self.grid_cache.grid_from_axis(databuffer["x"])
+
+        data = {
+            "timestamp": databuffer["timestamp"],
+            "grid": grid,
+            "x": grid.x,
+            "y": np.concatenate(databuffer["y"]) if databuffer["y"] else np.empty(0),
+            "trace": {"read": self.read_timestamp},
+        }
+        self.data_storage.tracer.stamp(data["trace"], "parse")
+        self.data_storage.update(data)
+
     def run(self):
         """Power process thread main loop"""
         self.process_start()
@@ -103,6 +135,7 @@ class BasePowerThread(QtCore.QThread):
         for line in self.process.stdout:
             if not self.alive:
                 break
+            self.read_timestamp = time.monotonic()
             self.parse_output(line)
 
         self.process_stop()
@@ -111,7 +144,15 @@ class BasePowerThread(QtCore.QThread):
 
 
 # Build list of all backends
-__all__ = ['soapy_power', 'hackrf_sweep', 'rtl_power', 'rtl_power_fftw', 'rx_power']
+__all__ = ['soapy_power', 'hackrf_sweep', 'rtl_power', 'rtl_power_fftw', 'rx_power', 'multi']
+
+
+def __getattr__(name):
+    """Import backend module only when it is selected or queried for the first time"""
+    if name in __all__:
+        return importlib.import_module("{}.{}".format(__name__, name))
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
 
-# Import all backends
-from qspectrumanalyzer.backends import soapy_power, hackrf_sweep, rtl_power, rtl_power_fftw, rx_power
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -77,7 +77,7 @@ class PowerThread(BasePowerThread):
             "single_shot": single_shot
         }
         self.lnb_lo = lnb_lo
-        self.databuffer = {"timestamp": [], "x": [], "y": []}
+        self.databuffer = {"timestamp": [], "hops": [], "y": []}
         self.lastsweep = 0
         self.interval = interval
 
@@ -115,17 +115,16 @@ class PowerThread(BasePowerThread):
     def parse_output(self, buf):
         """Parse one buf of output from hackrf_sweep"""
         (low_edge, high_edge) = struct.unpack('QQ', buf[:16])
-        data = np.fromstring(buf[16:], dtype='<f4')
+        data = np.frombuffer(buf[16:], dtype='<f4')
         step = (high_edge - low_edge) / len(data)
 
         if (low_edge // 1000000) <= (self.params["start_freq"] - self.lnb_lo / 1e6):
             # Reset databuffer at the start of each sweep even if we somehow
             # did not complete the previous sweep.
-            self.databuffer = {"timestamp": [], "x": [], "y": []}
-        x_axis = list(np.arange(low_edge + self.lnb_lo + step / 2, high_edge + self.lnb_lo, step))
-        self.databuffer["x"].extend(x_axis)
-        for i in range(len(data)):
-            self.databuffer["y"].append(data[i])
+            self.databuffer = {"timestamp": [], "hops": [], "y": []}
+        hop = self.grid_cache.hop(low_edge + self.lnb_lo + step / 2, high_edge + self.lnb_lo - step / 2, len(data))
+        self.databuffer["hops"].append(hop)
+        self.databuffer["y"].append(data)
         if (high_edge / 1e6) >= (self.params["stop_freq"] - self.lnb_lo / 1e6):
             # We've reached the end of a pass. If it went too fast for our sweep interval, ignore it
             t_finish = time.time()
@@ -133,10 +132,10 @@ class PowerThread(BasePowerThread):
                 return
             self.lastsweep = t_finish
 
-            # otherwise sort and display the data.
-            sorted_data = sorted(zip(self.databuffer["x"], self.databuffer["y"]))
-            self.databuffer["x"], self.databuffer["y"] = [list(x) for x in zip(*sorted_data)]
-            self.data_storage.update(self.databuffer)
+            # otherwise sort blocks by frequency and display the data.
+            sorted_blocks = sorted(zip(self.databuffer["hops"], self.databuffer["y"]), key=lambda block: block[0])
+            self.databuffer["hops"], self.databuffer["y"] = [list(x) for x in zip(*sorted_blocks)]
+            self.update_data_storage(self.databuffer)
 
     def run(self):
         """hackrf_sweep thread main loop"""
@@ -160,6 +159,7 @@ class PowerThread(BasePowerThread):
                     continue
 
                 if buf:
+                    self.read_timestamp = time.monotonic()
                     self.parse_output(buf)
                 else:
                     break
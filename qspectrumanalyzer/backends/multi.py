@@ -0,0 +1,227 @@
+import time, threading
+
+import numpy as np
+from Qt import QtCore
+
+from qspectrumanalyzer import backends
+from qspectrumanalyzer.backends import BaseInfo, BasePowerThread
+from qspectrumanalyzer.grid import FrequencyGrid
+
+
+class Info(BaseInfo):
+    """Multi-device metadata (frequency span is split between devices separated by ';',
+    every device is swept by its own process of backend selected by multi_backend setting)"""
+    executable = "rtl_power"
+
+
+def split_span(start_freq, stop_freq, segments, bin_size):
+    """Split frequency span (in MHz) to given number of contiguous segments aligned to bin size (in kHz)"""
+    step = bin_size / 1e3 if bin_size > 0 else 0
+    edges = [start_freq]
+    for i in range(1, segments):
+        edge = start_freq + (stop_freq - start_freq) * i / segments
+        if step:
+            edge = start_freq + round((edge - start_freq) / step) * step
+        edges.append(round(edge, 6))
+    edges.append(stop_freq)
+    return list(zip(edges[:-1], edges[1:]))
+
+
+class SweepStitcher:
+    """Stitch sweeps of frequency segments (swept by different devices) to one sweep
+
+    Stitched sweep is emitted when every segment has completed new sweep since previous
+    stitched sweep. Bins of segment which overlap with previous segment are dropped
+    (index slices are cached for every combination of segment grids).
+    """
+    max_layouts = 16
+    # Segment is stalled when it didn't complete sweep in this many sweep periods of slowest segment
+    # (but at least in given number of seconds, because starting of device can take long time)
+    stall_sweeps = 10
+    min_stall_timeout = 30
+
+    def __init__(self, segments):
+        self.segments = segments
+        self.lock = threading.Lock()
+        self.layouts = {}
+        self.reset()
+
+    def reset(self):
+        """Forget all received sweeps"""
+        with self.lock:
+            self.sweeps = [None] * self.segments
+            self.started = time.time()
+            self.completed = [None] * self.segments
+            self.periods = [None] * self.segments
+            self.fresh = [False] * self.segments
+            self.sweeps_total = [0] * self.segments
+
+    def layout(self, grids):
+        """Return grid of stitched sweep and slices of segments for given segment grids"""
+        key = tuple(grids)
+        layout = self.layouts.get(key)
+        if layout is None:
+            if len(self.layouts) >= self.max_layouts:
+                self.layouts.clear()
+            slices = []
+            last_freq = -np.inf
+            for grid in grids:
+                start = np.searchsorted(grid.x, last_freq, side="right")
+                slices.append(slice(start, None))
+                if start < grid.size:
+                    last_freq = grid.x[-1]
+            x = np.concatenate([grid.x[s] for grid, s in zip(grids, slices)])
+            layout = (FrequencyGrid(x), slices)
+            self.layouts[key] = layout
+        return layout
+
+    def update(self, segment, data):
+        """Add complete sweep of segment, return stitched sweep (or None if some segment is not complete yet)"""
+        with self.lock:
+            now = time.time()
+            if self.completed[segment] is not None:
+                self.periods[segment] = now - self.completed[segment]
+            self.sweeps[segment] = data
+            self.completed[segment] = now
+            self.fresh[segment] = True
+            self.sweeps_total[segment] += 1
+            if not all(self.fresh):
+                return None
+
+            sweeps = list(self.sweeps)
+            completed = list(self.completed)
+            self.fresh = [False] * self.segments
+
+        grids = [sweep["grid"] if "grid" in sweep else FrequencyGrid(sweep["x"]) for sweep in sweeps]
+        grid, slices = self.layout(grids)
+        reads = [sweep["trace"].get("read") for sweep in sweeps if sweep.get("trace")]
+        reads = [t for t in reads if t is not None]
+        return {
+            "timestamp": sweeps[completed.index(max(completed))]["timestamp"],
+            "segment_timestamps": completed,
+            "grid": grid,
+            "x": grid.x,
+            "y": np.concatenate([np.asarray(sweep["y"])[s] for sweep, s in zip(sweeps, slices)]),
+            "trace": {"read": min(reads) if reads else None},
+        }
+
+
+    def stalled(self):
+        """Return segments which didn't complete sweep for too long (compared to sweep periods of other segments)"""
+        with self.lock:
+            periods = [period for period in self.periods if period is not None]
+            if not periods:
+                return []
+
+            timeout = max(self.stall_sweeps * max(periods), self.min_stall_timeout)
+            now = time.time()
+            return [i for i, completed in enumerate(self.completed)
+                    if now - (completed if completed is not None else self.started) > timeout]
+
+
+class SegmentSink:
+    """Data storage replacement passed to sub-backend, which forwards sweeps of one segment to stitcher"""
+    def __init__(self, power_thread, segment):
+        self.power_thread = power_thread
+        self.segment = segment
+        self.tracer = power_thread.data_storage.tracer
+
+    def update(self, data):
+        self.power_thread.update_segment(self.segment, data)
+
+
+class PowerThread(BasePowerThread):
+    """Thread which runs one process of sub-backend per device and stitches their sweeps"""
+    # Interval of checking sub-backends for finished or stalled devices (in milliseconds)
+    check_interval = 500
+
+    def __init__(self, data_storage, parent=None):
+        super().__init__(data_storage, parent)
+        self.params = {}
+        self.threads = []
+        self.stitcher = SweepStitcher(0)
+        self.update_lock = threading.Lock()
+
+    def setup(self, start_freq, stop_freq, bin_size, interval=10.0, gain=-1, ppm=0, crop=0,
+              single_shot=False, device="", sample_rate=2560000, bandwidth=0, lnb_lo=0):
+        """Setup sub-backends (one for each device, devices are separated by ';')"""
+        settings = QtCore.QSettings()
+        backend = settings.value("multi_backend", "rtl_power")
+        if backend not in backends.__all__ or backend == "multi":
+            print("Unknown multi_backend {!r}, using rtl_power".format(backend))
+            backend = "rtl_power"
+        backend_module = getattr(backends, backend)
+
+        devices = [d.strip() for d in str(device).split(";") if d.strip()] or [str(device)]
+        segments = split_span(start_freq, stop_freq, len(devices), bin_size)
+
+        self.threads = []
+        for i, (dev, (seg_start, seg_stop)) in enumerate(zip(devices, segments)):
+            thread = backend_module.PowerThread(SegmentSink(self, i))
+            thread.setup(seg_start, seg_stop, bin_size, interval=interval, gain=gain, ppm=ppm, crop=crop,
+                         single_shot=single_shot, device=dev, sample_rate=sample_rate, bandwidth=bandwidth,
+                         lnb_lo=lnb_lo)
+            self.threads.append(thread)
+
+        self.stitcher = SweepStitcher(len(self.threads))
+        self.params = {
+            "start_freq": start_freq,
+            "stop_freq": stop_freq,
+            "bin_size": bin_size,
+            "interval": interval,
+            "backend": backend,
+            "devices": devices,
+            "segments": segments,
+            "hops": sum(thread.params.get("hops", 0) for thread in self.threads),
+            "single_shot": single_shot
+        }
+
+    def process_start(self):
+        """Start all sub-backends"""
+        if self.params:
+            print('Starting {:d} {} devices: {}'.format(len(self.threads), self.params["backend"],
+                                                        ", ".join(self.params["devices"])))
+            for (seg_start, seg_stop), dev in zip(self.params["segments"], self.params["devices"]):
+                print('  device {}: {:.3f} - {:.3f} MHz'.format(dev, seg_start, seg_stop))
+            for thread in self.threads:
+                thread.start()
+
+    def process_stop(self):
+        """Stop all sub-backends"""
+        for thread in self.threads:
+            thread.stop()
+
+    def update_segment(self, segment, data):
+        """Pass stitched sweep to data storage when all segments are complete (called from sub-backend threads)"""
+        data = self.stitcher.update(segment, data)
+        if data is not None:
+            with self.update_lock:
+                self.data_storage.tracer.stamp(data["trace"], "parse")
+                self.data_storage.update(data)
+
+    def run(self):
+        """Multi-device thread main loop (waits until all sub-backends are finished)"""
+        self.stitcher.reset()
+        self.process_start()
+        self.alive = True
+        self.powerThreadStarted.emit()
+
+        # Stitched sweep can't be completed without every device, so all devices are stopped
+        # when one of them exits (except for single shot) or stops sweeping
+        stopping = False
+        while not all(thread.wait(self.check_interval) for thread in self.threads):
+            if stopping:
+                continue
+
+            failed = self.stitcher.stalled()
+            if not self.params["single_shot"]:
+                failed += [i for i, thread in enumerate(self.threads) if thread.isFinished() and i not in failed]
+            if failed:
+                for i in failed:
+                    print("Device {} stopped sweeping ({:d} sweeps received), stopping all devices".format(
+                        self.params["devices"][i], self.stitcher.sweeps_total[i]))
+                stopping = True
+                self.process_stop()
+
+        self.alive = False
+        self.powerThreadStopped.emit()
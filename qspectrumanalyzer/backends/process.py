@@ -0,0 +1,305 @@
+import sys, signal, shutil, tempfile, multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+from Qt import QtCore
+
+from qspectrumanalyzer import backends
+from qspectrumanalyzer.backends import BasePowerThread
+from qspectrumanalyzer.grid import FrequencyGrid
+from qspectrumanalyzer.latency import LatencyTracer
+
+
+def attach_shared_memory(name):
+    """Attach to existing shared memory block owned by parser process
+
+    Only owner registers block with resource tracker. Python < 3.13 registers every attached
+    block, so it is unregistered right away (resource tracker is shared with parser process,
+    so owner registers block again before removing it, see SweepRing.close).
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    shm = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class SweepRing:
+    """Ring of sweeps in shared memory
+
+    Every slot starts with sequence number of sweep stored in it (-1 while it is being written),
+    so that reader can detect slots which were overwritten before they were copied.
+    """
+    def __init__(self, shm, slots, capacity, owner=False):
+        self.shm = shm
+        self.slots = slots
+        self.capacity = capacity
+        self.owner = owner
+        self.sequences = np.ndarray((slots,), dtype=np.int64, buffer=shm.buf)
+        self.data = np.ndarray((slots, capacity), dtype=np.float64, buffer=shm.buf, offset=slots * 8)
+
+    @classmethod
+    def create(cls, slots, capacity):
+        """Create new ring (in parser process)"""
+        shm = shared_memory.SharedMemory(create=True, size=slots * 8 * (capacity + 1))
+        ring = cls(shm, slots, capacity, owner=True)
+        ring.sequences[:] = -1
+        return ring
+
+    @classmethod
+    def attach(cls, name, slots, capacity):
+        """Attach to ring created by parser process"""
+        return cls(attach_shared_memory(name), slots, capacity)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, sequence, y):
+        """Write sweep to slot given by its sequence number"""
+        slot = sequence % self.slots
+        self.sequences[slot] = -1
+        self.data[slot, :len(y)] = y
+        self.sequences[slot] = sequence
+        return slot
+
+    def read(self, sequence, bins):
+        """Copy sweep from ring (None if its slot was already overwritten by newer sweep)"""
+        slot = sequence % self.slots
+        if self.sequences[slot] != sequence:
+            return None
+        y = self.data[slot, :bins].copy()
+        if self.sequences[slot] != sequence:
+            return None
+        return y
+
+    def close(self, unlink=False):
+        """Detach from ring (and remove it if it is owned by this process or if unlink is True)"""
+        # Views of shared memory buffer have to be released before it is closed
+        self.sequences = None
+        self.data = None
+        self.shm.close()
+        if self.owner or unlink:
+            tracked = sys.version_info < (3, 13)
+            if tracked:
+                # Block could be unregistered by attaching process (see attach_shared_memory)
+                resource_tracker.register(self.shm._name, "shared_memory")
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                if tracked:
+                    resource_tracker.unregister(self.shm._name, "shared_memory")
+
+
+class RingWriter:
+    """Data storage replacement in parser process, writes sweeps to ring and notifies GUI process"""
+    def __init__(self, conn, slots=16):
+        self.conn = conn
+        self.slots = slots
+        self.tracer = LatencyTracer()
+        self.ring = None
+        self.sequence = 0
+        self.grids = {}
+
+    def update(self, data):
+        """Write sweep to shared memory and send small notification about it"""
+        y = data["y"]
+        if self.ring is None or len(y) > self.ring.capacity:
+            if self.ring:
+                self.ring.close()
+            self.ring = SweepRing.create(self.slots, len(y))
+            self.conn.send(("ring", self.ring.name, self.ring.slots, self.ring.capacity))
+
+        # Frequency axis is sent only once for every grid
+        grid = data["grid"]
+        grid_id = self.grids.get(grid)
+        if grid_id is None:
+            grid_id = len(self.grids)
+            self.grids[grid] = grid_id
+            self.conn.send(("grid", grid_id, grid.x))
+
+        self.ring.write(self.sequence, y)
+        self.conn.send(("sweep", self.sequence, len(y), grid_id, data["timestamp"], data["trace"].get("read")))
+        self.sequence += 1
+
+    def close(self):
+        """Remove ring"""
+        if self.ring:
+            self.ring.close()
+            self.ring = None
+
+
+def apply_settings(values):
+    """Use temporary settings with given values in parser process (backends read their config from QSettings)"""
+    settings_dir = tempfile.mkdtemp(prefix="qspectrumanalyzer-parser-")
+    QtCore.QCoreApplication.setOrganizationName("QSpectrumAnalyzer")
+    QtCore.QCoreApplication.setApplicationName("QSpectrumAnalyzerParser")
+    QtCore.QSettings.setDefaultFormat(QtCore.QSettings.IniFormat)
+    QtCore.QSettings.setPath(QtCore.QSettings.IniFormat, QtCore.QSettings.UserScope, settings_dir)
+
+    settings = QtCore.QSettings()
+    for key, value in values.items():
+        settings.setValue(key, value)
+    settings.sync()
+    return settings_dir
+
+
+def parser_main(backend, setup_params, settings_values, conn, slots):
+    """Main function of parser process (runs backend and parses its output)"""
+    settings_dir = apply_settings(settings_values)
+    writer = RingWriter(conn, slots)
+    power_thread = getattr(backends, backend).PowerThread(writer)
+    power_thread.setup(**setup_params)
+
+    # Terminate backend process on SIGTERM, main loop then ends normally
+    def terminate(signum, frame):
+        power_thread.alive = False
+        if power_thread.process:
+            power_thread.process.terminate()
+    signal.signal(signal.SIGTERM, terminate)
+
+    try:
+        power_thread.run()
+    finally:
+        writer.close()
+        conn.close()
+        shutil.rmtree(settings_dir, ignore_errors=True)
+
+
+class PowerThread(BasePowerThread):
+    """Thread which runs backend and parses its output in separate process
+
+    Finished sweeps are passed through ring in shared memory, only small notifications
+    are sent through pipe, so parsing doesn't compete for GIL with processing and plotting.
+    """
+    slots = 16
+
+    def __init__(self, data_storage, backend_module, parent=None):
+        super().__init__(data_storage, parent)
+        self.backend = backend_module.__name__.rsplit(".", 1)[-1]
+        self.params = {}
+        self.setup_params = {}
+        self.conn = None
+        self.ring = None
+        self.exitcode = None
+        self.grids = {}
+        self.dropped_sweeps_total = 0
+
+    def setup(self, start_freq, stop_freq, bin_size, interval=10.0, gain=-1, ppm=0, crop=0,
+              single_shot=False, device=0, sample_rate=2560000, bandwidth=0, lnb_lo=0):
+        """Setup backend params (backend is set up again in parser process)"""
+        self.setup_params = {
+            "start_freq": start_freq,
+            "stop_freq": stop_freq,
+            "bin_size": bin_size,
+            "interval": interval,
+            "gain": gain,
+            "ppm": ppm,
+            "crop": crop,
+            "single_shot": single_shot,
+            "device": device,
+            "sample_rate": sample_rate,
+            "bandwidth": bandwidth,
+            "lnb_lo": lnb_lo,
+        }
+
+        # Params of backend (e.g. number of hops) are used also by GUI
+        power_thread = getattr(backends, self.backend).PowerThread(self.data_storage)
+        power_thread.setup(**self.setup_params)
+        self.params = power_thread.params
+
+    def process_start(self):
+        """Start parser process"""
+        if not self.process and self.params:
+            self.exitcode = None
+            settings = QtCore.QSettings()
+            settings_values = {}
+            for key in settings.allKeys():
+                value = settings.value(key)
+                if isinstance(value, (str, int, float, bool)):
+                    settings_values[key] = value
+
+            context = multiprocessing.get_context("spawn")
+            self.conn, child_conn = context.Pipe(duplex=False)
+            self.process = context.Process(target=parser_main, name="qspectrumanalyzer-parser",
+                                           args=(self.backend, self.setup_params, settings_values,
+                                                 child_conn, self.slots),
+                                           daemon=True)
+            self.process.start()
+            child_conn.close()
+
+    def process_stop(self):
+        """Terminate parser process"""
+        with self._shutdown_lock:
+            if self.process:
+                if self.process.is_alive():
+                    self.process.terminate()
+                self.process.join()
+                self.exitcode = self.process.exitcode
+                self.process = None
+
+    def close_ring(self):
+        """Detach from shared memory ring (and remove it if parser process was killed before removing it)"""
+        if self.ring:
+            self.ring.close(unlink=self.exitcode not in (None, 0))
+            self.ring = None
+
+    def handle_message(self, message):
+        """Handle notification from parser process"""
+        kind = message[0]
+        if kind == "sweep":
+            sequence, bins, grid_id, timestamp, read_timestamp = message[1:]
+            y = self.ring.read(sequence, bins)
+            if y is None:
+                self.dropped_sweeps_total += 1
+                print("Sweep {:d} was overwritten in shared memory before it was read".format(sequence),
+                      file=sys.stderr)
+                return
+
+            grid = self.grids[grid_id]
+            data = {
+                "timestamp": timestamp,
+                "grid": grid,
+                "x": grid.x,
+                "y": y,
+                "trace": {"read": read_timestamp},
+            }
+            self.data_storage.tracer.stamp(data["trace"], "parse")
+            self.data_storage.update(data)
+
+        elif kind == "grid":
+            grid_id, x = message[1:]
+            self.grids[grid_id] = FrequencyGrid(x)
+
+        elif kind == "ring":
+            name, slots, capacity = message[1:]
+            self.close_ring()
+            try:
+                self.ring = SweepRing.attach(name, slots, capacity)
+            except OSError as e:
+                # Ring was already removed by parser process (it was resized again or parser exited),
+                # so measurement is stopped (sweeps couldn't be read anymore)
+                print("Can't attach to shared memory of parser process: {}".format(e), file=sys.stderr)
+                self.alive = False
+
+    def run(self):
+        """Parser process thread main loop (receives notifications about sweeps)"""
+        self.process_start()
+        self.alive = True
+        self.powerThreadStarted.emit()
+
+        while self.alive:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            self.handle_message(message)
+
+        self.process_stop()
+        self.close_ring()
+        self.conn.close()
+        self.conn = None
+        self.grids = {}
+        self.alive = False
+        self.powerThreadStopped.emit()
@@ -1,6 +1,5 @@
 import shlex
 
-import numpy as np
 from Qt import QtCore
 
 from qspectrumanalyzer import subprocess
@@ -77,28 +76,28 @@ class PowerThread(BasePowerThread):
         step = float(line[4])
         samples = float(line[5])
 
-        x_axis = list(np.linspace(start_freq + self.lnb_lo, stop_freq + self.lnb_lo,
-                                  round((stop_freq - start_freq) / step)))
+        bins = round((stop_freq - start_freq) / step)
+        hop = self.grid_cache.hop(start_freq + self.lnb_lo, stop_freq + self.lnb_lo, bins)
         y_axis = [float(y) for y in line[6:]]
-        if len(x_axis) != len(y_axis):
+        if bins != len(y_axis):
             print("ERROR: len(x_axis) != len(y_axis), use newer version of rtl_power!")
-            if len(x_axis) > len(y_axis):
+            if bins > len(y_axis):
                 print("Trimming x_axis...")
-                x_axis = x_axis[:len(y_axis)]
+                hop = self.grid_cache.hop(start_freq + self.lnb_lo, stop_freq + self.lnb_lo, bins, len(y_axis))
             else:
                 print("Trimming y_axis...")
-                y_axis = y_axis[:len(x_axis)]
+                y_axis = y_axis[:bins]
 
         if timestamp != self.last_timestamp:
             self.last_timestamp = timestamp
             self.databuffer = {"timestamp": timestamp,
-                               "x": x_axis,
-                               "y": y_axis}
+                               "hops": [hop],
+                               "y": [y_axis]}
         else:
-            self.databuffer["x"].extend(x_axis)
-            self.databuffer["y"].extend(y_axis)
+            self.databuffer["hops"].append(hop)
+            self.databuffer["y"].append(y_axis)
 
         # This have to be stupid like this to be compatible with old broken version of rtl_power. Right way is:
         # if stop_freq == (self.params["stop_freq"] - self.lnb_lo / 1e6) * 1e6:
         if stop_freq > ((self.params["stop_freq"] - self.lnb_lo / 1e6) * 1e6) - step:
-            self.data_storage.update(self.databuffer)
+            self.update_data_storage(self.databuffer)
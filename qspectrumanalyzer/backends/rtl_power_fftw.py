@@ -1,9 +1,11 @@
 import math, shlex
 
+import numpy as np
 from Qt import QtCore
 
 from qspectrumanalyzer import subprocess
 from qspectrumanalyzer.backends import BaseInfo, BasePowerThread
+from qspectrumanalyzer.grid import FrequencyGrid
 
 
 class Info(BaseInfo):
@@ -49,17 +51,39 @@ class PowerThread(BasePowerThread):
         self.lnb_lo = lnb_lo
         self.freqs = [self.get_hop_freq(hop) for hop in range(hops)]
         self.freqs_crop = [(f[0] + crop_freq, f[1] - crop_freq) for f in self.freqs]
-        self.databuffer = {"timestamp": [], "x": [], "y": []}
-        self.databuffer_hop = {"timestamp": [], "x": [], "y": []}
+        self.plan = self.get_hop_plan()
+        self.grid = FrequencyGrid(np.concatenate([axis[keep] for axis, keep in self.plan]))
+        self.reset_databuffer()
         self.hop = 0
+        self.hop_lines = []
         self.prev_line = ""
 
+    def reset_databuffer(self):
+        """Prepare empty buffer for new sweep"""
+        self.databuffer = {"timestamp": [], "x": [], "y": [], "planned": True}
+        self.last_freq = -np.inf
+
     def get_hop_freq(self, hop):
         """Get start and stop frequency for particular hop"""
         start_freq = self.params["start_freq"] * 1e6 + (self.params["sample_rate"] - self.params["overhang"]) * hop
         stop_freq = start_freq + self.params["sample_rate"] - (self.params["sample_rate"] / self.params["bins"])
         return (start_freq, stop_freq)
 
+    def get_hop_plan(self):
+        """Get expected frequency axis of every hop and slice of its bins which are kept after cropping
+        and removal of frequencies overlapping with previous hops"""
+        plan = []
+        last_freq = -np.inf
+        for (start_freq, stop_freq), (crop_start, crop_stop) in zip(self.freqs, self.freqs_crop):
+            axis = np.linspace(start_freq, stop_freq, self.params["bins"])
+            axis.setflags(write=False)
+            start = max(np.searchsorted(axis, crop_start, side="left"), np.searchsorted(axis, last_freq, side="right"))
+            stop = max(np.searchsorted(axis, crop_stop, side="right"), start)
+            if stop > start:
+                last_freq = axis[stop - 1]
+            plan.append((axis, slice(start, stop)))
+        return plan
+
     def process_start(self):
         """Start rtl_power_fftw process"""
         if not self.process and self.params:
@@ -94,52 +118,68 @@ class PowerThread(BasePowerThread):
                                             universal_newlines=True, console=False)
 
     def parse_output(self, line):
-        """Parse one line of output from rtl_power_fftw"""
+        """Parse one line of output from rtl_power_fftw (lines with bins are parsed in blocks by hops)"""
         line = line.strip()
 
+        # Collect frequency and power (whole hop is parsed at once)
+        if line and line[0].isdigit():
+            self.hop_lines.append(line)
+
         # One empty line => new hop
-        if not line and self.prev_line:
+        elif not line and self.prev_line:
+            self.parse_hop()
             self.hop += 1
-            self.databuffer["x"].extend(self.databuffer_hop["x"])
-            self.databuffer["y"].extend(self.databuffer_hop["y"])
-            self.databuffer_hop = {"timestamp": [], "x": [], "y": []}
 
         # Two empty lines => new set
         elif not line and not self.prev_line:
+            if self.databuffer["y"]:
+                if self.databuffer["planned"] and self.hop == len(self.plan):
+                    self.databuffer["grid"] = self.grid
+                else:
+                    self.databuffer["x"] = np.concatenate(self.databuffer["x"])
+                self.update_data_storage(self.databuffer)
+            self.reset_databuffer()
             self.hop = 0
-            self.data_storage.update(self.databuffer)
-            self.databuffer = {"timestamp": [], "x": [], "y": []}
 
-        # Get timestamp for new hop and set
+        # Get timestamp for new set
         elif line.startswith("# Acquisition start:"):
-            timestamp = line.split(":", 1)[1].strip()
-            if not self.databuffer_hop["timestamp"]:
-                self.databuffer_hop["timestamp"] = timestamp
             if not self.databuffer["timestamp"]:
-                self.databuffer["timestamp"] = timestamp
-
-        # Skip other comments
-        elif line.startswith("#"):
-            pass
-
-        # Parse frequency and power
-        elif line[0].isdigit():
-            freq, power = line.split()
-            freq, power = float(freq) + self.lnb_lo, float(power)
-            start_freq, stop_freq = self.freqs_crop[self.hop]
-
-            # Apply cropping
-            if freq >= start_freq and freq <= stop_freq:
-                # Skip overlapping frequencies
-                if not self.databuffer["x"] or freq > self.databuffer["x"][-1]:
-                    #print("  {:.3f} MHz".format(freq / 1e6))
-                    self.databuffer_hop["x"].append(freq)
-                    self.databuffer_hop["y"].append(power)
-                else:
-                    #print("  Overlapping {:.3f} MHz".format(freq / 1e6))
-                    pass
-            else:
-                #print("  Cropping {:.3f} MHz".format(freq / 1e6))
-                pass
+                self.databuffer["timestamp"] = line.split(":", 1)[1].strip()
 
         self.prev_line = line
+
+    def parse_hop(self):
+        """Convert frequencies and powers of whole hop to arrays and keep only cropped, non-overlapping bins"""
+        lines, self.hop_lines = self.hop_lines, []
+        if not lines:
+            return
+
+        values = np.fromstring(" ".join(lines), sep=" ")
+        if values.size != 2 * len(lines):
+            print("ERROR: can't parse {:d} lines of hop {:d}".format(len(lines), self.hop))
+            return
+        freqs = values[0::2] + self.lnb_lo
+        powers = values[1::2]
+
+        # Use precomputed slice if hop has expected frequencies
+        if self.hop < len(self.plan):
+            axis, keep = self.plan[self.hop]
+            tolerance = self.params["sample_rate"] / self.params["bins"] / 2
+            if (len(freqs) == len(axis) and abs(freqs[0] - axis[0]) < tolerance and
+                    abs(freqs[-1] - axis[-1]) < tolerance):
+                if keep.stop > keep.start:
+                    self.databuffer["x"].append(axis[keep])
+                    self.databuffer["y"].append(powers[keep])
+                    self.last_freq = axis[keep.stop - 1]
+                return
+            crop_start, crop_stop = self.freqs_crop[self.hop]
+        else:
+            crop_start, crop_stop = -np.inf, np.inf
+
+        # Otherwise apply cropping and skip overlapping frequencies by actual frequencies
+        self.databuffer["planned"] = False
+        mask = (freqs >= crop_start) & (freqs <= crop_stop) & (freqs > self.last_freq)
+        if mask.any():
+            self.databuffer["x"].append(freqs[mask])
+            self.databuffer["y"].append(powers[mask])
+            self.last_freq = freqs[mask][-1]
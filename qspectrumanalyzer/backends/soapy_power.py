@@ -1,17 +1,27 @@
-import os, sys, shlex, signal
+import os, sys, time, shlex, signal
 
 import numpy as np
 from Qt import QtCore
 
 from qspectrumanalyzer import subprocess
 from qspectrumanalyzer.backends import BaseInfo, BasePowerThread
+from qspectrumanalyzer.grid import GridCache
 
-try:
-    from soapypower.writer import SoapyPowerBinFormat
-    formatter = SoapyPowerBinFormat()
-except ImportError:
-    print('soapy_power module not found!')
-    formatter = None
+# soapy_power binary format (soapypower module is imported only when it is needed)
+_formatter = None
+
+
+def get_formatter():
+    """Return soapy_power binary format reader / writer (or None if soapy_power module is not installed)"""
+    global _formatter
+    if _formatter is None:
+        try:
+            from soapypower.writer import SoapyPowerBinFormat
+            _formatter = SoapyPowerBinFormat()
+        except ImportError:
+            print('soapy_power module not found!')
+            _formatter = False
+    return _formatter or None
 
 
 class Info(BaseInfo):
@@ -68,7 +78,7 @@ class PowerThread(BasePowerThread):
             "single_shot": single_shot
         }
         self.lnb_lo = lnb_lo
-        self.databuffer = {"timestamp": [], "x": [], "y": []}
+        self.databuffer = {"timestamp": [], "hops": [], "y": []}
         self.min_freq = None
 
         self.pipe_read = None
@@ -169,8 +179,8 @@ class PowerThread(BasePowerThread):
         step = header.step
         samples = header.samples
 
-        x_axis = np.linspace(start_freq, stop_freq, round((stop_freq - start_freq) / step))
-        if len(x_axis) != len(y_axis):
+        hop = self.grid_cache.hop(start_freq, stop_freq, round((stop_freq - start_freq) / step))
+        if len(self.grid_cache.hop_axis(hop)) != len(y_axis):
             print("ERROR: len(x_axis) != len(y_axis)")
             return
 
@@ -179,17 +189,18 @@ class PowerThread(BasePowerThread):
 
         if start_freq == self.min_freq:
             self.databuffer = {"timestamp": time_stop,
-                               "x": list(x_axis),
-                               "y": list(y_axis)}
+                               "hops": [hop],
+                               "y": [y_axis]}
         else:
-            self.databuffer["x"].extend(x_axis)
-            self.databuffer["y"].extend(y_axis)
+            self.databuffer["hops"].append(hop)
+            self.databuffer["y"].append(y_axis)
 
         if stop_freq > (self.params["stop_freq"] * 1e6) - step:
-            self.data_storage.update(self.databuffer)
+            self.update_data_storage(self.databuffer)
 
     def run(self):
         """soapy_power thread main loop"""
+        formatter = get_formatter()
         if not formatter:
             return
 
@@ -203,6 +214,7 @@ class PowerThread(BasePowerThread):
             except ValueError as e:
                 print(e, file=sys.stderr)
                 continue
+            self.read_timestamp = time.monotonic()
 
             if data:
                 self.parse_output(data)
@@ -214,41 +226,55 @@ class PowerThread(BasePowerThread):
         self.powerThreadStopped.emit()
 
 
-def read_from_file(f):
-    """Generator for reading data from soapy_power binary files"""
+def read_from_file(f, stop_offset=None):
+    """Generator for reading data from soapy_power binary files (optionally only up to stop_offset)"""
+    formatter = get_formatter()
     if not formatter:
         return
 
+    grid_cache = GridCache()
     min_freq = None
     databuffer = None
 
     while True:
-        try:
-            data = formatter.read(f)
-        except ValueError as e:
-            print(e, file=sys.stderr)
-            continue
+        if stop_offset is not None and f.tell() >= stop_offset:
+            data = None
+        else:
+            try:
+                data = formatter.read(f)
+            except ValueError as e:
+                print(e, file=sys.stderr)
+                continue
 
         if not data:
             if min_freq is not None:
-                yield databuffer
+                yield sweep_data(databuffer, grid_cache)
             return
 
         header, y_axis = data
-        x_axis = np.linspace(header.start, header.stop, round((header.stop - header.start) / header.step))
-        if len(x_axis) != len(y_axis):
+        hop = grid_cache.hop(header.start, header.stop, round((header.stop - header.start) / header.step))
+        if len(grid_cache.hop_axis(hop)) != len(y_axis):
             print("ERROR: len(x_axis) != len(y_axis)")
             continue
 
         if min_freq is None:
             min_freq = header.start
         elif header.start == min_freq:
-            yield databuffer
+            yield sweep_data(databuffer, grid_cache)
 
         if header.start == min_freq:
             databuffer = {"timestamp": header.time_stop,
-                          "x": list(x_axis),
-                          "y": list(y_axis)}
+                          "hops": [hop],
+                          "y": [y_axis]}
         else:
-            databuffer["x"].extend(x_axis)
-            databuffer["y"].extend(y_axis)
+            databuffer["hops"].append(hop)
+            databuffer["y"].append(y_axis)
+
+
+def sweep_data(databuffer, grid_cache):
+    """Assemble sweep (with shared frequency grid) from hops collected in databuffer"""
+    grid = grid_cache.grid(databuffer["hops"])
+    return {"timestamp": databuffer["timestamp"],
+            "grid": grid,
+            "x": grid.x,
+            "y": np.concatenate(databuffer["y"])}
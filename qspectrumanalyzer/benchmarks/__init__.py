@@ -0,0 +1,133 @@
+import sys, time, json, platform, argparse
+
+import numpy as np
+
+from qspectrumanalyzer.version import __version__
+
+
+class BenchmarkRunner:
+    """Run benchmarks, print their results and save them in JSON format (for comparison of runs)"""
+    def __init__(self, suite, min_time=1.0, min_runs=3, filter_names=None):
+        self.suite = suite
+        self.min_time = min_time
+        self.min_runs = min_runs
+        self.filter_names = filter_names or []
+        self.results = []
+
+    def run(self, name, fn, bins=0, ops=1, **params):
+        """Run benchmark repeatedly for at least min_time seconds
+
+        Every call of fn is counted as given number of operations (e.g. sweeps)
+        with given number of bins (in total).
+        """
+        if self.filter_names and not any(f in name for f in self.filter_names):
+            return None
+
+        # Warm up (caches, lazy initialization)
+        fn()
+
+        times = []
+        start = time.perf_counter()
+        while len(times) < self.min_runs or time.perf_counter() - start < self.min_time:
+            t = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t)
+
+        times = np.array(times)
+        total_time = times.sum()
+        result = {
+            "name": name,
+            "params": params,
+            "runs": len(times),
+            "mean_time": times.mean(),
+            "median_time": np.median(times),
+            "min_time": times.min(),
+            "ops_per_second": len(times) * ops / total_time,
+            "bins_per_second": len(times) * bins / total_time,
+        }
+        self.results.append(result)
+        self.print_result(result)
+        return result
+
+    @staticmethod
+    def print_header():
+        """Print header of results table"""
+        print("{:<50} {:>8} {:>12} {:>14} {:>16}".format("benchmark", "runs", "median", "ops/s", "bins/s"))
+
+    @staticmethod
+    def print_result(result):
+        """Print one row of results table"""
+        print("{:<50} {:>8d} {:>12} {:>14.1f} {:>16.4g}".format(
+            result["name"],
+            result["runs"],
+            "{:.3f} ms".format(result["median_time"] * 1000),
+            result["ops_per_second"],
+            result["bins_per_second"]
+        ))
+        sys.stdout.flush()
+
+    def metadata(self):
+        """Return description of environment in which benchmarks were run"""
+        import pyqtgraph
+        from Qt import QtCore, __binding__
+        return {
+            "suite": self.suite,
+            "timestamp": time.time(),
+            "qspectrumanalyzer": __version__,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pyqtgraph": pyqtgraph.__version__,
+            "qt_binding": __binding__,
+            "qt": QtCore.qVersion(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+        }
+
+    def save(self, filename):
+        """Save results to file in JSON format"""
+        with open(filename, 'w') as f:
+            json.dump({"metadata": self.metadata(), "results": self.results}, f, indent=2, default=float)
+
+    def compare(self, filename):
+        """Compare results with results of previous run saved in JSON file"""
+        with open(filename) as f:
+            previous = {r["name"]: r for r in json.load(f)["results"]}
+
+        print()
+        print("{:<50} {:>14} {:>14} {:>10}".format("benchmark", "previous ops/s", "ops/s", "change"))
+        for result in self.results:
+            prev = previous.get(result["name"])
+            if not prev:
+                continue
+            change = result["ops_per_second"] / prev["ops_per_second"] - 1
+            print("{:<50} {:>14.1f} {:>14.1f} {:>+9.1f}%".format(
+                result["name"], prev["ops_per_second"], result["ops_per_second"], change * 100
+            ))
+
+
+def create_parser(prog, description):
+    """Create parser of command line arguments common for all benchmarks"""
+    parser = argparse.ArgumentParser(prog=prog, description=description)
+    parser.add_argument("-t", "--min-time", metavar="SECONDS", type=float, default=1.0,
+                        help="minimal time of every benchmark (default: %(default)s)")
+    parser.add_argument("-k", "--filter", metavar="NAME", action="append", default=[],
+                        help="run only benchmarks with name containing given string (can be repeated)")
+    parser.add_argument("-o", "--output", metavar="FILE",
+                        help="save results to file in JSON format")
+    parser.add_argument("-c", "--compare", metavar="FILE",
+                        help="compare results with previous run saved in JSON format")
+    return parser
+
+
+def run_suite(suite, args, benchmarks):
+    """Run benchmark suite with parsed command line arguments (benchmarks is function which accepts runner)"""
+    runner = BenchmarkRunner(suite, min_time=args.min_time, filter_names=args.filter)
+    runner.print_header()
+    benchmarks(runner)
+
+    if args.output:
+        runner.save(args.output)
+    if args.compare:
+        runner.compare(args.compare)
+    return runner
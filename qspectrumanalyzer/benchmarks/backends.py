@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+
+import os, io, glob, struct, datetime
+
+import numpy as np
+
+from qspectrumanalyzer import backends
+from qspectrumanalyzer.benchmarks import create_parser, run_suite
+from qspectrumanalyzer.latency import LatencyTracer
+
+# Backends which parse output of their own process (multi backend only stitches output of other backends)
+parser_backends = sorted(b for b in backends.__all__ if b != "multi")
+
+
+class DataSink:
+    """Replacement of data storage which only counts received sweeps and bins"""
+    def __init__(self):
+        self.tracer = LatencyTracer()
+        self.sweeps = 0
+        self.bins = 0
+
+    def update(self, data):
+        self.sweeps += 1
+        self.bins += len(data["y"])
+
+
+class Corpus:
+    """Recorded (or synthetic) output of backend process, split to items accepted by parse_output()"""
+    def __init__(self, backend, items, setup_params, name="synthetic"):
+        self.backend = backend
+        self.items = items
+        self.setup_params = setup_params
+        self.name = name
+
+    def create_power_thread(self):
+        """Create backend power thread set up to parse this corpus"""
+        power_thread = getattr(backends, self.backend).PowerThread(DataSink())
+        power_thread.setup(**self.setup_params)
+        return power_thread
+
+    def parse(self, power_thread):
+        """Feed all items of corpus to parser of power thread"""
+        parse_output = power_thread.parse_output
+        for item in self.items:
+            parse_output(item)
+
+    def count(self):
+        """Return number of sweeps and bins in corpus"""
+        power_thread = self.create_power_thread()
+        self.parse(power_thread)
+        return power_thread.data_storage.sweeps, power_thread.data_storage.bins
+
+
+def synthetic_corpus(backend, bins=10000, hops=10, sweeps=10, start_freq=87.0, sample_rate=2.56e6, seed=0):
+    """Generate output of backend process (in the same format as real backend would produce)"""
+    rng = np.random.RandomState(seed)
+    hop_bins = bins // hops
+    hop_bandwidth = sample_rate
+    stop_freq = start_freq + hops * hop_bandwidth / 1e6
+    step = hop_bandwidth / hop_bins
+    timestamp = datetime.datetime(2017, 1, 1)
+    setup_params = {
+        "start_freq": start_freq,
+        "stop_freq": stop_freq,
+        "bin_size": step / 1e3,
+        "interval": 0,
+        "sample_rate": sample_rate,
+    }
+    items = []
+
+    if backend in ("rtl_power", "rx_power"):
+        for sweep in range(sweeps):
+            date, time = str(timestamp + datetime.timedelta(seconds=sweep)).split()
+            for hop in range(hops):
+                hop_start = start_freq * 1e6 + hop * hop_bandwidth
+                y = rng.normal(-80, 3, size=hop_bins)
+                items.append("{}, {}, {:d}, {:d}, {:.2f}, {:d}, {}\n".format(
+                    date, time, int(hop_start), int(hop_start + hop_bandwidth), step, 16,
+                    ", ".join("{:.2f}".format(v) for v in y)
+                ))
+
+    elif backend == "rtl_power_fftw":
+        setup_params["bin_size"] = sample_rate / hop_bins / 1e3
+        power_thread = backends.rtl_power_fftw.PowerThread(DataSink())
+        power_thread.setup(**setup_params)
+        for sweep in range(sweeps):
+            for hop, (hop_start, hop_stop) in enumerate(power_thread.freqs):
+                items.append("# Acquisition start: {} UTC\n".format(timestamp + datetime.timedelta(seconds=sweep)))
+                items.append("# Acquisition end: {} UTC\n".format(timestamp + datetime.timedelta(seconds=sweep)))
+                items.append("#\n")
+                y = rng.normal(-80, 3, size=power_thread.params["bins"])
+                freqs = np.linspace(hop_start, hop_stop, power_thread.params["bins"])
+                items.extend("{:.0f} {:.4f}\n".format(f, v) for f, v in zip(freqs, y))
+                items.append("\n")
+            items.append("\n")
+
+    elif backend == "hackrf_sweep":
+        # hackrf_sweep outputs records with 5 MHz wide blocks of bins
+        setup_params["sample_rate"] = 20e6
+        setup_params["stop_freq"] = start_freq + hops * 20
+        block_bandwidth = 5e6
+        block_bins = max(bins // (hops * 4), 1)
+        setup_params["bin_size"] = block_bandwidth / block_bins / 1e3
+        for sweep in range(sweeps):
+            for block in range(hops * 4):
+                low_edge = int(start_freq * 1e6 + block * block_bandwidth)
+                y = rng.normal(-80, 3, size=block_bins).astype('<f4')
+                items.append(struct.pack('QQ', low_edge, int(low_edge + block_bandwidth)) + y.tobytes())
+
+    elif backend == "soapy_power":
+        formatter = backends.soapy_power.get_formatter()
+        f = io.BytesIO()
+        for sweep in range(sweeps):
+            for hop in range(hops):
+                hop_start = start_freq * 1e6 + hop * hop_bandwidth
+                y = rng.normal(-80, 3, size=hop_bins).astype(np.float32)
+                formatter.write(f, sweep, sweep, hop_start, hop_start + hop_bandwidth, step, 16, y)
+        f.seek(0)
+        items = read_soapy_power_corpus(f)
+
+    else:
+        raise ValueError("Unknown backend: {}".format(backend))
+
+    return Corpus(backend, items, setup_params)
+
+
+def read_soapy_power_corpus(f):
+    """Read all records from soapy_power binary output"""
+    formatter = backends.soapy_power.get_formatter()
+    items = []
+    while True:
+        data = formatter.read(f)
+        if not data:
+            return items
+        items.append(data)
+
+
+def read_hackrf_sweep_corpus(f):
+    """Read all records from hackrf_sweep binary output (every record is prefixed by its length)"""
+    items = []
+    while True:
+        buf = f.read(4)
+        if len(buf) < 4:
+            return items
+        (record_length,) = struct.unpack('I', buf)
+        items.append(f.read(record_length))
+
+
+def load_corpus(backend, filename, setup_params):
+    """Load corpus from recorded output of backend process"""
+    if backend == "soapy_power":
+        with open(filename, 'rb') as f:
+            items = read_soapy_power_corpus(f)
+    elif backend == "hackrf_sweep":
+        with open(filename, 'rb') as f:
+            items = read_hackrf_sweep_corpus(f)
+    else:
+        with open(filename) as f:
+            items = f.readlines()
+    return Corpus(backend, items, setup_params, name=os.path.basename(filename))
+
+
+def find_corpora(directory, setup_params):
+    """Find recorded corpora in directory (files named by backend, e.g. rtl_power.txt or soapy_power.bin)"""
+    corpora = []
+    for backend in parser_backends:
+        for filename in sorted(glob.glob(os.path.join(directory, "{}.*".format(backend)))):
+            corpora.append(load_corpus(backend, filename, setup_params))
+    return corpora
+
+
+def benchmark_corpus(runner, corpus):
+    """Benchmark parsing of whole corpus by backend parser"""
+    sweeps, bins = corpus.count()
+    if not sweeps:
+        print("{}: no complete sweeps parsed from {} corpus".format(corpus.backend, corpus.name))
+        return
+
+    power_thread = corpus.create_power_thread()
+    runner.run("{}.parse_output[{},{:d}]".format(corpus.backend, corpus.name, bins // sweeps),
+               lambda: corpus.parse(power_thread), bins=bins, ops=sweeps,
+               backend=corpus.backend, corpus=corpus.name, sweeps=sweeps, bins_per_sweep=bins // sweeps)
+
+
+def benchmark_stitcher(runner, bins, segments):
+    """Benchmark stitching of sweeps of multiple devices (synthetic sub-backend output) to one sweep"""
+    stitcher = backends.multi.SweepStitcher(segments)
+    sweeps = []
+    for segment in range(segments):
+        corpus = synthetic_corpus("rtl_power", bins=bins // segments, hops=1, sweeps=1,
+                                  start_freq=87.0 + segment * 2.56, seed=segment)
+        power_thread = corpus.create_power_thread()
+        power_thread.data_storage.update = sweeps.append
+        corpus.parse(power_thread)
+
+    def stitch():
+        for segment, data in enumerate(sweeps):
+            stitcher.update(segment, data)
+
+    runner.run("multi.stitch[{:d}x{:d}]".format(segments, bins), stitch, bins=bins,
+               backend="multi", segments=segments, bins_per_sweep=bins)
+
+
+def main():
+    parser = create_parser("qspectrumanalyzer.benchmarks.backends",
+                           "Benchmark of backend output parsers")
+    parser.add_argument("-b", "--bins", metavar="BINS", type=int, action="append",
+                        help="number of bins per synthetic sweep (can be repeated, default: 1000, 10000, 100000)")
+    parser.add_argument("--hops", type=int, default=10,
+                        help="number of hops per synthetic sweep (default: %(default)s)")
+    parser.add_argument("--sweeps", type=int, default=10,
+                        help="number of sweeps in synthetic corpus (default: %(default)s)")
+    parser.add_argument("--corpus-dir", metavar="DIR",
+                        help="directory with recorded backend output (files named by backend, "
+                             "e.g. rtl_power.txt, hackrf_sweep.bin or soapy_power.bin)")
+    parser.add_argument("-f", "--freq", metavar="START:STOP", default="87:108",
+                        help="frequency range of recorded corpora in MHz (default: %(default)s)")
+    parser.add_argument("-B", "--bin-size", metavar="KHZ", type=float, default=10.0,
+                        help="bin size of recorded corpora in kHz (default: %(default)s)")
+    parser.add_argument("--backend", choices=parser_backends + ["multi"], action="append",
+                        help="benchmark only given backend (can be repeated)")
+    args = parser.parse_args()
+
+    def benchmarks(runner):
+        if args.corpus_dir:
+            start_freq, stop_freq = [float(f) for f in args.freq.split(":")]
+            corpora = find_corpora(args.corpus_dir, {"start_freq": start_freq, "stop_freq": stop_freq,
+                                                     "bin_size": args.bin_size, "interval": 0})
+        else:
+            corpora = [synthetic_corpus(backend, bins=bins, hops=args.hops, sweeps=args.sweeps)
+                       for bins in args.bins or [1000, 10000, 100000]
+                       for backend in parser_backends]
+
+        for corpus in corpora:
+            if not args.backend or corpus.backend in args.backend:
+                benchmark_corpus(runner, corpus)
+
+        if not args.corpus_dir and (not args.backend or "multi" in args.backend):
+            for bins in args.bins or [1000, 10000, 100000]:
+                benchmark_stitcher(runner, bins, segments=4)
+
+    run_suite("backends", args, benchmarks)
+
+
+if __name__ == "__main__":
+    main()
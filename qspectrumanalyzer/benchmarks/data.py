@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+
+import numpy as np
+
+from qspectrumanalyzer.benchmarks import create_parser, run_suite
+from qspectrumanalyzer.data import HistoryBuffer, QuantizedHistoryBuffer, DataStorage
+from qspectrumanalyzer.chunks import ChunkExecutor
+from qspectrumanalyzer.grid import FrequencyGrid, Rebinner
+from qspectrumanalyzer.utils import smooth, smooth_windows
+
+
+def generate_sweep(bins, seed=0):
+    """Generate synthetic sweep (noise floor with few peaks)"""
+    rng = np.random.RandomState(seed)
+    y = rng.normal(-80, 3, size=bins)
+    for i in rng.randint(0, bins, size=10):
+        y[max(i - 5, 0):i + 5] += 40
+    return {"x": np.linspace(87e6, 108e6, bins), "y": y, "trace": {}}
+
+
+def synchronous_data_storage(max_history_size, dtype=np.float64, history_storage="full", processing_threads=1):
+    """Create data storage which runs all tasks immediately in current thread"""
+    data_storage = DataStorage(max_history_size=max_history_size, dtype=dtype, history_storage=history_storage,
+                               processing_threads=processing_threads)
+    data_storage.start_task = lambda fn, *args, priority="data", **kwargs: fn(*args, **kwargs)
+    return data_storage
+
+
+def isolated_data_storage(max_history_size, data, dtype=np.float64, history_storage="full", processing_threads=1):
+    """Create data storage filled with data, which doesn't start any follow-up tasks
+
+    Used for benchmarking of every processing step separately.
+    """
+    data_storage = DataStorage(max_history_size=max_history_size, dtype=dtype, history_storage=history_storage,
+                               processing_threads=processing_threads)
+    data_storage.start_task = lambda fn, *args, priority="data", **kwargs: None
+    data_storage.update(dict(data))
+    for i in range(max_history_size):
+        data_storage.update_history(dict(data))
+    data_storage.update_data(dict(data))
+    data_storage.update_average(dict(data))
+    data_storage.update_peak_hold_max(dict(data))
+    data_storage.update_peak_hold_min(dict(data))
+    return data_storage
+
+
+def benchmark_history_buffer(runner, bins, history_size, dtype, history_storage="full", processing_threads=1):
+    """Benchmark appending of sweeps to ring buffer (and reading of whole buffer)"""
+    data = generate_sweep(bins)
+    executor = ChunkExecutor(processing_threads)
+    if history_storage == "full":
+        history = HistoryBuffer(bins, history_size, dtype=dtype, executor=executor)
+    else:
+        history = QuantizedHistoryBuffer(bins, history_size, dtype=dtype, code_dtype=history_storage,
+                                         executor=executor)
+    params = {"bins_per_sweep": bins, "history_size": history_size, "dtype": dtype,
+              "history_storage": history_storage, "processing_threads": processing_threads}
+    suffix = "[{:d}x{:d},{},{},{:d}]".format(bins, history_size, dtype, history_storage, processing_threads)
+
+    runner.run("{}.append{}".format(history.__class__.__name__, suffix),
+               lambda: history.append(data["y"]), bins=bins, **params)
+    runner.run("{}.get_buffer{}".format(history.__class__.__name__, suffix),
+               history.get_buffer, bins=bins * history_size, **params)
+    executor.shutdown()
+
+
+def benchmark_data_storage(runner, bins, history_size, dtype, history_storage="full", processing_threads=1):
+    """Benchmark every step of data storage processing (and whole pipeline)"""
+    data = generate_sweep(bins)
+    params = {"bins_per_sweep": bins, "history_size": history_size, "dtype": dtype,
+              "history_storage": history_storage, "processing_threads": processing_threads}
+    suffix = "[{:d}x{:d},{},{},{:d}]".format(bins, history_size, dtype, history_storage, processing_threads)
+
+    data_storage = isolated_data_storage(history_size, data, dtype=dtype, history_storage=history_storage,
+                                         processing_threads=processing_threads)
+    for step in ("update", "update_history", "update_data", "update_average",
+                 "update_peak_hold_max", "update_peak_hold_min"):
+        fn = getattr(data_storage, step)
+        runner.run("DataStorage.{}{}".format(step, suffix), lambda: fn(dict(data)), bins=bins, **params)
+
+    # Recalculation from history (derived traces have to be enabled, otherwise only last sweep is copied)
+    for name in data_storage.derived_traces:
+        data_storage.set_trace_enabled(name, True)
+    runner.run("DataStorage.recalculate_data[traces]{}".format(suffix), data_storage.recalculate_data,
+               bins=bins * history_size, **params)
+    for name in data_storage.derived_traces:
+        data_storage.set_trace_enabled(name, False)
+
+    data_storage.set_smooth(True, 11, "hanning")
+    runner.run("DataStorage.update_data[smooth]{}".format(suffix), lambda: data_storage.update_data(dict(data)),
+               bins=bins, **params)
+    data_storage.close()
+
+    # Whole pipeline (all steps run synchronously)
+    data_storage = synchronous_data_storage(history_size, dtype=dtype, history_storage=history_storage,
+                                            processing_threads=processing_threads)
+    runner.run("DataStorage.pipeline{}".format(suffix), lambda: data_storage.update(dict(data)),
+               bins=bins, **params)
+
+    # Whole pipeline with all derived traces enabled (and their backfill from history)
+    for name in data_storage.derived_traces:
+        data_storage.set_trace_enabled(name, True)
+    runner.run("DataStorage.pipeline[traces]{}".format(suffix), lambda: data_storage.update(dict(data)),
+               bins=bins, **params)
+    runner.run("DataStorage.schedule_recalculation[traces]{}".format(suffix),
+               lambda: data_storage.schedule_recalculation(names=data_storage.derived_traces),
+               bins=bins * history_size, **params)
+    data_storage.close()
+
+    # Whole pipeline (with worker thread)
+    data_storage = DataStorage(max_history_size=history_size, dtype=dtype, history_storage=history_storage,
+                               processing_threads=processing_threads)
+
+    def threaded_pipeline():
+        data_storage.update(dict(data))
+        data_storage.wait()
+
+    runner.run("DataStorage.pipeline_threaded{}".format(suffix), threaded_pipeline, bins=bins, **params)
+    data_storage.close()
+
+
+def benchmark_rebin(runner, bins, factor=16):
+    """Benchmark rebinning of sweeps with all reducers"""
+    data = generate_sweep(bins)
+    data["grid"] = FrequencyGrid(data["x"])
+    for reducer in Rebinner.reducers:
+        rebinner = Rebinner(data["grid"].bin_width * factor, reducer)
+        runner.run("Rebinner.rebin[{:d},{:d},{}]".format(bins, factor, reducer), lambda: rebinner.rebin(data),
+                   bins=bins, bins_per_sweep=bins, factor=factor, reducer=reducer)
+
+
+def benchmark_smooth(runner, bins, window_lengths, windows):
+    """Benchmark smoothing with all windows and window sizes"""
+    y = generate_sweep(bins)["y"]
+    out = np.empty_like(y)
+    for window in windows:
+        for window_len in window_lengths:
+            # smooth() needs input longer than window
+            if window_len >= bins:
+                continue
+            runner.run("smooth[{:d},{},{:d}]".format(bins, window, window_len),
+                       lambda: smooth(y, window_len=window_len, window=window, out=out),
+                       bins=bins, bins_per_sweep=bins, window=window, window_len=window_len)
+
+
+def main():
+    parser = create_parser("qspectrumanalyzer.benchmarks.data",
+                           "Benchmark of data storage processing steps and smoothing")
+    parser.add_argument("-b", "--bins", metavar="BINS", type=int, action="append",
+                        help="number of bins per sweep (can be repeated, default: 1000, 10000, 100000)")
+    parser.add_argument("-H", "--history-size", metavar="SWEEPS", type=int, default=100,
+                        help="number of sweeps in history (default: %(default)s)")
+    parser.add_argument("-p", "--precision", choices=["float64", "float32"], action="append",
+                        help="floating point precision of data storage (can be repeated, default: both)")
+    parser.add_argument("-S", "--history-storage", choices=["full", "int16", "uint8"], action="append",
+                        help="storage of history (can be repeated, default: full)")
+    parser.add_argument("-j", "--processing-threads", metavar="THREADS", type=int, action="append",
+                        help="number of threads processing chunks of sweeps (can be repeated, "
+                             "0 for number of CPU cores, default: 1)")
+    parser.add_argument("-w", "--window-len", metavar="BINS", type=int, action="append",
+                        help="smoothing window length (can be repeated, default: 5, 11, 51, 201, 1001)")
+    args = parser.parse_args()
+
+    def benchmarks(runner):
+        for bins in args.bins or [1000, 10000, 100000]:
+            for dtype in args.precision or ["float64", "float32"]:
+                for history_storage in args.history_storage or ["full"]:
+                    for threads in args.processing_threads or [1]:
+                        benchmark_history_buffer(runner, bins, args.history_size, dtype, history_storage, threads)
+                        benchmark_data_storage(runner, bins, args.history_size, dtype, history_storage, threads)
+            benchmark_rebin(runner, bins)
+            benchmark_smooth(runner, bins, args.window_len or [5, 11, 51, 201, 1001], smooth_windows)
+
+    run_suite("data", args, benchmarks)
+
+
+if __name__ == "__main__":
+    main()
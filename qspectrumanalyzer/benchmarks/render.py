@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+
+import os, sys, itertools
+
+# Render plots offscreen (unless other Qt platform is explicitly requested)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from Qt import QtWidgets
+import pyqtgraph as pg
+
+from qspectrumanalyzer.benchmarks import create_parser, run_suite
+from qspectrumanalyzer.benchmarks.data import generate_sweep, synchronous_data_storage
+from qspectrumanalyzer.plot import SpectrumPlotWidget, WaterfallPlotWidget
+
+# Features which can be enabled in benchmarked plots
+features = ("persistence", "peak_hold", "average", "waterfall")
+
+# Default combinations of features ("main" is main curve only)
+default_combinations = ("main", "persistence", "peak_hold", "average", "waterfall",
+                        "peak_hold+average", "persistence+waterfall", "persistence+peak_hold+average+waterfall")
+
+
+class RenderBenchmark:
+    """Real plot widgets fed with synthetic sweeps and rendered offscreen"""
+    def __init__(self, combination, bins=10000, history_size=100, width=1280, height=720, sweeps=16,
+                 history_storage="full"):
+        self.combination = combination
+        self.enabled = set(combination.split("+")) - {"main"}
+        unknown = self.enabled - set(features)
+        if unknown:
+            raise ValueError("Unknown plot features: {}".format(", ".join(sorted(unknown))))
+
+        self.bins = bins
+        self.sweeps = [generate_sweep(bins, seed=i) for i in range(sweeps)]
+        self.sweeps_cycle = itertools.cycle(self.sweeps)
+
+        # Create plot widgets with the same layout as in main window
+        self.window = QtWidgets.QWidget()
+        self.window.resize(width, height)
+        layout = QtWidgets.QVBoxLayout(self.window)
+        self.main_layout = pg.GraphicsLayoutWidget()
+        layout.addWidget(self.main_layout)
+        self.spectrum = SpectrumPlotWidget(self.main_layout)
+        self.spectrum.persistence = "persistence" in self.enabled
+        self.spectrum.peak_hold_max = "peak_hold" in self.enabled
+        self.spectrum.peak_hold_min = "peak_hold" in self.enabled
+        self.spectrum.average = "average" in self.enabled
+
+        self.data_storage = synchronous_data_storage(history_size, history_storage=history_storage)
+        self.data_storage.set_trace_enabled("peak_hold_max", "peak_hold" in self.enabled)
+        self.data_storage.set_trace_enabled("peak_hold_min", "peak_hold" in self.enabled)
+        self.data_storage.set_trace_enabled("average", "average" in self.enabled)
+        self.data_storage.data_updated.connect(self.spectrum.update_plot)
+        self.data_storage.data_updated.connect(self.spectrum.update_persistence)
+        self.data_storage.average_updated.connect(self.spectrum.update_average)
+        self.data_storage.peak_hold_max_updated.connect(self.spectrum.update_peak_hold_max)
+        self.data_storage.peak_hold_min_updated.connect(self.spectrum.update_peak_hold_min)
+
+        self.waterfall = None
+        if "waterfall" in self.enabled:
+            self.waterfall_layout = pg.GraphicsLayoutWidget()
+            self.histogram_layout = pg.GraphicsLayoutWidget()
+            waterfall_row = QtWidgets.QHBoxLayout()
+            waterfall_row.addWidget(self.waterfall_layout)
+            waterfall_row.addWidget(self.histogram_layout)
+            layout.addLayout(waterfall_row)
+            self.waterfall = WaterfallPlotWidget(self.waterfall_layout, self.histogram_layout)
+            self.waterfall.history_size = history_size
+            self.spectrum.plot.setXLink(self.waterfall.plot)
+            self.data_storage.history_updated.connect(self.waterfall.update_plot)
+
+        self.window.show()
+
+        # Fill history (so that waterfall and persistence are drawn in full size)
+        for i in range(history_size):
+            self.update()
+        self.render()
+
+    def update(self):
+        """Pass next sweep to data storage (plots are updated synchronously)"""
+        self.data_storage.update(dict(next(self.sweeps_cycle)))
+
+    def render(self):
+        """Render all plots (paint them to pixmap)"""
+        QtWidgets.QApplication.processEvents()
+        self.window.grab()
+
+    def frame(self):
+        """Update plots with one sweep and render them"""
+        self.update()
+        self.render()
+
+    def close(self):
+        """Close plot widgets"""
+        self.window.close()
+        self.window.deleteLater()
+        QtWidgets.QApplication.processEvents()
+
+
+def benchmark_render(runner, combination, bins, history_size, width, height, history_storage="full"):
+    """Benchmark frame time (update and rendering of plots) with given combination of features"""
+    benchmark = RenderBenchmark(combination, bins=bins, history_size=history_size, width=width, height=height,
+                                history_storage=history_storage)
+    params = {"combination": combination, "bins_per_sweep": bins, "history_size": history_size,
+              "width": width, "height": height, "history_storage": history_storage}
+    suffix = "[{},{:d}x{:d},{:d}x{:d},{}]".format(combination, bins, history_size, width, height, history_storage)
+
+    runner.run("render.frame{}".format(suffix), benchmark.frame, bins=bins, **params)
+    runner.run("render.paint{}".format(suffix), benchmark.render, bins=bins, **params)
+    benchmark.close()
+
+
+def main():
+    parser = create_parser("qspectrumanalyzer.benchmarks.render",
+                           "Benchmark of spectrum and waterfall plot rendering (in offscreen Qt platform)")
+    parser.add_argument("-b", "--bins", metavar="BINS", type=int, action="append",
+                        help="number of bins per sweep (can be repeated, default: 1000, 10000, 100000)")
+    parser.add_argument("-H", "--history-size", metavar="SWEEPS", type=int, action="append",
+                        help="number of sweeps in waterfall (can be repeated, default: 100)")
+    parser.add_argument("-S", "--history-storage", choices=["full", "int16", "uint8"], action="append",
+                        help="storage of waterfall history (can be repeated, default: full)")
+    parser.add_argument("-s", "--size", metavar="WIDTHxHEIGHT", default="1280x720",
+                        help="size of plot window (default: %(default)s)")
+    parser.add_argument("-C", "--combination", metavar="FEATURES", action="append",
+                        help="enabled plot features joined by '+' (can be repeated, "
+                             "features: main, {}, default: every feature alone and some of their "
+                             "combinations)".format(", ".join(features)))
+    args = parser.parse_args()
+
+    try:
+        width, height = [int(v) for v in args.size.lower().split("x")]
+    except ValueError:
+        parser.error("invalid plot window size: {}".format(args.size))
+
+    app = QtWidgets.QApplication(sys.argv[:1])
+
+    def benchmarks(runner):
+        for bins in args.bins or [1000, 10000, 100000]:
+            for history_size in args.history_size or [100]:
+                for history_storage in args.history_storage or ["full"]:
+                    for combination in args.combination or default_combinations:
+                        benchmark_render(runner, combination, bins, history_size, width, height, history_storage)
+
+    run_suite("render", args, benchmarks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from qspectrumanalyzer.utils import smooth
+
+
+class ChunkExecutor:
+    """Split frequency axis to chunks and process them concurrently in worker threads
+
+    NumPy releases GIL in array operations, so chunks of very wide sweeps are processed
+    on multiple cores at once. Sweeps smaller than min_chunk_size bins (or all sweeps
+    if there is only one worker) are processed directly in calling thread.
+    """
+    min_chunk_size = 2**16
+
+    def __init__(self, workers=1):
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.executor = None
+        if self.workers > 1:
+            self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="qspectrumanalyzer-chunk")
+
+    def chunks(self, size):
+        """Return list of slices which split axis of given size to chunks"""
+        count = min(self.workers, size // self.min_chunk_size) if self.executor else 1
+        if count <= 1:
+            return [slice(0, size)]
+        edges = [size * i // count for i in range(count + 1)]
+        return [slice(start, stop) for start, stop in zip(edges[:-1], edges[1:])]
+
+    def map(self, fn, size):
+        """Call fn(chunk) for every chunk (slice of last axis) and wait until all chunks are done"""
+        chunks = self.chunks(size)
+        if len(chunks) == 1:
+            fn(chunks[0])
+        else:
+            # Consume results so that exceptions from worker threads are raised here
+            for _ in self.executor.map(fn, chunks):
+                pass
+
+    def apply(self, ufunc, *args, out, **kwargs):
+        """Apply NumPy ufunc to chunks of arrays (scalars are passed whole), result is written to out"""
+        def run(chunk):
+            ufunc(*[a[..., chunk] if isinstance(a, np.ndarray) else a for a in args],
+                  out=out[..., chunk], **kwargs)
+        self.map(run, out.shape[-1])
+        return out
+
+    def copy(self, src, out):
+        """Copy array to out array in chunks"""
+        def run(chunk):
+            out[..., chunk] = src[..., chunk]
+        self.map(run, out.shape[-1])
+        return out
+
+    def smooth(self, x, window_len=11, window='hanning', out=None):
+        """Smooth 1D signal in chunks (every chunk is extended by window length on both sides,
+        so that result is the same as if whole signal was smoothed at once)"""
+        if out is None:
+            out = np.empty(x.size, dtype=x.dtype if x.dtype.kind == 'f' else np.float64)
+
+        def run(chunk):
+            start = max(chunk.start - window_len, 0)
+            stop = min(chunk.stop + window_len, x.size)
+            if start == 0 and stop == x.size:
+                smooth(x, window_len=window_len, window=window, out=out[chunk])
+                return
+            y = smooth(x[start:stop], window_len=window_len, window=window)
+            out[chunk] = y[chunk.start - start:chunk.stop - start]
+        self.map(run, x.size)
+        return out
+
+    def shutdown(self):
+        """Stop worker threads"""
+        if self.executor:
+            self.executor.shutdown()
+            self.executor = None
@@ -1,28 +1,62 @@
-import time, sys, os
+import time, os, threading
 
 from Qt import QtCore
 import numpy as np
 
-from qspectrumanalyzer.utils import smooth
-from qspectrumanalyzer.backends import soapy_power
+from qspectrumanalyzer import profiler
+from qspectrumanalyzer.grid import FrequencyGrid, GridResampler, Rebinner
+from qspectrumanalyzer.chunks import ChunkExecutor
+from qspectrumanalyzer.latency import LatencyTracer
 
 
 class HistoryBuffer:
     """Fixed-size NumPy array ring buffer"""
-    def __init__(self, data_size, max_history_size, dtype=float):
+    # Values in buffer are stored directly (value = buffer * scale + offset)
+    scale = 1.0
+    offset = 0.0
+
+    def __init__(self, data_size, max_history_size, dtype=float, executor=None, allocate=None):
         self.data_size = data_size
         self.max_history_size = max_history_size
         self.history_size = 0
         self.counter = 0
-        self.buffer = np.empty(shape=(max_history_size, data_size), dtype=dtype)
+        self.executor = executor or ChunkExecutor()
+        self.allocate = allocate or np.empty
+        self.buffer = self.allocate((max_history_size, data_size), dtype)
 
     def append(self, data):
         """Append new data to ring buffer"""
         self.counter += 1
         if self.history_size < self.max_history_size:
             self.history_size += 1
-        self.buffer = np.roll(self.buffer, -1, axis=0)
-        self.buffer[-1] = data
+
+        # Rows are shifted to new buffer (columns are copied in chunks),
+        # so that previous buffer can still be read by other threads
+        buffer = self.allocate(self.buffer.shape, self.buffer.dtype)
+
+        def shift(chunk):
+            buffer[:-1, chunk] = self.buffer[1:, chunk]
+            buffer[-1, chunk] = data[chunk]
+        self.executor.map(shift, self.data_size)
+        self.buffer = buffer
+
+    def extend(self, rows):
+        """Append multiple rows of data to ring buffer at once"""
+        rows = rows[-self.max_history_size:]
+        count = len(rows)
+        if not count:
+            return
+        self.counter += count
+        self.history_size = min(self.history_size + count, self.max_history_size)
+
+        buffer = self.allocate(self.buffer.shape, self.buffer.dtype)
+
+        def shift(chunk):
+            if count < self.max_history_size:
+                buffer[:-count, chunk] = self.buffer[count:, chunk]
+            buffer[-count:, chunk] = rows[:, chunk]
+        self.executor.map(shift, self.data_size)
+        self.buffer = buffer
 
     def get_buffer(self):
         """Return buffer stripped to size of actual data"""
@@ -31,10 +65,275 @@ class HistoryBuffer:
         else:
             return self.buffer
 
+    def add(self, data):
+        """Add data to all rows in buffer (e.g. to subtract baseline), result is written to new buffer"""
+        buffer = self.allocate(self.buffer.shape, self.buffer.dtype)
+        if self.history_size:
+            self.executor.apply(np.add, self.get_buffer(), data, out=buffer[-self.history_size:])
+        self.buffer = buffer
+
+    def decode(self, values):
+        """Convert stored values to data (values are stored directly)"""
+        return values
+
     def __getitem__(self, key):
         return self.buffer[key]
 
 
+class QuantizedHistoryBuffer(HistoryBuffer):
+    """Compact ring buffer which stores data as 8-bit or 16-bit integer codes
+
+    Values from value_min to value_max are mapped linearly to full range of code_dtype
+    (value = code * scale + offset), values outside of this range are clipped.
+    Data are decoded only when they are read (buffer attribute contains raw codes).
+    """
+    def __init__(self, data_size, max_history_size, dtype=float, code_dtype=np.int16,
+                 value_min=-150.0, value_max=50.0, executor=None, allocate=None):
+        if value_max <= value_min:
+            raise ValueError("value_max must be greater than value_min")
+
+        super().__init__(data_size, max_history_size, dtype=code_dtype, executor=executor, allocate=allocate)
+        self.dtype = np.dtype(dtype)
+        info = np.iinfo(code_dtype)
+        self.code_min = info.min
+        self.code_max = info.max
+        self.scale = (value_max - value_min) / (info.max - info.min)
+        self.offset = value_min - info.min * self.scale
+
+    def encode(self, data):
+        """Convert values to integer codes"""
+        data = np.asarray(data)
+        codes = np.empty(data.shape, dtype=self.buffer.dtype)
+
+        def encode_chunk(chunk):
+            values = np.subtract(data[..., chunk], self.offset, dtype=self.dtype)
+            values /= self.scale
+            np.rint(values, out=values)
+            np.clip(values, self.code_min, self.code_max, out=values)
+            codes[..., chunk] = values
+        self.executor.map(encode_chunk, data.shape[-1])
+        return codes
+
+    def decode(self, codes):
+        """Convert integer codes to values"""
+        data = codes.astype(self.dtype)
+        data *= self.scale
+        data += self.offset
+        return data
+
+    def append(self, data):
+        """Append new data to ring buffer"""
+        super().append(self.encode(data))
+
+    def extend(self, rows):
+        """Append multiple rows of data to ring buffer at once"""
+        super().extend(self.encode(rows[-self.max_history_size:]))
+
+    def get_buffer(self):
+        """Return decoded buffer stripped to size of actual data"""
+        return self.decode(super().get_buffer())
+
+    def add(self, data):
+        """Add data to all rows in buffer (e.g. to subtract baseline), result is written to new buffer"""
+        buffer = self.allocate(self.buffer.shape, self.buffer.dtype)
+        if self.history_size:
+            buffer[-self.history_size:] = self.encode(self.get_buffer() + data)
+        self.buffer = buffer
+
+    def __getitem__(self, key):
+        return self.decode(self.buffer[key])
+
+
+class Frame:
+    """Immutable snapshot of processed data published by worker thread (all arrays are read-only)"""
+    def __init__(self, sequence, grid, updated, trace=None, history_trace=None, y=None, average=None,
+                 average_counter=0, peak_hold_max=None, peak_hold_min=None, history=None, history_scale=1.0,
+                 history_offset=0.0):
+        self.sequence = sequence
+        self.grid = grid
+        self.x = grid.x if grid is not None else None
+        self.updated = frozenset(updated)
+        self.trace = trace
+        self.history_trace = history_trace
+        self.y = self.read_only(y)
+        self.average = self.read_only(average)
+        self.average_counter = average_counter
+        self.peak_hold_max = self.read_only(peak_hold_max)
+        self.peak_hold_min = self.read_only(peak_hold_min)
+        self.history = self.read_only(history)
+        self.history_size = len(history) if history is not None else 0
+        self.history_scale = history_scale
+        self.history_offset = history_offset
+
+    @staticmethod
+    def read_only(array):
+        """Return read-only view of array"""
+        if array is None:
+            return None
+        view = array.view()
+        view.flags.writeable = False
+        return view
+
+    def arrays(self):
+        """Return base arrays of all views in frame"""
+        return [a.base if a.base is not None else a
+                for a in (self.y, self.average, self.peak_hold_max, self.peak_hold_min, self.history)
+                if a is not None]
+
+
+class FrameBuffer:
+    """Triple buffer of frames passed from worker thread to GUI thread
+
+    Worker publishes new frame as pending frame, GUI takes pending frame as front frame
+    (older pending frames which GUI didn't take are dropped). Arrays are allocated from pool
+    and reused only when they are not referenced by front or pending frame (or by frame which
+    is being prepared), so GUI never sees frame which is being written and nothing is copied.
+    Signals of frames are merged too, so one signal can stand for several sweeps.
+    """
+    # Pools grown by pinned arrays are shrunk back to this size when arrays are unpinned
+    max_pool_size = 4
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop all frames and arrays"""
+        with self.lock:
+            self.pools = {}
+            self.current = {}
+            self.pinned = []
+            self.pending = None
+            self.front = None
+            self.sequence = 0
+
+    def array(self, name, shape, dtype):
+        """Return writable array (for frame which is being prepared)"""
+        shape = tuple(shape) if np.ndim(shape) else (shape,)
+        dtype = np.dtype(dtype)
+        with self.lock:
+            busy = self.busy_arrays()
+            pool = [a for a in self.pools.get(name, []) if a.shape == shape and a.dtype == dtype]
+            array = next((a for a in pool if id(a) not in busy), None)
+            if array is None:
+                array = np.empty(shape, dtype=dtype)
+                pool.append(array)
+            self.pools[name] = pool
+            self.current[name] = array
+            return array
+
+    def busy_arrays(self):
+        """Return ids of arrays which can't be reused (lock must be held)"""
+        busy = {id(a) for a in self.current.values()}
+        busy.update(id(a) for a in self.pinned)
+        for frame in (self.pending, self.front):
+            if frame is not None:
+                busy.update(id(a) for a in frame.arrays())
+        return busy
+
+    def pin(self, array):
+        """Don't reuse array until it is unpinned (e.g. while it is read by long running task)"""
+        with self.lock:
+            self.pinned.append(array)
+
+    def unpin(self, array):
+        """Allow reuse of pinned array"""
+        with self.lock:
+            self.pinned = [a for a in self.pinned if a is not array]
+            busy = self.busy_arrays()
+            for name, pool in self.pools.items():
+                if len(pool) > self.max_pool_size and id(array) not in busy:
+                    self.pools[name] = [a for a in pool if a is not array]
+
+    def publish(self, **kwargs):
+        """Publish new frame (signals of previous pending frame which GUI didn't take are merged to it)"""
+        with self.lock:
+            updated = set(kwargs.pop("updated"))
+            if self.pending is not None:
+                updated |= self.pending.updated
+            self.sequence += 1
+            self.pending = Frame(self.sequence, updated=updated, **kwargs)
+            return self.pending
+
+    def acquire(self):
+        """Take pending frame as front frame (None if there is no new frame)"""
+        with self.lock:
+            if self.pending is None:
+                return None
+            self.front, self.pending = self.pending, None
+            return self.front
+
+
+class Recalculation:
+    """Progress of recalculation of derived traces from history
+
+    Sweeps are processed from newest to oldest in short steps, so that live sweeps can be processed
+    between them. Sweeps appended to history in the meantime are added in the last step and oldest
+    sweeps which were pushed out of history (or which were kept from previous measurement, i.e.
+    appended before first_counter) are skipped. Every row of history can be reduced from several
+    sweeps (weight).
+    """
+    def __init__(self, generation, names, data, history, first_counter=0):
+        self.generation = generation
+        self.names = set(names)
+        self.data = data
+        self.history = history
+        self.snapshot = history.buffer
+        self.size = history.history_size
+        self.counter = history.counter
+        self.first_counter = first_counter
+        self.next_row = history.history_size
+        self.rows = 0
+        self.weight = 1
+        self.average_sum = None
+        self.peak_hold_max = None
+        self.peak_hold_min = None
+
+    def dropped(self):
+        """Return number of oldest sweeps in snapshot which are not in history anymore (or are skipped)"""
+        appended = self.history.counter - self.counter
+        previous = min(self.size, max(0, self.first_counter - self.counter + self.size))
+        return max(0, self.size + appended - self.history.max_history_size, previous)
+
+    def rows_slice(self, start, stop):
+        """Return sweeps from snapshot (indexes are relative to oldest sweep)"""
+        offset = len(self.snapshot) - self.size
+        return self.history.decode(self.snapshot[offset + start:offset + stop])
+
+    def accumulate(self, rows, executor):
+        """Add sweeps (rows of 2D array) to derived traces"""
+        first = self.rows == 0
+        if first:
+            size = rows.shape[1]
+            if "average" in self.names:
+                self.average_sum = np.empty(size, dtype=np.float64)
+            if "peak_hold_max" in self.names:
+                self.peak_hold_max = np.empty(size, dtype=rows.dtype)
+            if "peak_hold_min" in self.names:
+                self.peak_hold_min = np.empty(size, dtype=rows.dtype)
+
+        # Columns are reduced in chunks
+        def reduce_chunk(chunk):
+            block = rows[:, chunk]
+            if self.average_sum is not None:
+                if first:
+                    block.sum(axis=0, dtype=np.float64, out=self.average_sum[chunk])
+                else:
+                    self.average_sum[chunk] += block.sum(axis=0, dtype=np.float64)
+            if self.peak_hold_max is not None:
+                if first:
+                    block.max(axis=0, out=self.peak_hold_max[chunk])
+                else:
+                    np.maximum(self.peak_hold_max[chunk], block.max(axis=0), out=self.peak_hold_max[chunk])
+            if self.peak_hold_min is not None:
+                if first:
+                    block.min(axis=0, out=self.peak_hold_min[chunk])
+                else:
+                    np.minimum(self.peak_hold_min[chunk], block.min(axis=0), out=self.peak_hold_min[chunk])
+        executor.map(reduce_chunk, rows.shape[1])
+        self.rows += len(rows)
+
+
 class TaskSignals(QtCore.QObject):
     """Task signals emitter"""
     result = QtCore.Signal(object)
@@ -66,10 +365,43 @@ class DataStorage(QtCore.QObject):
     baseline_updated = QtCore.Signal(object)
     peak_hold_max_updated = QtCore.Signal(object)
     peak_hold_min_updated = QtCore.Signal(object)
+    frame_published = QtCore.Signal()
+
+    # Traces derived from all sweeps (computed only while they have some consumer)
+    derived_traces = ("average", "peak_hold_max", "peak_hold_min")
+
+    # Priorities of worker tasks (tasks with higher priority run first, tasks with the same priority in FIFO order)
+    task_priorities = {"data": 3, "history": 2, "derived": 1, "recalculation": 0}
 
-    def __init__(self, max_history_size=100, parent=None):
+    # Max. duration of one step of recalculation (live sweeps are processed between steps)
+    recalculation_step_time = 0.02
+
+    # Signals emitted for published frame (in this order)
+    frame_signals = ("history_recalculated", "data_recalculated", "history_updated", "data_updated",
+                     "average_updated", "peak_hold_max_updated", "peak_hold_min_updated")
+
+    def __init__(self, max_history_size=100, dtype=np.float64, history_storage="full", processing_threads=1,
+                 rebin_size=0, rebin_reducer="max", history_decimation=1, history_reducer="max",
+                 history_range=(-150.0, 50.0), parent=None):
         super().__init__(parent)
         self.max_history_size = max_history_size
+        self.dtype = np.dtype(dtype)
+        self.history_storage = history_storage
+        # Range of values (in dB) which can be stored in 8-bit or 16-bit history
+        self.history_range = tuple(history_range)
+        self.processing_threads = processing_threads
+
+        # Sweeps can be rebinned to coarser resolution (in Hz) before any other processing
+        self.rebinner = Rebinner(rebin_size, rebin_reducer) if rebin_size > 0 else None
+
+        # Several sweeps can be reduced (by max or mean) to one row of history,
+        # so that history spans longer time
+        self.history_decimation = max(1, history_decimation)
+        self.history_reducer = history_reducer
+        self.history_row = None
+        self.history_row_counter = 0
+        # Last sweep added to reduced history (current data are recalculated from it)
+        self.history_sweep = None
         self.smooth = False
         self.smooth_length = 11
         self.smooth_window = "hanning"
@@ -77,105 +409,428 @@ class DataStorage(QtCore.QObject):
         self.prev_baseline = None
         self.baseline = None
         self.baseline_x = None
+        self.baseline_key = None
+        self.baseline_cache = None
+        self.recorders = []
+        self.tracer = LatencyTracer()
+        self.trace_consumers = {name: set() for name in self.derived_traces}
+
+        # Scheduled recalculation (older recalculations are cancelled by increasing generation)
+        self.recalculation_lock = threading.Lock()
+        self.recalculation_generation = 0
+        self.recalculation_request = None
+        self.recalculation = None
+
+        # Counters exported by metrics server (never reset)
+        self.sweeps_total = 0
+        self.rejected_sweeps_total = 0
+        self.resampled_sweeps_total = 0
+        self.sweep_interval = None
+        self.bins = 0
+        self.prev_update_timestamp = None
 
         # Use only one worker thread because it is not faster
         # with more threads (and memory consumption is much higher)
         self.threadpool = QtCore.QThreadPool()
         self.threadpool.setMaxThreadCount(1)
 
+        # Instead every processing step can split very wide sweeps to chunks
+        # and process them in parallel (0 threads = number of CPU cores)
+        self.executor = ChunkExecutor(processing_threads)
+
+        # Processed data are passed to GUI thread as immutable frames
+        self.frames = FrameBuffer()
+        self.frame = None
+        self.frame_published.connect(self.dispatch_frame)
+
+        self.history = None
         self.reset()
 
-    def reset(self):
-        """Reset all data"""
+    def reset(self, keep_history=False):
+        """Reset all data
+
+        If keep_history is True, history is kept for next measurement (it is mapped onto frequency
+        grid of next measurement when its first sweep is received). Derived traces are always reset,
+        kept history is not used for their recalculation.
+        """
+        self.cancel_recalculation()
         self.wait()
+        if self.recalculation:
+            self.frames.unpin(self.recalculation.snapshot)
+            self.recalculation = None
+
+        if keep_history and self.history is not None:
+            self.history_grid = self.history_grid if self.history_grid is not None else self.grid
+            self.history_start = self.history.counter
+        else:
+            self.history = None
+            self.history_grid = None
+            self.frames.reset()
+            self.frame = None
+            self.history_start = 0
+
+        self.grid = None
         self.x = None
-        self.history = None
+        self.resampler = None
+        self.history_trace = None
+        self.history_row = None
+        self.history_sweep = None
+        # Cumulative latency histograms are exported as metrics, so they have to stay monotonic
+        self.tracer.reset_recent()
         self.reset_data()
 
+    def reconfigure(self, max_history_size=100, dtype=np.float64, history_storage="full", processing_threads=1,
+                    rebin_size=0, rebin_reducer="max", history_decimation=1, history_reducer="max",
+                    history_range=(-150.0, 50.0)):
+        """Change params of data storage in place (history is kept, it is resized or converted if needed)"""
+        self.cancel_recalculation()
+        self.wait()
+
+        if processing_threads != self.processing_threads:
+            self.executor.shutdown()
+            self.executor = ChunkExecutor(processing_threads)
+            self.processing_threads = processing_threads
+            if self.history is not None:
+                self.history.executor = self.executor
+
+        self.rebinner = Rebinner(rebin_size, rebin_reducer) if rebin_size > 0 else None
+        self.history_decimation = max(1, history_decimation)
+        self.history_reducer = history_reducer
+        self.history_row = None
+
+        # Baseline loaded from file is rebinned again with new rebinning params
+        dtype = np.dtype(dtype)
+        if self.baseline is not None and self.baseline_cache is not None:
+            baseline, self.baseline_x = self.rebin_baseline(*self.baseline_cache)
+            self.baseline = baseline.astype(dtype)
+
+        history_range = tuple(history_range)
+        if ((max_history_size, dtype, history_storage, history_range) !=
+                (self.max_history_size, self.dtype, self.history_storage, self.history_range)):
+            self.max_history_size = max_history_size
+            self.dtype = dtype
+            self.history_storage = history_storage
+            self.history_range = history_range
+            if self.baseline is not None:
+                self.baseline = self.baseline.astype(self.dtype)
+            if self.history is not None:
+                rows = self.history.get_buffer()
+                measured = self.history.counter - self.history_start
+                self.history = self.create_history(self.history.data_size)
+                self.history.extend(rows)
+                self.history_start = self.history.counter - min(measured, self.history.history_size)
+            self.reset_data()
+
     def reset_data(self):
         """Reset current data"""
         self.wait()
         self.y = None
-        self.average_counter = 0
-        self.average = None
-        self.peak_hold_max = None
-        self.peak_hold_min = None
+        self.trace = None
+        for name in self.derived_traces:
+            self.drop_trace(name)
 
-    def start_task(self, fn, *args, **kwargs):
-        """Run function asynchronously in worker thread"""
-        task = Task(fn, *args, **kwargs)
-        self.threadpool.start(task)
+    def start_task(self, fn, *args, priority="data", **kwargs):
+        """Run function asynchronously in worker thread (priority is one of task_priorities keys)"""
+        self.tracer.task_queued()
+        task = Task(self.run_task, fn, *args, **kwargs)
+        self.threadpool.start(task, self.task_priorities[priority])
+
+    def run_task(self, fn, *args, **kwargs):
+        """Run function and count it as done (in worker thread)"""
+        try:
+            return profiler.call("worker", fn, *args, **kwargs)
+        finally:
+            self.tracer.task_done()
 
     def wait(self):
         """Wait for worker threads to complete all running tasks"""
         self.threadpool.waitForDone()
 
+    def add_recorder(self, recorder):
+        """Add recorder which is updated with every sweep (must have update(timestamp, x, y) and close() methods)"""
+        self.wait()
+        self.recorders.append(recorder)
+
+    def remove_recorder(self, recorder):
+        """Remove recorder and close it"""
+        self.wait()
+        self.recorders.remove(recorder)
+        recorder.close()
+
+    def close(self):
+        """Wait for worker threads and close all recorders"""
+        self.wait()
+        self.executor.shutdown()
+        for recorder in self.recorders:
+            recorder.close()
+
     def update(self, data):
         """Update data storage"""
-        if self.y is not None and len(data["y"]) != len(self.y):
-            print("{:d} bins coming from backend, expected {:d}".format(len(data["y"]), len(self.y)))
-            return
+        self.sweeps_total += 1
+        self.bins = len(data["y"])
+        if self.rebinner:
+            data = self.rebinner.rebin(data)
 
-        self.average_counter += 1
+        # Sweeps with different frequency axis (e.g. after change of crop) are resampled onto canonical grid
+        if self.grid is not None and data.get("grid") is not self.grid and not self.grid.matches(data["x"]):
+            data = self.resample(data)
+            if data is None:
+                return
+
+        data["time"] = time.time()
+        if self.prev_update_timestamp is not None:
+            self.sweep_interval = data["time"] - self.prev_update_timestamp
+        self.prev_update_timestamp = data["time"]
 
-        if self.x is None:
-            self.x = data["x"]
+        # Frequency grid is shared with backend (it is built only once per configuration)
+        if self.grid is None:
+            self.grid = data["grid"] if "grid" in data else FrequencyGrid(data["x"])
+            self.x = self.grid.x
+
+            # History kept from previous measurement is mapped onto new grid before first sweep is processed
+            if self.history_grid is not None:
+                self.start_task(self.restore_history, self.history_grid, self.grid, priority="data")
+                self.history_grid = None
 
         # Subtract baseline from data
-        data["y"] = np.asarray(data["y"])
+        data["y"] = np.asarray(data["y"], dtype=self.dtype)
         if self.subtract_baseline and self.baseline is not None and len(data["y"]) == len(self.baseline):
-            data["y"] -= self.baseline
+            self.executor.apply(np.subtract, data["y"], self.baseline, out=data["y"])
+
+        self.tracer.stamp(data.setdefault("trace", {}), "update")
+        self.start_task(self.update_history, data.copy(), priority="history")
+        self.start_task(self.update_data, data, priority="data")
+
+    def resample(self, data):
+        """Resample sweep onto canonical grid (returns None if sweep has to be dropped)"""
+        grid = data["grid"] if "grid" in data else FrequencyGrid(data["x"])
+        if self.resampler is None or self.resampler.grid is not self.grid:
+            self.resampler = GridResampler(self.grid)
+
+        y = self.resampler.resample(data["y"], grid)
+        if y is None:
+            self.rejected_sweeps_total += 1
+            print("Sweep {:.0f} - {:.0f} Hz ({:d} bins) can't be resampled to {:.0f} - {:.0f} Hz, dropping it".format(
+                grid.start, grid.stop, grid.size, self.grid.start, self.grid.stop))
+            return None
+
+        self.resampled_sweeps_total += 1
+        data = dict(data)
+        data["grid"] = self.grid
+        data["x"] = self.grid.x
+        data["y"] = y
+        return data
+
+    def update_derived_traces(self, data):
+        """Update all enabled derived traces (except traces which are being recalculated)"""
+        updated = set()
+        try:
+            for name in self.derived_traces:
+                if self.trace_enabled(name) and not (self.recalculation and name in self.recalculation.names):
+                    getattr(self, "update_{}".format(name))(data)
+                    updated.add("{}_updated".format(name))
+        finally:
+            self.frames.unpin(data["y"])
+        if updated:
+            self.publish_frame(updated)
+
+    def trace_enabled(self, name):
+        """Check if derived trace has any consumer"""
+        return bool(self.trace_consumers[name])
+
+    def set_trace_enabled(self, name, toggle, consumer="plot"):
+        """Start or stop computing of derived trace for given consumer (e.g. plot or exporter)
+
+        Trace is backfilled from history when it gets its first consumer
+        and dropped when it loses its last consumer.
+        """
+        was_enabled = self.trace_enabled(name)
+        if toggle:
+            self.trace_consumers[name].add(consumer)
+        else:
+            self.trace_consumers[name].discard(consumer)
+
+        if self.trace_enabled(name) and not was_enabled:
+            self.schedule_recalculation(names={name}, updated={"{}_updated".format(name)})
+        elif was_enabled and not self.trace_enabled(name):
+            self.start_task(self.drop_trace, name, priority="derived")
+
+    def drop_trace(self, name):
+        """Forget data of derived trace"""
+        if name == "average":
+            self.average_counter = 0
+            self.average_sum = None
+        setattr(self, name, None)
+
+    def frame_array(self, name, like):
+        """Return writable array with the same shape and dtype as given array for next frame"""
+        return self.frames.array(name, np.shape(like), np.asarray(like).dtype)
 
-        self.start_task(self.update_history, data.copy())
-        self.start_task(self.update_data, data)
+    def publish_frame(self, updated):
+        """Publish current data as immutable frame and notify GUI thread"""
+        history = self.history
+        self.frames.publish(
+            updated=updated,
+            grid=self.grid,
+            trace=self.trace,
+            history_trace=self.history_trace,
+            y=self.y,
+            average=self.average,
+            average_counter=self.average_counter,
+            peak_hold_max=self.peak_hold_max,
+            peak_hold_min=self.peak_hold_min,
+            history=history.buffer[-history.history_size:] if history and history.history_size else None,
+            history_scale=history.scale if history else 1.0,
+            history_offset=history.offset if history else 0.0,
+        )
+        self.frame_published.emit()
+
+    @QtCore.Slot()
+    def dispatch_frame(self):
+        """Take newest frame and emit signals about its content (in GUI thread)"""
+        frame = self.frames.acquire()
+        if frame is None:
+            return
+
+        self.frame = frame
+        for name in self.frame_signals:
+            if name in frame.updated:
+                getattr(self, name).emit(self)
 
     def update_data(self, data):
         """Update main spectrum data (and possibly apply smoothing)"""
         if self.smooth:
-            data["y"] = self.smooth_data(data["y"])
+            data["y"] = self.smooth_data(data["y"], out=self.frame_array("y", data["y"]))
 
         self.y = data["y"]
-        self.data_updated.emit(self)
+        self.trace = data["trace"]
+        self.tracer.stamp(self.trace, "process")
+        self.publish_frame({"data_updated"})
+
+        if any(self.trace_enabled(name) for name in self.derived_traces):
+            # Smoothed data must not be reused for next frames until derived traces are updated
+            self.frames.pin(data["y"])
+            self.start_task(self.update_derived_traces, data, priority="derived")
+
+    def create_history(self, data_size):
+        """Create empty history buffer"""
+        if self.history_storage in ("int16", "uint8"):
+            return QuantizedHistoryBuffer(data_size, self.max_history_size, dtype=self.dtype,
+                                          code_dtype=self.history_storage, value_min=self.history_range[0],
+                                          value_max=self.history_range[1], executor=self.executor,
+                                          allocate=self.allocate_history)
+        return HistoryBuffer(data_size, self.max_history_size, dtype=self.dtype,
+                             executor=self.executor, allocate=self.allocate_history)
 
-        self.start_task(self.update_average, data)
-        self.start_task(self.update_peak_hold_max, data)
-        self.start_task(self.update_peak_hold_min, data)
+    def restore_history(self, history_grid, grid):
+        """Map history kept from previous measurement onto new frequency grid
+
+        Only rows in frequency range overlapping with new grid are kept, other bins are filled
+        with minimum of history (kept rows are only shown in waterfall, derived traces are not
+        recalculated from them).
+        """
+        if self.history is None:
+            return
+
+        if history_grid is not grid and not grid.matches(history_grid.x):
+            rows = self.history.get_buffer()
+            baseline = self.baseline if self.subtract_baseline and self.baseline is not None else None
+            if baseline is not None and len(baseline) == history_grid.size:
+                rows = rows + baseline
+            rows = GridResampler(grid).resample(rows, history_grid, fill=rows.min() if rows.size else 0)
+            if rows is None:
+                self.history = None
+                self.history_start = 0
+                return
+            if baseline is not None and len(baseline) == grid.size:
+                rows -= baseline
+
+            self.history = self.create_history(grid.size)
+            self.history.extend(rows)
+            self.history_start = self.history.counter
+
+        self.publish_frame({"history_recalculated"})
 
     def update_history(self, data):
         """Update spectrum measurements history"""
+        for recorder in self.recorders:
+            recorder.update(data["time"], self.x, data["y"])
+
+        if self.history_decimation > 1:
+            if self.history_sweep is None or len(self.history_sweep) != len(data["y"]):
+                self.history_sweep = np.array(data["y"])
+            else:
+                self.executor.copy(data["y"], out=self.history_sweep)
+            row = self.reduce_history_row(data["y"])
+        else:
+            self.history_sweep = None
+            row = data["y"]
+        if row is None:
+            return
+
         if self.history is None:
-            self.history = HistoryBuffer(len(data["y"]), self.max_history_size)
+            self.history = self.create_history(len(row))
+            self.history_start = 0
+
+        self.history.append(row)
+        self.history_trace = data["trace"]
+        self.tracer.stamp(self.history_trace, "history")
+        self.publish_frame({"history_updated"})
+
+    def reduce_history_row(self, y):
+        """Accumulate sweep to next row of history (returns row when history_decimation sweeps were reduced)"""
+        if self.history_row is None or len(self.history_row) != len(y):
+            self.history_row = np.array(y, dtype=np.float64)
+            self.history_row_counter = 1
+        else:
+            reducer = np.maximum if self.history_reducer == "max" else np.add
+            self.executor.apply(reducer, self.history_row, y, out=self.history_row)
+            self.history_row_counter += 1
+
+        if self.history_row_counter < self.history_decimation:
+            return None
 
-        self.history.append(data["y"])
-        self.history_updated.emit(self)
+        row, self.history_row = self.history_row, None
+        if self.history_reducer == "mean":
+            row /= self.history_row_counter
+        return row
+
+    def allocate_history(self, shape, dtype):
+        """Allocate history buffer for next frame"""
+        return self.frames.array("history", shape, dtype)
 
     def update_average(self, data):
-        """Update average data"""
-        if self.average is None:
-            self.average = data["y"].copy()
+        """Update average data (sum of all sweeps is accumulated in double precision)"""
+        self.average_counter += 1
+        if self.average_sum is None:
+            self.average_sum = data["y"].astype(np.float64)
+            self.average = self.executor.copy(data["y"], out=self.frame_array("average", data["y"]))
         else:
-            self.average = np.average((self.average, data["y"]), axis=0, weights=(self.average_counter - 1, 1))
-            self.average_updated.emit(self)
+            self.executor.apply(np.add, self.average_sum, data["y"], out=self.average_sum)
+            self.average = self.executor.apply(np.divide, self.average_sum, self.average_counter,
+                                               out=self.frame_array("average", data["y"]), casting="unsafe")
 
     def update_peak_hold_max(self, data):
         """Update max. peak hold data"""
+        out = self.frame_array("peak_hold_max", data["y"])
         if self.peak_hold_max is None:
-            self.peak_hold_max = data["y"].copy()
+            self.peak_hold_max = self.executor.copy(data["y"], out=out)
         else:
-            self.peak_hold_max = np.maximum(self.peak_hold_max, data["y"])
-            self.peak_hold_max_updated.emit(self)
+            self.peak_hold_max = self.executor.apply(np.maximum, self.peak_hold_max, data["y"], out=out)
 
     def update_peak_hold_min(self, data):
         """Update min. peak hold data"""
+        out = self.frame_array("peak_hold_min", data["y"])
         if self.peak_hold_min is None:
-            self.peak_hold_min = data["y"].copy()
+            self.peak_hold_min = self.executor.copy(data["y"], out=out)
         else:
-            self.peak_hold_min = np.minimum(self.peak_hold_min, data["y"])
-            self.peak_hold_min_updated.emit(self)
+            self.peak_hold_min = self.executor.apply(np.minimum, self.peak_hold_min, data["y"], out=out)
 
-    def smooth_data(self, y):
-        """Apply smoothing function to data"""
-        return smooth(y, window_len=self.smooth_length, window=self.smooth_window)
+    def smooth_data(self, y, out=None):
+        """Apply smoothing function to data (result is written to out array if given)"""
+        if out is None:
+            out = np.empty(len(y), dtype=self.dtype)
+        return self.executor.smooth(y, window_len=self.smooth_length, window=self.smooth_window, out=out)
 
     def set_smooth(self, toggle, length=11, window="hanning"):
         """Toggle smoothing and set smoothing params"""
@@ -183,24 +838,41 @@ class DataStorage(QtCore.QObject):
             self.smooth = toggle
             self.smooth_length = length
             self.smooth_window = window
-            self.start_task(self.recalculate_data)
+            self.schedule_recalculation()
 
     def set_subtract_baseline(self, toggle, baseline_file=None):
         """Toggle baseline subtraction and set baseline"""
         baseline = None
         baseline_x = None
 
-        # Load baseline from file (compute average if there are multiple PSD data in file)
+        # Load baseline from file (compute average if there are multiple PSD data in file),
+        # file is read again only if it was changed since last time
+        baseline_key = None
         if baseline_file and os.path.isfile(baseline_file):
-            average_counter = 0
-            with open(baseline_file, 'rb') as f:
-                for data in soapy_power.read_from_file(f):
-                    average_counter += 1
-                    if baseline is None:
-                        baseline = data['y'].copy()
-                        baseline_x = data['x'].copy()
-                    else:
-                        baseline = np.average((baseline, data['y']), axis=0, weights=(average_counter - 1, 1))
+            baseline_key = (baseline_file, os.path.getmtime(baseline_file))
+            if baseline_key == self.baseline_key:
+                baseline, baseline_x = self.baseline_cache
+            else:
+                from qspectrumanalyzer.backends import soapy_power
+                average_counter = 0
+                with open(baseline_file, 'rb') as f:
+                    for data in soapy_power.read_from_file(f):
+                        average_counter += 1
+                        if baseline is None:
+                            baseline = data['y'].copy()
+                            baseline_x = data['x']
+                        else:
+                            baseline = np.average((baseline, data['y']), axis=0, weights=(average_counter - 1, 1))
+                self.baseline_cache = (baseline, baseline_x)
+
+            # Baseline is rebinned to the same resolution as sweeps
+            baseline, baseline_x = self.rebin_baseline(baseline, baseline_x)
+
+        # Nothing has to be recalculated if baseline wasn't changed
+        if baseline_key == self.baseline_key and toggle == self.subtract_baseline:
+            self.baseline_updated.emit(self)
+            return
+        self.baseline_key = baseline_key
 
         # Don't subtract baseline if number of bins in baseline differs from number of bins in data
         if self.y is not None and baseline is not None and len(self.y) != len(baseline):
@@ -209,6 +881,9 @@ class DataStorage(QtCore.QObject):
             ))
             #baseline = None
 
+        if baseline is not None:
+            baseline = baseline.astype(self.dtype)
+
         if self.subtract_baseline:
             self.prev_baseline = self.baseline
 
@@ -218,79 +893,195 @@ class DataStorage(QtCore.QObject):
         self.baseline_updated.emit(self)
 
         self.subtract_baseline = toggle
-        self.start_task(self.recalculate_history)
-        self.start_task(self.recalculate_data)
+        self.start_task(self.recalculate_history, priority="history")
+        self.schedule_recalculation()
+
+    def rebin_baseline(self, baseline, baseline_x):
+        """Return baseline rebinned to output resolution (if rebinning is enabled)"""
+        if baseline is None or not self.rebinner:
+            return baseline, baseline_x
+
+        data = self.rebinner.rebin({"x": baseline_x, "y": baseline})
+        return data["y"], data["x"]
 
     def recalculate_history(self):
         """Recalculate spectrum measurements history"""
         if self.history is None:
             return
 
-        history = self.history.get_buffer()
-        if self.prev_baseline is not None and len(history[-1]) == len(self.prev_baseline):
-            history += self.prev_baseline
+        if self.prev_baseline is not None and self.history.data_size == len(self.prev_baseline):
+            self.history.add(self.prev_baseline)
+            self.add_to_pending_sweeps(self.prev_baseline)
             self.prev_baseline = None
-        if self.subtract_baseline and self.baseline is not None and len(history[-1]) == len(self.baseline):
-            history -= self.baseline
+        if self.subtract_baseline and self.baseline is not None and self.history.data_size == len(self.baseline):
+            self.history.add(-self.baseline)
+            self.add_to_pending_sweeps(-self.baseline)
+
+        self.publish_frame({"history_recalculated"})
+
+    def add_to_pending_sweeps(self, values):
+        """Add values to sweeps which are kept outside of reduced history (last sweep and unfinished row)"""
+        if self.history_sweep is not None and len(self.history_sweep) == len(values):
+            self.history_sweep += values
+        if self.history_row is not None and len(self.history_row) == len(values):
+            # Unfinished row of mean reducer is sum of sweeps
+            self.history_row += values * (self.history_row_counter if self.history_reducer == "mean" else 1)
+
+    def schedule_recalculation(self, names=None, updated=("data_recalculated",)):
+        """Recalculate derived traces (and current data if names are not given) from history in background
+
+        Unfinished older recalculation is cancelled and merged to new one.
+        """
+        with self.recalculation_lock:
+            self.recalculation_generation += 1
+            request = self.recalculation_request
+            self.recalculation_request = {
+                "generation": self.recalculation_generation,
+                "data": names is None or (request is not None and request["data"]),
+                "names": set(names or ()) | (request["names"] if request else set()),
+                "updated": set(updated) | (request["updated"] if request else set()),
+            }
+            generation = self.recalculation_generation
+        self.start_task(self.recalculate_step, generation, priority="recalculation")
+
+    def cancel_recalculation(self):
+        """Cancel scheduled recalculation"""
+        with self.recalculation_lock:
+            self.recalculation_generation += 1
+            self.recalculation_request = None
+
+    def start_recalculation(self, generation, names, data):
+        """Start recalculation of derived traces from current history"""
+        if data:
+            names = {name for name in self.derived_traces if self.trace_enabled(name)}
+        recalculation = Recalculation(generation, names, data, self.history, self.history_start)
+        if self.history_decimation > 1:
+            # Only max. peak hold (of max. reduced rows) and average (of mean reduced rows) can be
+            # computed exactly from reduced rows, other traces keep their live state (or they are
+            # started by next sweep if they are empty)
+            exact = {"peak_hold_max"} if self.history_reducer == "max" else {"average"}
+            recalculation.names &= exact
+            recalculation.weight = self.history_decimation
+        self.frames.pin(recalculation.snapshot)
+        return recalculation
 
-        self.history_recalculated.emit(self)
+    def advance_recalculation(self, recalculation, budget=None):
+        """Process sweeps of recalculation for at most budget seconds (or all of them)
+
+        Returns False if some already processed sweep was pushed out of history.
+        """
+        if not recalculation.names:
+            # Only data are recalculated (from last sweep), so history doesn't have to be decoded
+            recalculation.next_row = 0
+            return True
+
+        start = time.perf_counter()
+        while recalculation.next_row > recalculation.dropped():
+            if self.smooth:
+                # Smoothing is slow, so sweeps are smoothed one by one
+                row = recalculation.rows_slice(recalculation.next_row - 1, recalculation.next_row)[0]
+                rows = self.smooth_data(row)[np.newaxis]
+                recalculation.next_row -= 1
+            else:
+                rows = recalculation.rows_slice(recalculation.dropped(), recalculation.next_row)
+                recalculation.next_row = recalculation.dropped()
+            recalculation.accumulate(rows, self.executor)
+
+            if budget is not None and time.perf_counter() - start > budget:
+                break
+        return recalculation.next_row >= recalculation.dropped()
+
+    def finish_recalculation(self, recalculation):
+        """Add sweeps appended to history during recalculation and replace derived traces"""
+        self.frames.unpin(recalculation.snapshot)
+        appended = min(self.history.counter - recalculation.counter, self.history.history_size)
+        if appended and recalculation.names:
+            rows = self.history.decode(self.history.buffer[-appended:])
+            if self.smooth:
+                rows = np.array([self.smooth_data(row) for row in rows])
+            recalculation.accumulate(rows, self.executor)
+
+        if recalculation.data:
+            last = self.history_sweep if self.history_sweep is not None else self.history[-1]
+            if self.smooth:
+                self.y = self.smooth_data(last, out=self.frame_array("y", last))
+            elif last is self.history_sweep:
+                # Last sweep is overwritten by next sweep, so it is copied
+                self.y = self.executor.copy(last, out=self.frame_array("y", last))
+            else:
+                self.y = last
+
+        # Sweeps accumulated to next row of reduced history (which is not finished yet) are added too
+        pending = None
+        if recalculation.weight > 1 and self.history_row is not None and len(self.history_row) == self.history.data_size:
+            pending = self.history_row
+            if self.smooth and self.history_reducer == "mean":
+                pending = self.smooth_data(pending / self.history_row_counter) * self.history_row_counter
+            elif self.smooth:
+                pending = self.smooth_data(pending)
+
+        for name in self.derived_traces:
+            if name not in recalculation.names:
+                continue
+            if not self.trace_enabled(name) or not recalculation.rows:
+                self.drop_trace(name)
+            elif name == "average":
+                self.average_counter = recalculation.rows * recalculation.weight
+                self.average_sum = recalculation.average_sum
+                if recalculation.weight > 1:
+                    self.average_sum *= recalculation.weight
+                if pending is not None:
+                    self.average_sum += pending
+                    self.average_counter += self.history_row_counter
+                self.average = self.executor.apply(np.divide, self.average_sum, self.average_counter,
+                                                   out=self.frames.array("average", self.average_sum.shape, self.dtype),
+                                                   casting="unsafe")
+            elif name == "peak_hold_max" and pending is not None:
+                self.peak_hold_max = np.maximum(recalculation.peak_hold_max, pending,
+                                                out=recalculation.peak_hold_max, casting="unsafe")
+            else:
+                setattr(self, name, getattr(recalculation, name))
+
+    def recalculate_step(self, generation):
+        """Run one step of scheduled recalculation (in worker thread)"""
+        with self.recalculation_lock:
+            request = self.recalculation_request
+        if self.recalculation and (request is None or self.recalculation.generation != request["generation"]):
+            # Recalculation was cancelled
+            self.frames.unpin(self.recalculation.snapshot)
+            self.recalculation = None
+        if request is None or request["generation"] != generation:
+            return
+
+        if self.history is not None:
+            if self.recalculation is None:
+                self.recalculation = self.start_recalculation(generation, request["names"], request["data"])
+
+            if not self.advance_recalculation(self.recalculation, self.recalculation_step_time):
+                # Sweeps were pushed out of history faster than they were recalculated, so start again
+                # with current history and finish at once
+                self.frames.unpin(self.recalculation.snapshot)
+                self.recalculation = self.start_recalculation(generation, request["names"], request["data"])
+                self.advance_recalculation(self.recalculation)
+
+            if self.recalculation.next_row > self.recalculation.dropped():
+                self.start_task(self.recalculate_step, generation, priority="recalculation")
+                return
+
+            self.finish_recalculation(self.recalculation)
+            self.recalculation = None
+
+        with self.recalculation_lock:
+            if self.recalculation_request is request:
+                self.recalculation_request = None
+        self.publish_frame(request["updated"])
 
     def recalculate_data(self):
-        """Recalculate current data from history"""
+        """Recalculate current data and enabled derived traces from history at once"""
         if self.history is None:
             return
 
-        history = self.history.get_buffer()
-        if self.smooth:
-            self.y = self.smooth_data(history[-1])
-            self.average_counter = 0
-            self.average = self.y.copy()
-            self.peak_hold_max = self.y.copy()
-            self.peak_hold_min = self.y.copy()
-            for y in history[:-1]:
-                self.average_counter += 1
-                y = self.smooth_data(y)
-                self.average = np.average((self.average, y), axis=0, weights=(self.average_counter - 1, 1))
-                self.peak_hold_max = np.maximum(self.peak_hold_max, y)
-                self.peak_hold_min = np.minimum(self.peak_hold_min, y)
-        else:
-            self.y = history[-1]
-            self.average_counter = self.history.history_size
-            self.average = np.average(history, axis=0)
-            self.peak_hold_max = history.max(axis=0)
-            self.peak_hold_min = history.min(axis=0)
-
-        self.data_recalculated.emit(self)
-        #self.data_updated.emit({"x": self.x, "y": self.y})
-        #self.average_updated.emit({"x": self.x, "y": self.average})
-        #self.peak_hold_max_updated.emit({"x": self.x, "y": self.peak_hold_max})
-        #self.peak_hold_min_updated.emit({"x": self.x, "y": self.peak_hold_min})
-
-
-class Test:
-    """Test data storage performance"""
-    def __init__(self, data_size=100000, max_history_size=100):
-        self.data_size = data_size
-        self.data = {"x": np.arange(data_size),
-                     "y": None}
-        self.datastorage = DataStorage(max_history_size)
-
-    def run_one(self):
-        """Generate random data and update data storage"""
-        self.data["y"] = np.random.normal(size=self.data_size)
-        self.datastorage.update(self.data)
-
-    def run(self, runs=1000):
-        """Run performance test"""
-        t = time.time()
-        for i in range(runs):
-            self.run_one()
-        self.datastorage.wait()
-        total_time = time.time() - t
-        print("Total time:", total_time)
-        print("FPS:", runs / total_time)
-
-
-if __name__ == "__main__":
-    test = Test(int(sys.argv[1]), int(sys.argv[2]))
-    test.run(int(sys.argv[3]))
+        recalculation = self.start_recalculation(None, None, True)
+        self.advance_recalculation(recalculation)
+        self.finish_recalculation(recalculation)
+        self.publish_frame({"data_recalculated"})
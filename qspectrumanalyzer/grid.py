@@ -0,0 +1,222 @@
+import numpy as np
+
+
+class FrequencyGrid:
+    """Frequency axis of sweep (built once per configuration and shared by backend, data storage and plots)"""
+    def __init__(self, x):
+        self.x = np.array(x, dtype=np.float64)
+        self.x.setflags(write=False)
+        self.size = len(self.x)
+        self.start = self.x[0] if self.size else 0.0
+        self.stop = self.x[-1] if self.size else 0.0
+        self.bin_width = (self.stop - self.start) / (self.size - 1) if self.size > 1 else 0.0
+
+        # Bins of uniform grid are mapped to frequencies directly, otherwise binary search is needed
+        if self.size > 2 and self.bin_width > 0:
+            self.uniform = np.allclose(np.diff(self.x), self.bin_width, rtol=1e-6, atol=1e-3)
+        else:
+            self.uniform = True
+
+    @classmethod
+    def linspace(cls, start, stop, bins):
+        """Create uniform grid with given number of bins between start and stop frequency (inclusive)"""
+        return cls(np.linspace(start, stop, bins))
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return "<{} {:.0f} - {:.0f} Hz, {:d} bins>".format(self.__class__.__name__, self.start, self.stop, self.size)
+
+    def index(self, freq):
+        """Return index of bin nearest to given frequency (or array of frequencies)"""
+        if self.uniform:
+            if not self.bin_width:
+                return np.zeros_like(freq, dtype=np.intp) if np.ndim(freq) else 0
+            i = np.rint((np.asarray(freq) - self.start) / self.bin_width).astype(np.intp)
+        else:
+            i = np.searchsorted(self.x, freq)
+            i = np.clip(i, 1, self.size - 1)
+            i = i - (np.asarray(freq) - self.x[i - 1] < self.x[i] - np.asarray(freq))
+        i = np.clip(i, 0, self.size - 1)
+        return int(i) if np.ndim(i) == 0 else i
+
+    def frequency(self, index):
+        """Return frequency of bin with given index (or array of indexes)"""
+        return self.x[index]
+
+    def matches(self, x):
+        """Check if frequency axis is the same as this grid"""
+        return len(x) == self.size and (not self.size or (x[0] == self.start and x[-1] == self.stop))
+
+
+class GridCache:
+    """Cache of frequency axes of hops and of grids of whole sweeps assembled from these hops
+
+    Backends split sweep to hops with the same frequencies in every sweep, so each axis is
+    computed only once and every sweep of given configuration shares one FrequencyGrid.
+    """
+    max_grids = 16
+
+    def __init__(self):
+        self.hops = {}
+        self.grids = {}
+
+    def hop(self, start, stop, bins, size=None):
+        """Return key of hop axis with given number of bins between start and stop frequency (inclusive)
+
+        If size is given, axis is trimmed to first size bins.
+        """
+        key = (start, stop, bins, size)
+        if key not in self.hops:
+            axis = np.linspace(start, stop, bins)[:size]
+            axis.setflags(write=False)
+            self.hops[key] = axis
+        return key
+
+    def hop_axis(self, key):
+        """Return frequency axis of hop"""
+        return self.hops[key]
+
+    def grid(self, hops):
+        """Return grid of sweep composed of given hops (keys of hop axes)"""
+        hops = tuple(hops)
+        grid = self.grids.get(hops)
+        if grid is None:
+            if len(self.grids) >= self.max_grids:
+                self.grids.clear()
+            grid = FrequencyGrid(np.concatenate([self.hops[key] for key in hops]))
+            self.grids[hops] = grid
+        return grid
+
+    def grid_from_axis(self, x):
+        """Return cached grid matching given frequency axis (or create new one)"""
+        key = (len(x), x[0], x[-1]) if len(x) else (0,)
+        grid = self.grids.get(key)
+        if grid is None:
+            if len(self.grids) >= self.max_grids:
+                self.grids.clear()
+            grid = FrequencyGrid(x)
+            self.grids[key] = grid
+        return grid
+
+
+class Rebinner:
+    """Rebin sweeps to coarser frequency resolution (every output bin is reduced from fixed number of input bins)
+
+    Supported reducers are max, mean and power_mean (mean of linear power, data are in dB).
+    Output grid is computed only once for every input grid.
+    """
+    reducers = ("max", "mean", "power_mean")
+    max_grids = 16
+
+    def __init__(self, bin_size, reducer="max"):
+        if reducer not in self.reducers:
+            raise ValueError("Unknown rebinning reducer {!r}".format(reducer))
+        self.bin_size = bin_size
+        self.reducer = reducer
+        self.layouts = {}
+
+    def layout(self, grid):
+        """Return number of input bins per output bin and output grid for given input grid"""
+        key = (grid.size, grid.start, grid.stop)
+        layout = self.layouts.get(key)
+        if layout is None:
+            if len(self.layouts) >= self.max_grids:
+                self.layouts.clear()
+            factor = int(round(self.bin_size / grid.bin_width)) if grid.bin_width > 0 else 1
+            factor = max(1, min(factor, grid.size))
+            if factor > 1:
+                # Frequency of output bin is center of its input bins
+                layout = (factor, FrequencyGrid(self.reduce_blocks(grid.x, factor, "mean")))
+            else:
+                layout = (1, grid)
+            self.layouts[key] = layout
+        return layout
+
+    @staticmethod
+    def reduce_blocks(y, factor, reducer):
+        """Reduce every factor consecutive values of 1D array to one value (last block can be shorter)"""
+        full = len(y) // factor * factor
+        blocks = [y[:full].reshape(-1, factor)]
+        if full < len(y):
+            blocks.append(y[full:].reshape(1, -1))
+
+        results = []
+        for block in blocks:
+            if reducer == "max":
+                results.append(block.max(axis=1))
+            elif reducer == "mean":
+                results.append(block.mean(axis=1))
+            else:
+                power = np.multiply(block, np.log(10) / 10)
+                np.exp(power, out=power)
+                mean = power.mean(axis=1)
+                np.log10(mean, out=mean)
+                results.append(np.multiply(mean, 10, out=mean))
+        return results[0] if len(results) == 1 else np.concatenate(results)
+
+    def rebin(self, data):
+        """Return sweep rebinned to output resolution (sweep is returned unchanged if it is already coarser)"""
+        grid = data["grid"] if "grid" in data else FrequencyGrid(data["x"])
+        factor, out_grid = self.layout(grid)
+        if factor == 1:
+            return data
+
+        y = np.asarray(data["y"])
+        data = dict(data)
+        data["grid"] = out_grid
+        data["x"] = out_grid.x
+        data["y"] = self.reduce_blocks(y, factor, self.reducer).astype(y.dtype, copy=False)
+        return data
+
+
+class GridResampler:
+    """Resample sweeps with different frequency axis onto canonical grid (by linear interpolation)
+
+    Interpolation indexes and weights are computed only once for every input grid. Canonical bins
+    outside of input frequency range get value of nearest input bin (or fill value if it is given).
+    """
+    max_grids = 16
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.maps = {}
+
+    def map(self, grid):
+        """Return indexes of left input bins, their weights and mask of bins outside of input range
+        for every canonical bin (None if input grid doesn't overlap with canonical grid)"""
+        key = (grid.size, grid.start, grid.stop)
+        if key in self.maps:
+            return self.maps[key]
+
+        if len(self.maps) >= self.max_grids:
+            self.maps.clear()
+        if grid.size < 2 or grid.stop < self.grid.start or grid.start > self.grid.stop:
+            index_map = None
+        else:
+            indexes = np.searchsorted(grid.x, self.grid.x, side="right") - 1
+            np.clip(indexes, 0, grid.size - 2, out=indexes)
+            left = grid.x[indexes]
+            weights = (self.grid.x - left) / (grid.x[indexes + 1] - left)
+            np.clip(weights, 0, 1, out=weights)
+            outside = (self.grid.x < grid.start) | (self.grid.x > grid.stop)
+            index_map = (indexes, weights, outside)
+        self.maps[key] = index_map
+        return index_map
+
+    def resample(self, y, grid, fill=None):
+        """Return sweep (or rows of sweeps) resampled onto canonical grid (None if it can't be resampled)"""
+        index_map = self.map(grid)
+        if index_map is None:
+            return None
+
+        indexes, weights, outside = index_map
+        y = np.asarray(y)
+        left = y[..., indexes]
+        out = y[..., indexes + 1] - left
+        out *= weights
+        out += left
+        if fill is not None:
+            out[..., outside] = fill
+        return out
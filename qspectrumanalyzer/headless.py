@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+
+import sys, signal, time, shutil, tempfile, argparse
+
+from Qt import QtCore
+
+from qspectrumanalyzer import backends, profiler
+from qspectrumanalyzer.version import __version__
+from qspectrumanalyzer.data import DataStorage
+from qspectrumanalyzer.rollup import Rollup
+from qspectrumanalyzer.recording import RecordingWriter
+from qspectrumanalyzer.metrics import MetricsServer
+
+
+class HeadlessSpectrumAnalyzer(QtCore.QObject):
+    """Spectrum analyzer without GUI (only acquisition, processing and recording of data)"""
+    def __init__(self, max_runs=0, parent=None):
+        super().__init__(parent)
+        self.max_runs = max_runs
+        self.runs = 0
+        self.start_sweeps = 0
+        self.start_timestamp = None
+
+        settings = QtCore.QSettings()
+        self.data_storage = DataStorage(max_history_size=settings.value("waterfall_history_size", 100, int),
+                                        dtype=settings.value("precision", "float64"),
+                                        history_storage=settings.value("history_storage", "full"),
+                                        processing_threads=settings.value("processing_threads", 1, int),
+                                        rebin_size=settings.value("rebin_size", 0, float) * 1e3,
+                                        rebin_reducer=settings.value("rebin_reducer", "max"),
+                                        history_decimation=settings.value("history_decimation", 1, int),
+                                        history_reducer=settings.value("history_reducer", "max"),
+                                        history_range=(settings.value("history_range_min", -150.0, float),
+                                                       settings.value("history_range_max", 50.0, float)))
+        self.data_storage.data_updated.connect(self.update_data)
+
+        backend = settings.value("backend", "soapy_power")
+        try:
+            backend_module = getattr(backends, backend)
+        except AttributeError:
+            backend_module = backends.soapy_power
+
+        if settings.value("parse_process", 0, int):
+            from qspectrumanalyzer.backends import process
+            self.power_thread = process.PowerThread(self.data_storage, backend_module)
+        else:
+            self.power_thread = backend_module.PowerThread(self.data_storage)
+        self.power_thread.finished.connect(self.on_power_thread_finished)
+
+    def update_data(self, data_storage):
+        """Count received sweeps and stop after max. number of runs"""
+        # Signals of frames are merged when worker is faster than event loop, so sweeps are counted by data storage
+        self.runs = data_storage.sweeps_total - self.start_sweeps
+        if self.max_runs and self.runs >= self.max_runs:
+            self.stop()
+
+    def start(self, single_shot=False):
+        """Start power thread"""
+        settings = QtCore.QSettings()
+        self.start_timestamp = time.time()
+
+        self.data_storage.reset()
+        self.runs = 0
+        self.start_sweeps = self.data_storage.sweeps_total
+        self.data_storage.set_smooth(
+            bool(settings.value("smooth", 0, int)),
+            settings.value("smooth_length", 11, int),
+            settings.value("smooth_window", "hanning")
+        )
+        self.data_storage.set_subtract_baseline(
+            bool(settings.value("subtract_baseline", 0, int)),
+            settings.value("baseline_file", None)
+        )
+
+        self.power_thread.setup(
+            settings.value("start_freq", 87.0, float),
+            settings.value("stop_freq", 108.0, float),
+            settings.value("bin_size", 10.0, float),
+            interval=settings.value("interval", 10.0, float),
+            gain=settings.value("gain", 0, float),
+            ppm=settings.value("ppm", 0, int),
+            crop=settings.value("crop", 0, int) / 100.0,
+            single_shot=single_shot,
+            device=settings.value("device", ""),
+            sample_rate=settings.value("sample_rate", 2560000, float),
+            bandwidth=settings.value("bandwidth", 0, float),
+            lnb_lo=settings.value("lnb_lo", 0, float)
+        )
+        self.power_thread.start()
+
+    def stop(self):
+        """Stop power thread"""
+        if self.power_thread.alive:
+            self.power_thread.stop()
+        elif not self.power_thread.isRunning():
+            QtCore.QCoreApplication.quit()
+
+    def on_power_thread_finished(self):
+        """Close recorders and quit application when power thread is finished"""
+        self.data_storage.close()
+        self.runs = self.data_storage.sweeps_total - self.start_sweeps
+        total_time = time.time() - self.start_timestamp
+        print("Received {:d} sweeps in {:.2f} s ({:.2f} FPS)".format(
+            self.runs, total_time, self.runs / total_time if total_time else 0
+        ))
+        QtCore.QCoreApplication.quit()
+
+
+def default_executable(backend):
+    """Return default executable of backend (None if backend is not given)"""
+    if not backend:
+        return None
+    return getattr(backends, backend).Info.executable or backend
+
+
+def setup_settings(profile, overrides):
+    """Use temporary copy of settings profile with values overridden from command line
+
+    Backends read their configuration directly from QSettings, so command line arguments
+    have to be applied there (but without modifying stored GUI settings).
+    """
+    QtCore.QCoreApplication.setApplicationName(profile)
+    profile_settings = QtCore.QSettings()
+
+    settings_dir = tempfile.mkdtemp(prefix="qspectrumanalyzer-")
+    QtCore.QSettings.setDefaultFormat(QtCore.QSettings.IniFormat)
+    QtCore.QSettings.setPath(QtCore.QSettings.IniFormat, QtCore.QSettings.UserScope, settings_dir)
+
+    settings = QtCore.QSettings()
+    for key in profile_settings.allKeys():
+        settings.setValue(key, profile_settings.value(key))
+    for key, value in overrides.items():
+        if value is not None:
+            settings.setValue(key, value)
+    settings.sync()
+
+    return settings_dir
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(
+        prog="qspectrumanalyzer-headless",
+        description="Spectrum analyzer for multiple SDR platforms (headless acquisition without GUI)",
+        epilog="Settings which are not specified on command line are loaded from settings profile "
+               "(by default from QSpectrumAnalyzer GUI settings).",
+    )
+    parser.add_argument("--settings-profile", metavar="NAME", default="QSpectrumAnalyzer",
+                        help="name of settings profile (default: %(default)s)")
+    parser.add_argument("--backend", choices=sorted(backends.__all__),
+                        help="backend used for acquisition")
+    parser.add_argument("--executable",
+                        help="path to backend executable")
+    parser.add_argument("--params",
+                        help="additional backend parameters")
+    parser.add_argument("-d", "--device",
+                        help="device to use (devices separated by ';' for multi backend)")
+    parser.add_argument("--multi-backend", choices=sorted(b for b in backends.__all__ if b != "multi"),
+                        help="backend used for every device by multi backend")
+    parser.add_argument("-f", "--freq", metavar="START:STOP",
+                        help="frequency range in MHz")
+    parser.add_argument("-B", "--bin-size", metavar="KHZ", type=float,
+                        help="bin size in kHz")
+    parser.add_argument("-T", "--interval", metavar="SECONDS", type=float,
+                        help="interval in seconds")
+    parser.add_argument("-g", "--gain", type=float,
+                        help="gain in dB (-1 for auto)")
+    parser.add_argument("-p", "--ppm", type=int,
+                        help="frequency correction in ppm")
+    parser.add_argument("-k", "--crop", metavar="PERCENT", type=int,
+                        help="crop percentage")
+    parser.add_argument("-r", "--sample-rate", metavar="MHZ", type=float,
+                        help="sample rate in MHz")
+    parser.add_argument("-w", "--bandwidth", metavar="MHZ", type=float,
+                        help="bandwidth in MHz")
+    parser.add_argument("--lnb-lo", metavar="MHZ", type=float,
+                        help="LNB LO frequency in MHz")
+    parser.add_argument("--parse-process", action="store_const", const=1,
+                        help="run backend and parse its output in separate process")
+    parser.add_argument("--history-size", metavar="SWEEPS", type=int,
+                        help="number of sweeps kept in memory")
+    parser.add_argument("--precision", choices=["float64", "float32"],
+                        help="floating point precision of spectrum data (float32 needs half of memory)")
+    parser.add_argument("--history-storage", choices=["full", "int16", "uint8"],
+                        help="store history as 16-bit or 8-bit integers (in range given by --history-range) "
+                             "to save memory")
+    parser.add_argument("--history-range", metavar="MIN:MAX",
+                        help="range of values in dB stored in 16-bit or 8-bit history (default: -150:50)")
+    parser.add_argument("--processing-threads", metavar="THREADS", type=int,
+                        help="split very wide sweeps to chunks processed in parallel by given number of threads "
+                             "(0 for number of CPU cores, default: 1)")
+    parser.add_argument("--rebin-size", metavar="KHZ", type=float,
+                        help="rebin sweeps to coarser resolution before any other processing (0 to disable)")
+    parser.add_argument("--rebin-reducer", choices=["max", "mean", "power_mean"],
+                        help="reduce input bins to output bin by maximum, mean or mean of linear power")
+    parser.add_argument("--history-decimation", metavar="SWEEPS", type=int,
+                        help="reduce given number of consecutive sweeps to one row of history (default: 1)")
+    parser.add_argument("--history-reducer", choices=["max", "mean"],
+                        help="reduce sweeps to row of history by maximum or mean")
+    parser.add_argument("-o", "--output", metavar="FILE",
+                        help="record sweeps to file (in soapy_power binary format)")
+    parser.add_argument("--rollup-dir", metavar="DIR",
+                        help="directory for per-minute and per-hour rollups")
+    parser.add_argument("--metrics-port", metavar="PORT", type=int,
+                        help="export metrics in Prometheus format on http://127.0.0.1:PORT/metrics "
+                             "(0 to disable, default: disabled)")
+    parser.add_argument("-n", "--runs", type=int, default=0,
+                        help="stop after receiving given number of sweeps")
+    parser.add_argument("-t", "--time", metavar="SECONDS", type=float, default=0,
+                        help="stop after given time")
+    parser.add_argument("-1", "--single-shot", action="store_true",
+                        help="single shot measurement")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="profile all threads and write profiles to directory on exit")
+    parser.add_argument("--profile-mode", choices=["deterministic", "statistical"], default="deterministic",
+                        help="profiling mode (default: %(default)s)")
+    parser.add_argument("--version", action="version",
+                        version="%(prog)s {}".format(__version__))
+    args, unparsed_args = parser.parse_known_args()
+
+    overrides = {
+        "backend": args.backend,
+        "executable": args.executable if args.executable is not None else default_executable(args.backend),
+        "multi_backend": args.multi_backend,
+        "parse_process": args.parse_process,
+        "params": args.params,
+        "device": args.device,
+        "bin_size": args.bin_size,
+        "interval": args.interval,
+        "gain": args.gain,
+        "ppm": args.ppm,
+        "crop": args.crop,
+        "sample_rate": args.sample_rate * 1e6 if args.sample_rate is not None else None,
+        "bandwidth": args.bandwidth * 1e6 if args.bandwidth is not None else None,
+        "lnb_lo": args.lnb_lo * 1e6 if args.lnb_lo is not None else None,
+        "waterfall_history_size": args.history_size,
+        "precision": args.precision,
+        "history_storage": args.history_storage,
+        "processing_threads": args.processing_threads,
+        "rebin_size": args.rebin_size,
+        "rebin_reducer": args.rebin_reducer,
+        "history_decimation": args.history_decimation,
+        "history_reducer": args.history_reducer,
+        "rollup_directory": args.rollup_dir,
+        "metrics_port": args.metrics_port,
+    }
+    if args.freq:
+        try:
+            overrides["start_freq"], overrides["stop_freq"] = [float(f) for f in args.freq.split(":")]
+        except ValueError:
+            parser.error("invalid frequency range: {}".format(args.freq))
+    if args.history_range:
+        try:
+            overrides["history_range_min"], overrides["history_range_max"] = [
+                float(v) for v in args.history_range.split(":")
+            ]
+        except ValueError:
+            parser.error("invalid history range: {}".format(args.history_range))
+        if overrides["history_range_min"] >= overrides["history_range_max"]:
+            parser.error("invalid history range: {}".format(args.history_range))
+    if args.backend and args.params is None:
+        overrides["params"] = getattr(backends, args.backend).Info.additional_params
+
+    # Start Qt application (without GUI)
+    app = QtCore.QCoreApplication(sys.argv[:1] + unparsed_args)
+    app.setOrganizationName("QSpectrumAnalyzer")
+    app.setOrganizationDomain("qspectrumanalyzer.eutopia.cz")
+    settings_dir = setup_settings(args.settings_profile, overrides)
+
+    try:
+        if args.profile:
+            profiler.Profiler(args.profile, mode=args.profile_mode).start()
+
+        settings = QtCore.QSettings()
+        analyzer = HeadlessSpectrumAnalyzer(max_runs=args.runs)
+        if args.output:
+            analyzer.data_storage.add_recorder(RecordingWriter(args.output))
+        if settings.value("rollup_directory", ""):
+            analyzer.data_storage.add_recorder(Rollup(settings.value("rollup_directory")))
+        metrics_server = None
+        if settings.value("metrics_port", 0, int):
+            metrics_server = MetricsServer(analyzer, settings.value("metrics_port", 0, int))
+            metrics_server.start()
+
+        # Stop gracefully on CTRL+C or SIGTERM (timer lets Python interpreter handle signals)
+        signal.signal(signal.SIGINT, lambda signum, frame: QtCore.QTimer.singleShot(0, analyzer.stop))
+        signal.signal(signal.SIGTERM, lambda signum, frame: QtCore.QTimer.singleShot(0, analyzer.stop))
+        signal_timer = QtCore.QTimer()
+        signal_timer.timeout.connect(lambda: None)
+        signal_timer.start(200)
+
+        if args.time:
+            QtCore.QTimer.singleShot(int(args.time * 1000), analyzer.stop)
+
+        analyzer.start(single_shot=args.single_shot)
+        exit_code = app.exec_()
+        if metrics_server:
+            metrics_server.stop()
+        if profiler.current:
+            profiler.current.stop()
+        sys.exit(exit_code)
+    finally:
+        shutil.rmtree(settings_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import time, threading, collections
+
+import numpy as np
+
+
+class LatencyTracer:
+    """Latency histograms of sweep processing stages (from backend read to plot update)
+
+    Histograms are cumulative for whole session (they are exported as metrics, so they are never
+    reset by restart of measurement), mean and percentiles shown to user are computed only from
+    last recent_size sweeps.
+    """
+    # Every stage is measured from timestamp of its parent stage
+    stages = (
+        ("parse", "read"),
+        ("update", "parse"),
+        ("process", "update"),
+        ("history", "update"),
+        ("plot", "process"),
+        ("waterfall", "history"),
+        ("total", "read"),
+    )
+
+    # Upper bounds of histogram buckets (in seconds)
+    buckets = np.array([0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                        0.1, 0.25, 0.5, 1.0, 2.5, 5.0, np.inf])
+
+    # Number of last latencies of every stage used for mean and percentiles
+    recent_size = 256
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.parents = dict(self.stages)
+        self.reset()
+
+    def reset(self):
+        """Reset all histograms"""
+        with self._lock:
+            self.histograms = {stage: np.zeros(len(self.buckets), dtype=np.int64) for stage, parent in self.stages}
+            self.sums = {stage: 0.0 for stage, parent in self.stages}
+            self.counts = {stage: 0 for stage, parent in self.stages}
+            self.queue_depth = 0
+        self.reset_recent()
+
+    def reset_recent(self):
+        """Reset only recent latencies shown to user (cumulative histograms are kept)"""
+        with self._lock:
+            self.last = {stage: None for stage, parent in self.stages}
+            self.recent = {stage: collections.deque(maxlen=self.recent_size) for stage, parent in self.stages}
+            self.queue_depth_max = self.queue_depth
+
+    @staticmethod
+    def now():
+        """Return current timestamp used for tracing (system-wide clock, so that it can be compared
+        with timestamps of backend parser process)"""
+        return time.monotonic()
+
+    def stamp(self, trace, stage):
+        """Stamp sweep trace with current time and record latency of stage (only once per sweep)"""
+        if trace is None or stage in trace:
+            return
+
+        timestamp = self.now()
+        trace[stage] = timestamp
+        parent = trace.get(self.parents.get(stage))
+        if parent is not None:
+            self.observe(stage, timestamp - parent)
+
+    def observe(self, stage, value):
+        """Record latency of stage"""
+        with self._lock:
+            self.histograms[stage][np.searchsorted(self.buckets, value)] += 1
+            self.sums[stage] += value
+            self.counts[stage] += 1
+            self.last[stage] = value
+            self.recent[stage].append(value)
+
+    def task_queued(self):
+        """Increment number of queued tasks"""
+        with self._lock:
+            self.queue_depth += 1
+            self.queue_depth_max = max(self.queue_depth, self.queue_depth_max)
+
+    def task_done(self):
+        """Decrement number of queued tasks"""
+        with self._lock:
+            self.queue_depth -= 1
+
+    def mean(self, stage):
+        """Return mean latency of stage (of recent sweeps)"""
+        with self._lock:
+            recent = list(self.recent[stage])
+        return sum(recent) / len(recent) if recent else None
+
+    def percentile(self, stage, q):
+        """Return percentile of stage latency (of recent sweeps)"""
+        with self._lock:
+            recent = list(self.recent[stage])
+        return float(np.percentile(recent, q)) if recent else None
+
+    def report(self):
+        """Return detailed multiline report of latencies"""
+        lines = ["{:<10} {:>9} {:>9} {:>9} {:>8}".format("stage", "last", "mean", "p95", "count")]
+        for stage, parent in self.stages:
+            last, mean, p95 = self.last[stage], self.mean(stage), self.percentile(stage, 95)
+            lines.append("{:<10} {:>9} {:>9} {:>9} {:>8d}".format(
+                stage,
+                "{:.2f} ms".format(last * 1000) if last is not None else "-",
+                "{:.2f} ms".format(mean * 1000) if mean is not None else "-",
+                "{:.2f} ms".format(p95 * 1000) if p95 is not None else "-",
+                self.counts[stage]
+            ))
+        lines.append("queue depth: {:d} (max. {:d})".format(self.queue_depth, self.queue_depth_max))
+        return "\n".join(lines)
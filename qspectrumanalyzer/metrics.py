@@ -0,0 +1,145 @@
+import os, sys, threading, http.server
+
+import numpy as np
+
+
+class ProcessStats:
+    """CPU time and memory usage of backend process (read from /proc, only on Linux)"""
+    clock_ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+    page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    @classmethod
+    def read(cls, pid):
+        """Return (cpu_seconds, rss_bytes) of process or None if it is not available"""
+        try:
+            with open("/proc/{:d}/stat".format(pid)) as f:
+                stat = f.read()
+            with open("/proc/{:d}/statm".format(pid)) as f:
+                statm = f.read()
+        except OSError:
+            return None
+
+        # Process name can contain spaces, so skip everything up to closing parenthesis
+        fields = stat[stat.rfind(")") + 2:].split()
+        utime, stime = int(fields[11]), int(fields[12])
+        rss = int(statm.split()[1])
+        return (utime + stime) / cls.clock_ticks, rss * cls.page_size
+
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    """HTTP request handler which serves metrics in Prometheus text format"""
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+
+        body = self.server.metrics.collect().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """Local HTTP endpoint exporting counters and gauges of running analyzer in Prometheus format
+
+    Analyzer is any object with data_storage and power_thread attributes (they are looked up
+    on every request, so they can be replaced when backend is reconfigured).
+    """
+    prefix = "qspectrumanalyzer"
+
+    def __init__(self, analyzer, port, host="127.0.0.1"):
+        self.analyzer = analyzer
+        self.port = port
+        self.host = host
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        """Start HTTP server in background thread"""
+        try:
+            self.server = http.server.HTTPServer((self.host, self.port), MetricsHandler)
+        except OSError as e:
+            print("Can't start metrics server on {}:{:d}: {}".format(self.host, self.port, e), file=sys.stderr)
+            self.server = None
+            return
+
+        self.server.metrics = self
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop HTTP server"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join()
+            self.server = None
+            self.thread = None
+
+    def collect(self):
+        """Return all metrics in Prometheus text format"""
+        lines = []
+        data_storage = self.analyzer.data_storage
+        power_thread = self.analyzer.power_thread
+
+        def metric(name, metric_type, help_text, samples):
+            name = "{}_{}".format(self.prefix, name)
+            lines.append("# HELP {} {}".format(name, help_text))
+            lines.append("# TYPE {} {}".format(name, metric_type))
+            for suffix, labels, value in samples:
+                labels = "{{{}}}".format(",".join('{}="{}"'.format(k, v) for k, v in labels)) if labels else ""
+                lines.append("{}{}{} {}".format(name, suffix, labels, format_value(value)))
+
+        if data_storage:
+            metric("sweeps_total", "counter", "Number of sweeps received from backend",
+                   [("", None, data_storage.sweeps_total)])
+            metric("rejected_sweeps_total", "counter",
+                   "Number of sweeps rejected because their frequency range doesn't overlap with first sweep",
+                   [("", None, data_storage.rejected_sweeps_total)])
+            metric("resampled_sweeps_total", "counter",
+                   "Number of sweeps resampled because of mismatched frequency axis",
+                   [("", None, data_storage.resampled_sweeps_total)])
+            metric("sweep_rate", "gauge", "Number of sweeps per second (from interval between last two sweeps)",
+                   [("", None, 1 / data_storage.sweep_interval if data_storage.sweep_interval else 0)])
+            metric("bins_per_sweep", "gauge", "Number of bins in last sweep",
+                   [("", None, data_storage.bins)])
+            metric("queue_depth", "gauge", "Number of tasks queued for data storage worker threads",
+                   [("", None, data_storage.tracer.queue_depth)])
+
+            tracer = data_storage.tracer
+            samples = []
+            with tracer._lock:
+                for stage, parent in tracer.stages:
+                    labels = [("stage", stage)]
+                    for le, count in zip(tracer.buckets, np.cumsum(tracer.histograms[stage])):
+                        samples.append(("_bucket", labels + [("le", format_value(le))], count))
+                    samples.append(("_sum", labels, tracer.sums[stage]))
+                    samples.append(("_count", labels, tracer.counts[stage]))
+            metric("stage_latency_seconds", "histogram", "Latency of sweep processing stages", samples)
+
+        if power_thread:
+            metric("backend_running", "gauge", "Backend process is running",
+                   [("", None, int(power_thread.alive))])
+            process = power_thread.process
+            stats = ProcessStats.read(process.pid) if process else None
+            if stats:
+                metric("backend_cpu_seconds_total", "counter", "CPU time used by backend process",
+                       [("", None, stats[0])])
+                metric("backend_resident_memory_bytes", "gauge", "Resident memory size of backend process",
+                       [("", None, stats[1])])
+
+        return "\n".join(lines) + "\n"
+
+
+def format_value(value):
+    """Format metric value in Prometheus text format"""
+    if value == np.inf:
+        return "+Inf"
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    return repr(float(value))
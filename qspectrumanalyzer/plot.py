@@ -1,10 +1,64 @@
 import collections, math
 
-from Qt import QtCore
+from Qt import QtCore, QtGui
+import numpy as np
 import pyqtgraph as pg
 
-# Basic PyQtGraph settings
-pg.setConfigOptions(antialias=True)
+# Basic PyQtGraph settings are applied when first plot is created
+pyqtgraph_configured = False
+
+
+def setup_pyqtgraph():
+    """Set basic PyQtGraph settings (only once)"""
+    global pyqtgraph_configured
+    if not pyqtgraph_configured:
+        pg.setConfigOptions(antialias=True)
+        pyqtgraph_configured = True
+
+
+class ScaledAxisItem(pg.AxisItem):
+    """Axis with ticks placed and labeled in units of data (value = position * scale + offset)"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.value_scale = 1
+        self.value_offset = 0
+
+    def set_value_scale(self, scale, offset):
+        """Set scale and offset of data values"""
+        self.value_scale = scale
+        self.value_offset = offset
+        self.picture = None
+        self.update()
+
+    def tickValues(self, minVal, maxVal, size):
+        if self.value_scale == 1 and self.value_offset == 0:
+            return super().tickValues(minVal, maxVal, size)
+
+        # Ticks are computed for range of data values and mapped back to positions
+        levels = super().tickValues(minVal * self.value_scale + self.value_offset,
+                                    maxVal * self.value_scale + self.value_offset, size)
+        return [(spacing / self.value_scale, [(v - self.value_offset) / self.value_scale for v in values])
+                for spacing, values in levels]
+
+    def tickStrings(self, values, scale, spacing):
+        if self.value_scale == 1 and self.value_offset == 0:
+            return super().tickStrings(values, scale, spacing)
+
+        return super().tickStrings([v * self.value_scale + self.value_offset for v in values],
+                                   scale, spacing * self.value_scale)
+
+
+class ScaledHistogramLUTItem(pg.HistogramLUTItem):
+    """Histogram widget with axis labeled in units of data (e.g. for image of quantized codes)"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Replace default axis (it is in first column of vertical histogram)
+        axis = ScaledAxisItem(self.axis.orientation, linkView=self.vb, maxTickLength=-10, parent=self)
+        self.layout.removeItem(self.axis)
+        self.axis.setParentItem(None)
+        self.axis = axis
+        self.layout.addItem(self.axis, 0, 0)
 
 
 class SpectrumPlotWidget:
@@ -13,6 +67,7 @@ class SpectrumPlotWidget:
         if not isinstance(layout, pg.GraphicsLayoutWidget):
             raise ValueError("layout must be instance of pyqtgraph.GraphicsLayoutWidget")
 
+        setup_pyqtgraph()
         self.layout = layout
 
         self.main_curve = True
@@ -31,6 +86,7 @@ class SpectrumPlotWidget:
         self.average_color = pg.mkColor("c")
         self.baseline = False
         self.baseline_color = pg.mkColor("m")
+        self.hud = False
 
         self.create_plot()
 
@@ -53,6 +109,7 @@ class SpectrumPlotWidget:
         self.create_peak_hold_min_curve()
         self.create_peak_hold_max_curve()
         self.create_main_curve()
+        self.create_hud()
 
         # Create crosshair
         self.vLine = pg.InfiniteLine(angle=90, movable=False)
@@ -89,6 +146,15 @@ class SpectrumPlotWidget:
         self.curve_baseline = self.plot.plot(pen=self.baseline_color)
         self.curve_baseline.setZValue(500)
 
+    def create_hud(self):
+        """Create performance HUD (text overlay in top left corner of plot)"""
+        self.hud_text = pg.TextItem(anchor=(0, 0), color=(255, 255, 255, 200), fill=(0, 0, 0, 150))
+        self.hud_text.setFont(QtGui.QFont("monospace"))
+        self.hud_text.setParentItem(self.plot.vb)
+        self.hud_text.setPos(10, 10)
+        self.hud_text.setZValue(2000)
+        self.hud_text.setVisible(self.hud)
+
     def create_persistence_curves(self):
         """Create spectrum persistence curves"""
         z_index_base = 600
@@ -132,41 +198,47 @@ class SpectrumPlotWidget:
 
     def update_plot(self, data_storage, force=False):
         """Update main spectrum curve"""
-        if data_storage.x is None:
+        frame = data_storage.frame
+        if frame is None or frame.y is None:
             return
 
         if self.main_curve or force:
-            self.curve.setData(data_storage.x, data_storage.y)
+            self.curve.setData(frame.x, frame.y)
+            data_storage.tracer.stamp(frame.trace, "plot")
+            data_storage.tracer.stamp(frame.trace, "total")
             if force:
                 self.curve.setVisible(self.main_curve)
 
     def update_peak_hold_max(self, data_storage, force=False):
         """Update max. peak hold curve"""
-        if data_storage.x is None:
+        frame = data_storage.frame
+        if frame is None or frame.peak_hold_max is None:
             return
 
         if self.peak_hold_max or force:
-            self.curve_peak_hold_max.setData(data_storage.x, data_storage.peak_hold_max)
+            self.curve_peak_hold_max.setData(frame.x, frame.peak_hold_max)
             if force:
                 self.curve_peak_hold_max.setVisible(self.peak_hold_max)
 
     def update_peak_hold_min(self, data_storage, force=False):
         """Update min. peak hold curve"""
-        if data_storage.x is None:
+        frame = data_storage.frame
+        if frame is None or frame.peak_hold_min is None:
             return
 
         if self.peak_hold_min or force:
-            self.curve_peak_hold_min.setData(data_storage.x, data_storage.peak_hold_min)
+            self.curve_peak_hold_min.setData(frame.x, frame.peak_hold_min)
             if force:
                 self.curve_peak_hold_min.setVisible(self.peak_hold_min)
 
     def update_average(self, data_storage, force=False):
         """Update average curve"""
-        if data_storage.x is None:
+        frame = data_storage.frame
+        if frame is None or frame.average is None:
             return
 
         if self.average or force:
-            self.curve_average.setData(data_storage.x, data_storage.average)
+            self.curve_average.setData(frame.x, frame.average)
             if force:
                 self.curve_average.setVisible(self.average)
 
@@ -183,7 +255,8 @@ class SpectrumPlotWidget:
 
     def update_persistence(self, data_storage, force=False):
         """Update persistence curves"""
-        if data_storage.x is None:
+        frame = data_storage.frame
+        if frame is None or frame.y is None:
             return
 
         if self.persistence or force:
@@ -192,14 +265,23 @@ class SpectrumPlotWidget:
             else:
                 for i, y in enumerate(self.persistence_data):
                     curve = self.persistence_curves[i]
-                    curve.setData(data_storage.x, y)
+                    curve.setData(frame.x, y)
                     if force:
                         curve.setVisible(self.persistence)
-            self.persistence_data.appendleft(data_storage.y)
+
+            # Arrays of frame are reused by data storage, so persistence keeps its own copy
+            self.persistence_data.appendleft(frame.y.copy())
+
+    def update_hud(self, data_storage, force=False):
+        """Update performance HUD"""
+        if self.hud or force:
+            self.hud_text.setText(data_storage.tracer.report())
+            if force:
+                self.hud_text.setVisible(self.hud)
 
     def recalculate_plot(self, data_storage):
         """Recalculate plot from history"""
-        if data_storage.x is None:
+        if data_storage.frame is None:
             return
 
         QtCore.QTimer.singleShot(0, lambda: self.update_plot(data_storage, force=True))
@@ -210,13 +292,14 @@ class SpectrumPlotWidget:
 
     def recalculate_persistence(self, data_storage):
         """Recalculate persistence data and update persistence curves"""
-        if data_storage.x is None:
+        frame = data_storage.frame
+        if frame is None or frame.history is None:
             return
 
         self.clear_persistence()
         self.persistence_data = collections.deque(maxlen=self.persistence_length)
-        for i in range(min(self.persistence_length, data_storage.history.history_size - 1)):
-            data = data_storage.history[-i - 2]
+        for i in range(min(self.persistence_length, frame.history_size - 1)):
+            data = frame.history[-i - 2] * frame.history_scale + frame.history_offset
             if data_storage.smooth:
                 data = data_storage.smooth_data(data)
             self.persistence_data.append(data)
@@ -274,6 +357,7 @@ class WaterfallPlotWidget:
         if histogram_layout and not isinstance(histogram_layout, pg.GraphicsLayoutWidget):
             raise ValueError("histogram_layout must be instance of pyqtgraph.GraphicsLayoutWidget")
 
+        setup_pyqtgraph()
         self.layout = layout
         self.histogram_layout = histogram_layout
 
@@ -298,7 +382,7 @@ class WaterfallPlotWidget:
 
         # Setup histogram widget (for controlling waterfall plot levels and gradients)
         if self.histogram_layout:
-            self.histogram = pg.HistogramLUTItem()
+            self.histogram = ScaledHistogramLUTItem()
             self.histogram_layout.addItem(self.histogram)
             self.histogram.gradient.loadPreset("flame")
             #self.histogram.setHistogramRange(-50, 0)
@@ -306,43 +390,109 @@ class WaterfallPlotWidget:
 
     def update_plot(self, data_storage):
         """Update waterfall plot"""
-        self.counter += 1
+        frame = data_storage.frame
+        if frame is None or frame.history is None:
+            return
+
+        # Frames can be skipped when GUI is slower than worker, so number of rows is taken from frame
+        first_run = self.counter == 0
+        self.counter = frame.history_size
 
         # Create waterfall image on first run
-        if self.counter == 1:
+        if first_run:
             self.waterfallImg = pg.ImageItem()
-            self.waterfallImg.scale((data_storage.x[-1] - data_storage.x[0]) / len(data_storage.x), 1)
+            self.waterfallImg.scale(frame.grid.bin_width, 1)
             self.plot.clear()
             self.plot.addItem(self.waterfallImg)
 
+            # Quantized history is displayed directly (integer codes are used as indexes to lookup table)
+            self.set_histogram_scale(frame.history_scale, frame.history_offset)
+
         # Roll down one and replace leading edge with new data
-        self.waterfallImg.setImage(data_storage.history.buffer[-self.counter:].T,
-                                   autoLevels=False, autoRange=False)
+        self.waterfallImg.setImage(frame.history[-self.counter:].T, autoLevels=False, autoRange=False)
+        data_storage.tracer.stamp(frame.history_trace, "waterfall")
 
         # Move waterfall image to always start at 0
         self.waterfallImg.setPos(
-            data_storage.x[0],
+            frame.grid.start - frame.grid.bin_width / 2,
             -self.counter if self.counter < self.history_size else -self.history_size
         )
 
         # Link histogram widget to waterfall image on first run
         # (must be done after first data is received or else levels would be wrong)
-        if self.counter == 1 and self.histogram_layout:
+        if first_run and self.histogram_layout:
             self.histogram.setImageItem(self.waterfallImg)
 
     def clear_plot(self):
         """Clear waterfall plot"""
         self.counter = 0
+        self.plot.clear()
+
+    def set_histogram_scale(self, scale, offset):
+        """Label histogram widget axis in units of data (value = image * scale + offset)"""
+        if not self.histogram_layout:
+            return
+
+        self.histogram.axis.set_value_scale(scale, offset)
 
     def recalculate_plot(self, data_storage):
         """Recalculate waterfall plot"""
-        if data_storage.x is None:
+        frame = data_storage.frame
+        if frame is None or frame.history is None or not self.counter:
             return
 
-        self.waterfallImg.setImage(data_storage.history.buffer[-self.counter:].T,
-                                   autoLevels=False, autoRange=False)
+        self.waterfallImg.setImage(frame.history[-self.counter:].T, autoLevels=False, autoRange=False)
         self.waterfallImg.setPos(
-            data_storage.x[0],
+            frame.grid.start - frame.grid.bin_width / 2,
             -self.counter if self.counter < self.history_size else -self.history_size
         )
         self.histogram.setImageItem(self.waterfallImg)
+
+
+class TrendPlotWidget:
+    """Zoomed-out waterfall plot of spectrum rollups"""
+    def __init__(self, layout):
+        if not isinstance(layout, pg.GraphicsLayoutWidget):
+            raise ValueError("layout must be instance of pyqtgraph.GraphicsLayoutWidget")
+
+        setup_pyqtgraph()
+        self.layout = layout
+
+        self.create_plot()
+
+    def create_plot(self):
+        """Create trend plot"""
+        self.plot = self.layout.addPlot()
+        self.plot.setLabel("bottom", "Frequency", units="Hz")
+        self.plot.setLabel("left", "Time [hours]")
+        self.plot.showButtons()
+
+        self.image = pg.ImageItem()
+        self.plot.addItem(self.image)
+
+        # Setup histogram widget (for controlling trend plot levels and gradients)
+        self.histogram = pg.HistogramLUTItem()
+        self.layout.addItem(self.histogram)
+        self.histogram.gradient.loadPreset("flame")
+        self.histogram.setImageItem(self.image)
+
+    def update_plot(self, tier, rows, start_time, stop_time, statistic):
+        """Update trend plot with rollup rows (rows are placed by timestamp, so gaps stay visible)"""
+        if not len(rows):
+            self.image.clear()
+            return
+
+        data = rows[statistic]
+        size = max(int(math.ceil((stop_time - start_time) / tier.interval)), 1)
+        image = np.full((size, data.shape[1]), data.min(), dtype=np.float32)
+        indexes = ((rows["timestamp"] - start_time) // tier.interval).astype(int)
+        image[np.clip(indexes, 0, size - 1)] = data
+        self.image.setImage(image.T, autoLevels=True)
+
+        # Image is placed in frequency (x) and hours relative to stop time (y)
+        bin_width = (tier.x[-1] - tier.x[0]) / (len(tier.x) - 1) if len(tier.x) > 1 else 1
+        self.image.setRect(QtCore.QRectF(
+            tier.x[0] - bin_width / 2, (start_time - stop_time) / 3600,
+            bin_width * len(tier.x), size * tier.interval / 3600
+        ))
+        self.plot.autoRange()
@@ -0,0 +1,210 @@
+import os, sys, time, threading, collections, cProfile
+
+# Currently active profiler (profiling hooks do nothing if it is None)
+current = None
+
+
+class StartupTimer:
+    """Duration of application startup phases (to find out where launch time goes)"""
+    def __init__(self):
+        self.start = self.timestamp = time.perf_counter()
+        self.phases = []
+
+    def mark(self, phase):
+        """Mark end of startup phase"""
+        timestamp = time.perf_counter()
+        self.phases.append((phase, timestamp - self.timestamp))
+        self.timestamp = timestamp
+
+    def report(self):
+        """Return multiline report of startup phases"""
+        lines = ["{:<20} {:>10}".format(phase, "{:.1f} ms".format(duration * 1000))
+                 for phase, duration in self.phases]
+        lines.append("{:<20} {:>10}".format("total", "{:.1f} ms".format((self.timestamp - self.start) * 1000)))
+        return "\n".join(lines)
+
+
+class Profiler:
+    """Profiler of all application threads (GUI thread, backend power thread and data storage workers)
+
+    In deterministic mode every thread is profiled by its own cProfile profiler for whole
+    session and profiles are written in pstats format on exit. In statistical mode stacks
+    of all threads are periodically sampled and written in collapsed (flame graph) format.
+
+    Python 3.12+ allows only one active cProfile profiler in process, so statistical mode
+    is used there instead of deterministic mode.
+    """
+    def __init__(self, directory, mode="deterministic", interval=0.005):
+        self.directory = directory
+        self.mode = mode
+        self.interval = interval
+        self.prefix = "qspectrumanalyzer-{:d}".format(os.getpid())
+
+        self._lock = threading.Lock()
+        self.thread_names = {}
+        self.profiles = {}
+        self.samples = collections.Counter()
+        self.samples_counter = 0
+        self.sampler = None
+        self.sampling = False
+
+    def start(self):
+        """Start profiling of current thread (and all threads registered later)"""
+        global current
+        if self.mode == "deterministic" and sys.version_info >= (3, 12):
+            self.fallback("deterministic profiling of multiple threads is not supported by Python 3.12+")
+        current = self
+        self.thread_started("gui")
+        if self.mode == "statistical":
+            self.start_sampling()
+
+    def stop(self):
+        """Stop profiling and write all profiles to disk"""
+        global current
+        self.thread_finished()
+        self.stop_sampling()
+        current = None
+        self.dump()
+
+    def thread_started(self, name):
+        """Register current thread (and start profiling it in deterministic mode)"""
+        ident = threading.get_ident()
+        with self._lock:
+            self.thread_names[ident] = name
+            if self.mode != "deterministic":
+                return
+            profile = self.profiles.get(ident)
+            if profile is None:
+                profile = self.profiles[ident] = cProfile.Profile()
+
+        try:
+            profile.enable()
+        except ValueError as e:
+            if self.fallback("can't profile thread {}: {}".format(name, e)) and current is self:
+                self.start_sampling()
+
+    def fallback(self, reason):
+        """Switch to statistical mode when deterministic profiling is not possible (warns only once)
+
+        Already enabled profilers are disabled by their threads, but their profiles are not written.
+        """
+        with self._lock:
+            if self.mode != "deterministic":
+                return False
+            self.mode = "statistical"
+
+        print("Profiler: {}, using statistical mode".format(reason), file=sys.stderr)
+        return True
+
+    def thread_finished(self):
+        """Stop profiling current thread"""
+        profile = self.profiles.get(threading.get_ident())
+        if profile is not None:
+            profile.disable()
+
+    def call(self, name, fn, *args, **kwargs):
+        """Run function in profiled context of current thread"""
+        self.thread_started(name)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.thread_finished()
+
+    def start_sampling(self):
+        """Start periodic sampling of stacks of all threads"""
+        if self.sampling:
+            return
+
+        self.sampling = True
+        self.sampler = threading.Thread(target=self.sample, name="profiler", daemon=True)
+        self.sampler.start()
+        print("Profiler: sampling started", file=sys.stderr)
+
+    def stop_sampling(self):
+        """Stop periodic sampling and write samples to disk"""
+        if not self.sampling:
+            return
+
+        self.sampling = False
+        self.sampler.join()
+        self.sampler = None
+        self.dump_samples()
+
+    def toggle_sampling(self):
+        """Start or stop periodic sampling (e.g. when hotkey is pressed)"""
+        if self.sampling:
+            self.stop_sampling()
+        else:
+            self.start_sampling()
+
+    def sample(self):
+        """Sample stacks of all threads (runs in sampler thread)"""
+        own_ident = threading.get_ident()
+        while self.sampling:
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append("{} ({}:{:d})".format(code.co_name, os.path.basename(code.co_filename),
+                                                       code.co_firstlineno))
+                    frame = frame.f_back
+                stack.append(self.thread_names.get(ident, "thread-{:d}".format(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def dump(self):
+        """Write profiles of all threads (and their combination) to disk in pstats format"""
+        if not self.profiles or self.mode != "deterministic":
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        stats = []
+        for ident, profile in self.profiles.items():
+            name = self.thread_names.get(ident, "thread-{:d}".format(ident))
+            filename = os.path.join(self.directory, "{}-{}-{:d}.prof".format(self.prefix, name, ident))
+            profile.dump_stats(filename)
+            if profile.stats:
+                stats.append(profile)
+            print("Profiler: {} profile written to {}".format(name, filename), file=sys.stderr)
+
+        if stats:
+            import pstats
+            filename = os.path.join(self.directory, "{}-all.prof".format(self.prefix))
+            pstats.Stats(*stats).dump_stats(filename)
+            print("Profiler: combined profile written to {}".format(filename), file=sys.stderr)
+
+    def dump_samples(self):
+        """Write sampled stacks to disk in collapsed format (usable by flamegraph.pl or speedscope)"""
+        if not self.samples:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.samples_counter += 1
+        filename = os.path.join(self.directory, "{}-samples-{:d}.folded".format(self.prefix, self.samples_counter))
+        with open(filename, 'w') as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write("{} {:d}\n".format(stack, count))
+        self.samples.clear()
+        print("Profiler: samples written to {}".format(filename), file=sys.stderr)
+
+
+def thread_started(name):
+    """Register current thread with active profiler"""
+    if current:
+        current.thread_started(name)
+
+
+def thread_finished():
+    """Stop profiling current thread by active profiler"""
+    if current:
+        current.thread_finished()
+
+
+def call(name, fn, *args, **kwargs):
+    """Run function in context of active profiler"""
+    if current:
+        return current.call(name, fn, *args, **kwargs)
+    return fn(*args, **kwargs)
@@ -0,0 +1,201 @@
+import os, sys, struct
+
+import numpy as np
+
+from qspectrumanalyzer.backends import soapy_power
+
+
+class RecordingIndex:
+    """Sidecar index of sweeps in soapy_power binary recording
+
+    Index is stored next to recording (with .idx suffix) and maps timestamp of each sweep
+    to its byte offset and frequency span, so that sweeps recorded in arbitrary time range
+    can be found by binary search and read without scanning whole recording.
+    """
+    magic = b'QSAIDX'
+    version = 1
+    header_struct = struct.Struct('<6sBxQd')
+    entry_dtype = np.dtype([
+        ("time_start", "<f8"),
+        ("time_stop", "<f8"),
+        ("offset", "<u8"),
+        ("start", "<f8"),
+        ("stop", "<f8"),
+    ])
+
+    def __init__(self, filename, update=True):
+        self.filename = filename
+        self.index_filename = filename + ".idx"
+        self.indexed_size = 0
+        self.min_freq = None
+        self.entries = np.empty(0, dtype=self.entry_dtype)
+
+        self.load()
+        if update:
+            self.update()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, key):
+        return self.entries[key]
+
+    def load(self):
+        """Load index from sidecar file (if it exists and is valid)"""
+        if not os.path.isfile(self.index_filename):
+            return
+
+        with open(self.index_filename, 'rb') as f:
+            header = f.read(self.header_struct.size)
+            if len(header) < self.header_struct.size:
+                return
+
+            magic, version, indexed_size, min_freq = self.header_struct.unpack(header)
+            if magic != self.magic or version != self.version:
+                print("Ignoring invalid index file {}".format(self.index_filename), file=sys.stderr)
+                return
+
+            self.entries = np.fromfile(f, dtype=self.entry_dtype)
+            self.indexed_size = indexed_size
+            self.min_freq = min_freq if len(self.entries) else None
+
+    def save(self, keep_entries=0):
+        """Save index to sidecar file (first keep_entries entries are expected to be already saved)"""
+        header = self.header_struct.pack(self.magic, self.version, self.indexed_size,
+                                         self.min_freq if self.min_freq is not None else 0)
+
+        if keep_entries and os.path.isfile(self.index_filename):
+            # Rewrite only header and entries appended since last save
+            with open(self.index_filename, 'r+b') as f:
+                f.seek(self.header_struct.size + keep_entries * self.entry_dtype.itemsize)
+                f.write(self.entries[keep_entries:].tobytes())
+                f.truncate()
+                f.seek(0)
+                f.write(header)
+        else:
+            with open(self.index_filename, 'wb') as f:
+                f.write(header)
+                f.write(self.entries.tobytes())
+
+    def update(self):
+        """Index data appended to recording since last update"""
+        formatter = soapy_power.get_formatter()
+        if not formatter:
+            return
+
+        size = os.path.getsize(self.filename)
+
+        # Recording was truncated or replaced, reindex it from scratch
+        if size < self.indexed_size:
+            self.indexed_size = 0
+            self.min_freq = None
+            self.entries = np.empty(0, dtype=self.entry_dtype)
+
+        if size == self.indexed_size:
+            return
+
+        # Last sweep could have been incomplete during previous update, so index it again
+        keep_entries = max(len(self.entries) - 1, 0)
+        offset = int(self.entries[-1]["offset"]) if len(self.entries) else 0
+
+        entries = []
+        sweep = None
+        indexed_size = offset
+        with open(self.filename, 'rb') as f:
+            f.seek(offset)
+            while True:
+                record_offset = f.tell()
+                magic = f.read(len(formatter.magic))
+                if len(magic) < len(formatter.magic):
+                    break
+                if magic != formatter.magic:
+                    print("Magic bytes not found at offset {:d} in {}".format(record_offset, self.filename),
+                          file=sys.stderr)
+                    break
+
+                header = f.read(formatter.header_struct.size)
+                if len(header) < formatter.header_struct.size:
+                    break
+                header = formatter.header._make(formatter.header_struct.unpack(header))
+
+                # Skip power data (and stop at incomplete record which is still being written)
+                record_end = record_offset + formatter.header_size() + header.size
+                if record_end > size:
+                    break
+                f.seek(record_end)
+
+                if self.min_freq is None:
+                    self.min_freq = header.start
+
+                if sweep is None or header.start == self.min_freq:
+                    if sweep is not None:
+                        entries.append(tuple(sweep))
+                    sweep = [header.time_start, header.time_stop, record_offset, header.start, header.stop]
+                else:
+                    sweep[1] = header.time_stop
+                    sweep[3] = min(sweep[3], header.start)
+                    sweep[4] = max(sweep[4], header.stop)
+
+                indexed_size = record_end
+
+        if sweep is not None:
+            entries.append(tuple(sweep))
+
+        self.entries = np.concatenate((self.entries[:keep_entries],
+                                       np.array(entries, dtype=self.entry_dtype)))
+        self.indexed_size = indexed_size
+        self.save(keep_entries)
+
+    def find(self, timestamp):
+        """Return number of first sweep which ended at or after timestamp"""
+        return int(np.searchsorted(self.entries["time_stop"], timestamp, side="left"))
+
+    def offsets(self, start_time=None, stop_time=None):
+        """Return byte range of sweeps recorded between start_time and stop_time"""
+        first = self.find(start_time) if start_time is not None else 0
+        if stop_time is not None:
+            last = int(np.searchsorted(self.entries["time_start"], stop_time, side="right"))
+        else:
+            last = len(self.entries)
+
+        if first >= last:
+            return (self.indexed_size, self.indexed_size)
+
+        start_offset = int(self.entries[first]["offset"])
+        stop_offset = int(self.entries[last]["offset"]) if last < len(self.entries) else self.indexed_size
+        return (start_offset, stop_offset)
+
+    def read(self, start_time=None, stop_time=None):
+        """Generator for reading sweeps recorded between start_time and stop_time"""
+        start_offset, stop_offset = self.offsets(start_time, stop_time)
+        if start_offset >= stop_offset:
+            return
+
+        with open(self.filename, 'rb') as f:
+            f.seek(start_offset)
+            yield from soapy_power.read_from_file(f, stop_offset=stop_offset)
+
+
+class RecordingWriter:
+    """Recorder which writes sweeps to soapy_power binary file (every sweep as one record)"""
+    def __init__(self, filename):
+        self.formatter = soapy_power.get_formatter()
+        if not self.formatter:
+            raise RuntimeError("soapy_power module is required for writing recordings")
+
+        self.filename = filename
+        self.f = open(filename, 'ab')
+
+    def update(self, timestamp, x, y):
+        """Write one sweep to recording"""
+        step = (x[-1] - x[0]) / (len(x) - 1) if len(x) > 1 else 0
+        self.formatter.write(self.f, timestamp, timestamp, x[0], x[-1] + step, step, 0,
+                             np.asarray(y, dtype=np.float32))
+
+    def close(self):
+        """Close recording and update its index"""
+        if self.f.closed:
+            return
+
+        self.f.close()
+        RecordingIndex(self.filename)
@@ -0,0 +1,190 @@
+import os, sys, glob, math, struct
+
+import numpy as np
+
+
+class RollupTier:
+    """Spectrum rollup tier (max, mean and min of every bin over fixed time interval) stored on disk"""
+    magic = b'QSAROL'
+    version = 1
+    header_struct = struct.Struct('<6sBxdQ')
+
+    def __init__(self, directory, interval, x):
+        self.directory = directory
+        self.interval = interval
+        self.x = np.asarray(x, dtype=np.float64)
+        self.bins = len(self.x)
+        self.row_dtype = np.dtype([
+            ("timestamp", "<f8"),
+            ("count", "<u8"),
+            ("max", "<f4", (self.bins,)),
+            ("mean", "<f4", (self.bins,)),
+            ("min", "<f4", (self.bins,)),
+        ])
+        self.filename = os.path.join(directory, "rollup_{:d}s_{:d}_{:d}_{:d}.bin".format(
+            int(interval), int(self.x[0]), int(self.x[-1]), self.bins
+        ))
+        self.data_offset = self.header_struct.size + self.x.nbytes
+        self.resumed = False
+        self.reset()
+
+    @classmethod
+    def open(cls, filename):
+        """Open existing tier file (for reading)"""
+        with open(filename, 'rb') as f:
+            magic, version, interval, bins = cls.header_struct.unpack(f.read(cls.header_struct.size))
+            if magic != cls.magic or version != cls.version:
+                raise ValueError("{} is not rollup file".format(filename))
+            x = np.frombuffer(f.read(bins * 8), dtype=np.float64)
+        return cls(os.path.dirname(filename), interval, x)
+
+    def reset(self):
+        """Reset accumulators of current time bucket"""
+        self.bucket = None
+        self.count = 0
+        self.max = None
+        self.sum = None
+        self.min = None
+        self.replace_last = False
+
+    def resume(self, bucket):
+        """Continue last time bucket written to disk if it is the same as given bucket
+
+        Partially filled bucket is written on close, so it is loaded again (and its row
+        is replaced on next flush) when rollups are reopened before the bucket ends.
+        """
+        rows = self.read()
+        if not len(rows) or rows[-1]["timestamp"] != bucket:
+            return
+
+        row = rows[-1]
+        self.count = int(row["count"])
+        self.max = np.array(row["max"], dtype=np.float32)
+        self.sum = row["mean"].astype(np.float64) * self.count
+        self.min = np.array(row["min"], dtype=np.float32)
+        self.replace_last = True
+
+    def update(self, timestamp, y):
+        """Add sweep to current time bucket (bucket is written to disk when next one starts)"""
+        bucket = math.floor(timestamp / self.interval) * self.interval
+        if bucket != self.bucket:
+            self.flush()
+            self.bucket = bucket
+            if not self.resumed:
+                self.resumed = True
+                self.resume(bucket)
+
+        self.count += 1
+        if self.max is None:
+            self.max = np.array(y, dtype=np.float32)
+            self.sum = np.array(y, dtype=np.float64)
+            self.min = np.array(y, dtype=np.float32)
+        else:
+            np.maximum(self.max, y, out=self.max)
+            self.sum += y
+            np.minimum(self.min, y, out=self.min)
+
+    def flush(self):
+        """Write current time bucket to disk"""
+        if not self.count:
+            return
+
+        row = np.zeros(1, dtype=self.row_dtype)
+        row["timestamp"] = self.bucket
+        row["count"] = self.count
+        row["max"] = self.max
+        row["mean"] = self.sum / self.count
+        row["min"] = self.min
+
+        if not os.path.isfile(self.filename):
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.filename, 'wb') as f:
+                f.write(self.header_struct.pack(self.magic, self.version, self.interval, self.bins))
+                f.write(self.x.tobytes())
+
+        if self.replace_last:
+            with open(self.filename, 'r+b') as f:
+                f.seek(-self.row_dtype.itemsize, os.SEEK_END)
+                f.write(row.tobytes())
+        else:
+            with open(self.filename, 'ab') as f:
+                f.write(row.tobytes())
+
+        self.reset()
+
+    def read(self, start_time=None, stop_time=None):
+        """Return rows with timestamp between start_time and stop_time (memory mapped from disk)"""
+        if not os.path.isfile(self.filename) or os.path.getsize(self.filename) <= self.data_offset:
+            return np.empty(0, dtype=self.row_dtype)
+
+        rows = np.memmap(self.filename, dtype=self.row_dtype, mode='r', offset=self.data_offset)
+        timestamps = rows["timestamp"]
+        first = np.searchsorted(timestamps, start_time, side="left") if start_time is not None else 0
+        last = np.searchsorted(timestamps, stop_time, side="right") if stop_time is not None else len(rows)
+        return rows[first:last]
+
+
+class Rollup:
+    """Multi-tier spectrum rollups (e.g. per-minute and per-hour max, mean and min of every bin)"""
+    def __init__(self, directory, intervals=(60, 3600)):
+        self.directory = directory
+        self.intervals = sorted(intervals)
+        self.x = None
+        self.tiers = []
+
+    def update(self, timestamp, x, y):
+        """Update all rollup tiers with new sweep"""
+        if self.x is None or len(x) != len(self.x) or x[0] != self.x[0] or x[-1] != self.x[-1]:
+            self.close()
+            self.x = np.array(x, dtype=np.float64)
+            self.tiers = [RollupTier(self.directory, interval, self.x) for interval in self.intervals]
+
+        for tier in self.tiers:
+            try:
+                tier.update(timestamp, y)
+            except OSError as e:
+                print("Can't write rollup file {}: {}".format(tier.filename, e), file=sys.stderr)
+                tier.reset()
+
+    def close(self):
+        """Write partially filled time buckets of all tiers to disk"""
+        for tier in self.tiers:
+            try:
+                tier.flush()
+            except OSError as e:
+                print("Can't write rollup file {}: {}".format(tier.filename, e), file=sys.stderr)
+
+    def existing_tiers(self):
+        """Return tiers of current frequency range (or tiers of most recently written files in directory)"""
+        if self.tiers:
+            return self.tiers
+
+        filenames = glob.glob(os.path.join(self.directory, "rollup_*s_*.bin"))
+        if not filenames:
+            return []
+
+        # Files of one frequency range differ only by interval of tier
+        suffix = os.path.basename(max(filenames, key=os.path.getmtime)).split("_", 2)[2]
+        tiers = []
+        for filename in filenames:
+            if os.path.basename(filename).split("_", 2)[2] == suffix:
+                try:
+                    tiers.append(RollupTier.open(filename))
+                except (OSError, ValueError) as e:
+                    print("Can't read rollup file {}: {}".format(filename, e), file=sys.stderr)
+        return sorted(tiers, key=lambda tier: tier.interval)
+
+    def select_tier(self, start_time, stop_time, max_rows):
+        """Return finest tier which covers time span with at most max_rows rows (or coarsest tier)"""
+        tiers = self.existing_tiers()
+        for tier in tiers:
+            if (stop_time - start_time) / tier.interval <= max_rows:
+                return tier
+        return tiers[-1] if tiers else None
+
+    def read(self, start_time, stop_time, max_rows):
+        """Return rollup rows from most suitable tier for requested time span"""
+        tier = self.select_tier(start_time, stop_time, max_rows)
+        if tier is None:
+            return None
+        return tier.read(start_time, stop_time)
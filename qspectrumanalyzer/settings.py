@@ -22,6 +22,22 @@ class QSpectrumAnalyzerSettings(QtWidgets.QDialog, Ui_QSpectrumAnalyzerSettings)
         self.lnbSpinBox.setValue(settings.value("lnb_lo", 0, float) / 1e6)
         self.waterfallHistorySizeSpinBox.setValue(settings.value("waterfall_history_size", 100, int))
 
+        i = self.precisionComboBox.findText(settings.value("precision", "float64"))
+        self.precisionComboBox.setCurrentIndex(i if i != -1 else 0)
+        i = self.historyStorageComboBox.findText(settings.value("history_storage", "full"))
+        self.historyStorageComboBox.setCurrentIndex(i if i != -1 else 0)
+        self.parseProcessCheckBox.setChecked(settings.value("parse_process", 0, int))
+        self.processingThreadsSpinBox.setValue(settings.value("processing_threads", 1, int))
+        self.rebinSizeSpinBox.setValue(settings.value("rebin_size", 0, float))
+        i = self.rebinReducerComboBox.findText(settings.value("rebin_reducer", "max"))
+        self.rebinReducerComboBox.setCurrentIndex(i if i != -1 else 0)
+        self.historyDecimationSpinBox.setValue(settings.value("history_decimation", 1, int))
+        i = self.historyReducerComboBox.findText(settings.value("history_reducer", "max"))
+        self.historyReducerComboBox.setCurrentIndex(i if i != -1 else 0)
+        self.historyRangeMinSpinBox.setValue(settings.value("history_range_min", -150.0, float))
+        self.historyRangeMaxSpinBox.setValue(settings.value("history_range_max", 50.0, float))
+        self.keepHistoryCheckBox.setChecked(settings.value("keep_history", 0, int))
+
         backend = settings.value("backend", "soapy_power")
         try:
             backend_module = getattr(backends, backend)
@@ -51,6 +67,13 @@ class QSpectrumAnalyzerSettings(QtWidgets.QDialog, Ui_QSpectrumAnalyzerSettings)
             self.backendComboBox.setCurrentIndex(i)
         self.backendComboBox.blockSignals(False)
 
+        for b in sorted(backends.__all__):
+            if b != "multi":
+                self.multiBackendComboBox.addItem(b)
+        i = self.multiBackendComboBox.findText(settings.value("multi_backend", "rtl_power"))
+        self.multiBackendComboBox.setCurrentIndex(i if i != -1 else 0)
+        self.multiBackendComboBox.setEnabled(backend == "multi")
+
     @QtCore.Slot()
     def on_executableButton_clicked(self):
         """Open file dialog when button is clicked"""
@@ -92,17 +115,27 @@ class QSpectrumAnalyzerSettings(QtWidgets.QDialog, Ui_QSpectrumAnalyzerSettings)
         self.device_help_dialog.raise_()
         self.device_help_dialog.activateWindow()
 
+    @QtCore.Slot(float)
+    def on_historyRangeMinSpinBox_valueChanged(self, value):
+        """Keep quantization range non-empty"""
+        self.historyRangeMaxSpinBox.setMinimum(value + 1)
+
+    @QtCore.Slot(float)
+    def on_historyRangeMaxSpinBox_valueChanged(self, value):
+        """Keep quantization range non-empty"""
+        self.historyRangeMinSpinBox.setMaximum(value - 1)
+
     @QtCore.Slot(str)
     def on_backendComboBox_currentIndexChanged(self, text):
         """Change executable when backend is changed"""
-        self.executableEdit.setText(text)
-        self.deviceEdit.setText("")
-
         try:
             backend_module = getattr(backends, text)
         except AttributeError:
             backend_module = backends.soapy_power
 
+        self.executableEdit.setText(backend_module.Info.executable or text)
+        self.deviceEdit.setText("")
+
         self.paramsEdit.setText(backend_module.Info.additional_params)
         self.deviceHelpButton.setEnabled(bool(backend_module.Info.help_device))
         self.sampleRateSpinBox.setMinimum(backend_module.Info.sample_rate_min / 1e6)
@@ -111,6 +144,7 @@ class QSpectrumAnalyzerSettings(QtWidgets.QDialog, Ui_QSpectrumAnalyzerSettings)
         self.bandwidthSpinBox.setMinimum(backend_module.Info.bandwidth_min / 1e6)
         self.bandwidthSpinBox.setMaximum(backend_module.Info.bandwidth_max / 1e6)
         self.bandwidthSpinBox.setValue(backend_module.Info.bandwidth / 1e6)
+        self.multiBackendComboBox.setEnabled(text == "multi")
 
     def accept(self):
         """Save settings when dialog is accepted"""
@@ -123,6 +157,18 @@ class QSpectrumAnalyzerSettings(QtWidgets.QDialog, Ui_QSpectrumAnalyzerSettings)
         settings.setValue("bandwidth", self.bandwidthSpinBox.value() * 1e6)
         settings.setValue("lnb_lo", self.lnbSpinBox.value() * 1e6)
         settings.setValue("waterfall_history_size", self.waterfallHistorySizeSpinBox.value())
+        settings.setValue("precision", self.precisionComboBox.currentText())
+        settings.setValue("history_storage", self.historyStorageComboBox.currentText())
+        settings.setValue("parse_process", int(self.parseProcessCheckBox.isChecked()))
+        settings.setValue("processing_threads", self.processingThreadsSpinBox.value())
+        settings.setValue("rebin_size", self.rebinSizeSpinBox.value())
+        settings.setValue("rebin_reducer", self.rebinReducerComboBox.currentText())
+        settings.setValue("history_decimation", self.historyDecimationSpinBox.value())
+        settings.setValue("history_reducer", self.historyReducerComboBox.currentText())
+        settings.setValue("multi_backend", self.multiBackendComboBox.currentText())
+        settings.setValue("history_range_min", self.historyRangeMinSpinBox.value())
+        settings.setValue("history_range_max", self.historyRangeMaxSpinBox.value())
+        settings.setValue("keep_history", int(self.keepHistoryCheckBox.isChecked()))
         QtWidgets.QDialog.accept(self)
 
 
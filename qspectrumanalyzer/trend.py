@@ -0,0 +1,61 @@
+import time
+
+from Qt import QtCore, QtWidgets
+
+from qspectrumanalyzer.plot import TrendPlotWidget
+from qspectrumanalyzer.ui_qspectrumanalyzer_trend import Ui_QSpectrumAnalyzerTrend
+
+
+class QSpectrumAnalyzerTrend(QtWidgets.QDialog, Ui_QSpectrumAnalyzerTrend):
+    """QSpectrumAnalyzer rollup trend dialog (coarsest rollup tier needed for time span is displayed)"""
+    spans = (3600, 6 * 3600, 24 * 3600, 7 * 24 * 3600, 30 * 24 * 3600)
+    max_rows = 1000
+
+    def __init__(self, rollup, parent=None):
+        # Initialize UI
+        super().__init__(parent)
+        self.setupUi(self)
+
+        self.rollup = rollup
+        self.trendPlotWidget = TrendPlotWidget(self.trendPlotLayout)
+
+        # Load settings
+        settings = QtCore.QSettings()
+        self.spanComboBox.setCurrentIndex(settings.value("trend_span", 2, int))
+        i = self.statisticComboBox.findText(settings.value("trend_statistic", "max"))
+        self.statisticComboBox.setCurrentIndex(max(i, 0))
+
+        self.refresh()
+
+    def refresh(self):
+        """Read rollup rows for selected time span and update trend plot"""
+        stop_time = time.time()
+        start_time = stop_time - self.spans[self.spanComboBox.currentIndex()]
+        tier = self.rollup.select_tier(start_time, stop_time, self.max_rows)
+        if not tier:
+            self.tierLabel.setText(self.tr("No rollups in {}").format(self.rollup.directory))
+            self.trendPlotWidget.image.clear()
+            return
+
+        rows = tier.read(start_time, stop_time)
+        self.tierLabel.setText(self.tr("{} rows of {:g} s rollups").format(len(rows), tier.interval))
+        self.trendPlotWidget.update_plot(tier, rows, start_time, stop_time, self.statisticComboBox.currentText())
+
+    @QtCore.Slot(int)
+    def on_spanComboBox_currentIndexChanged(self, index):
+        self.refresh()
+
+    @QtCore.Slot(int)
+    def on_statisticComboBox_currentIndexChanged(self, index):
+        self.refresh()
+
+    @QtCore.Slot()
+    def on_refreshButton_clicked(self):
+        self.refresh()
+
+    def done(self, result):
+        """Save settings when dialog is closed"""
+        settings = QtCore.QSettings()
+        settings.setValue("trend_span", self.spanComboBox.currentIndex())
+        settings.setValue("trend_statistic", self.statisticComboBox.currentText())
+        QtWidgets.QDialog.done(self, result)
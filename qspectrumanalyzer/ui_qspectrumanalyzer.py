@@ -45,6 +45,8 @@ class Ui_QSpectrumAnalyzerMainWindow(object):
         self.menubar.setObjectName("menubar")
         self.menu_File = QtWidgets.QMenu(self.menubar)
         self.menu_File.setObjectName("menu_File")
+        self.menu_View = QtWidgets.QMenu(self.menubar)
+        self.menu_View.setObjectName("menu_View")
         self.menu_Help = QtWidgets.QMenu(self.menubar)
         self.menu_Help.setObjectName("menu_Help")
         QSpectrumAnalyzerMainWindow.setMenuBar(self.menubar)
@@ -271,11 +273,23 @@ class Ui_QSpectrumAnalyzerMainWindow(object):
         self.action_Quit.setObjectName("action_Quit")
         self.action_About = QtWidgets.QAction(QSpectrumAnalyzerMainWindow)
         self.action_About.setObjectName("action_About")
+        self.action_PerformanceHUD = QtWidgets.QAction(QSpectrumAnalyzerMainWindow)
+        self.action_PerformanceHUD.setCheckable(True)
+        self.action_PerformanceHUD.setObjectName("action_PerformanceHUD")
+        self.action_RollupTrend = QtWidgets.QAction(QSpectrumAnalyzerMainWindow)
+        self.action_RollupTrend.setObjectName("action_RollupTrend")
+        self.action_ClearHistory = QtWidgets.QAction(QSpectrumAnalyzerMainWindow)
+        self.action_ClearHistory.setObjectName("action_ClearHistory")
         self.menu_File.addAction(self.action_Settings)
         self.menu_File.addSeparator()
         self.menu_File.addAction(self.action_Quit)
+        self.menu_View.addAction(self.action_PerformanceHUD)
+        self.menu_View.addAction(self.action_RollupTrend)
+        self.menu_View.addSeparator()
+        self.menu_View.addAction(self.action_ClearHistory)
         self.menu_Help.addAction(self.action_About)
         self.menubar.addAction(self.menu_File.menuAction())
+        self.menubar.addAction(self.menu_View.menuAction())
         self.menubar.addAction(self.menu_Help.menuAction())
         self.label_2.setBuddy(self.startFreqSpinBox)
         self.label_3.setBuddy(self.stopFreqSpinBox)
@@ -316,6 +330,7 @@ class Ui_QSpectrumAnalyzerMainWindow(object):
         _translate = QtCore.QCoreApplication.translate
         QSpectrumAnalyzerMainWindow.setWindowTitle(_translate("QSpectrumAnalyzerMainWindow", "QSpectrumAnalyzer"))
         self.menu_File.setTitle(_translate("QSpectrumAnalyzerMainWindow", "&File"))
+        self.menu_View.setTitle(_translate("QSpectrumAnalyzerMainWindow", "&View"))
         self.menu_Help.setTitle(_translate("QSpectrumAnalyzerMainWindow", "&Help"))
         self.controlsDockWidget.setWindowTitle(_translate("QSpectrumAnalyzerMainWindow", "Controls"))
         self.startButton.setText(_translate("QSpectrumAnalyzerMainWindow", "&Start"))
@@ -351,5 +366,9 @@ class Ui_QSpectrumAnalyzerMainWindow(object):
         self.action_Quit.setText(_translate("QSpectrumAnalyzerMainWindow", "&Quit"))
         self.action_Quit.setShortcut(_translate("QSpectrumAnalyzerMainWindow", "Ctrl+Q"))
         self.action_About.setText(_translate("QSpectrumAnalyzerMainWindow", "&About"))
+        self.action_PerformanceHUD.setText(_translate("QSpectrumAnalyzerMainWindow", "Performance &HUD"))
+        self.action_PerformanceHUD.setShortcut(_translate("QSpectrumAnalyzerMainWindow", "F12"))
+        self.action_RollupTrend.setText(_translate("QSpectrumAnalyzerMainWindow", "Rollup &trend..."))
+        self.action_ClearHistory.setText(_translate("QSpectrumAnalyzerMainWindow", "&Clear history"))
 
 from pyqtgraph import GraphicsLayoutWidget
@@ -111,6 +111,99 @@ class Ui_QSpectrumAnalyzerSettings(object):
         self.lnbSpinBox.setProperty("value", 0.0)
         self.lnbSpinBox.setObjectName("lnbSpinBox")
         self.formLayout.setWidget(6, QtWidgets.QFormLayout.FieldRole, self.lnbSpinBox)
+        self.label_9 = QtWidgets.QLabel(QSpectrumAnalyzerSettings)
+        self.label_9.setObjectName("label_9")
+        self.formLayout.setWidget(8, QtWidgets.QFormLayout.LabelRole, self.label_9)
+        self.precisionComboBox = QtWidgets.QComboBox(QSpectrumAnalyzerSettings)
+        self.precisionComboBox.setObjectName("precisionComboBox")
+        self.precisionComboBox.addItem("")
+        self.precisionComboBox.addItem("")
+        self.formLayout.setWidget(8, QtWidgets.QFormLayout.FieldRole, self.precisionComboBox)
+        self.label_10 = QtWidgets.QLabel(QSpectrumAnalyzerSettings)
+        self.label_10.setObjectName("label_10")
+        self.formLayout.setWidget(9, QtWidgets.QFormLayout.LabelRole, self.label_10)
+        self.historyStorageComboBox = QtWidgets.QComboBox(QSpectrumAnalyzerSettings)
+        self.historyStorageComboBox.setObjectName("historyStorageComboBox")
+        self.historyStorageComboBox.addItem("")
+        self.historyStorageComboBox.addItem("")
+        self.historyStorageComboBox.addItem("")
+        self.formLayout.setWidget(9, QtWidgets.QFormLayout.FieldRole, self.historyStorageComboBox)
+        self.parseProcessCheckBox = QtWidgets.QCheckBox(QSpectrumAnalyzerSettings)
+        self.parseProcessCheckBox.setObjectName("parseProcessCheckBox")
+        self.formLayout.setWidget(10, QtWidgets.QFormLayout.FieldRole, self.parseProcessCheckBox)
+        self.label_11 = QtWidgets.QLabel(QSpectrumAnalyzerSettings)
+        self.label_11.setObjectName("label_11")
+        self.formLayout.setWidget(11, QtWidgets.QFormLayout.LabelRole, self.label_11)
+        self.processingThreadsSpinBox = QtWidgets.QSpinBox(QSpectrumAnalyzerSettings)
+        self.processingThreadsSpinBox.setMinimum(0)
+        self.processingThreadsSpinBox.setMaximum(256)
+        self.processingThreadsSpinBox.setProperty("value", 1)
+        self.processingThreadsSpinBox.setObjectName("processingThreadsSpinBox")
+        self.formLayout.setWidget(11, QtWidgets.QFormLayout.FieldRole, self.processingThreadsSpinBox)
+        self.label_12 = QtWidgets.QLabel(QSpectrumAnalyzerSettings)
+        self.label_12.setObjectName("label_12")
+        self.formLayout.setWidget(12, QtWidgets.QFormLayout.LabelRole, self.label_12)
+        self.horizontalLayout_4 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_4.setObjectName("horizontalLayout_4")
+        self.rebinSizeSpinBox = QtWidgets.QDoubleSpinBox(QSpectrumAnalyzerSettings)
+        self.rebinSizeSpinBox.setDecimals(3)
+        self.rebinSizeSpinBox.setMaximum(999999.999)
+        self.rebinSizeSpinBox.setProperty("value", 0.0)
+        self.rebinSizeSpinBox.setObjectName("rebinSizeSpinBox")
+        self.horizontalLayout_4.addWidget(self.rebinSizeSpinBox)
+        self.rebinReducerComboBox = QtWidgets.QComboBox(QSpectrumAnalyzerSettings)
+        self.rebinReducerComboBox.setObjectName("rebinReducerComboBox")
+        self.rebinReducerComboBox.addItem("")
+        self.rebinReducerComboBox.addItem("")
+        self.rebinReducerComboBox.addItem("")
+        self.horizontalLayout_4.addWidget(self.rebinReducerComboBox)
+        self.formLayout.setLayout(12, QtWidgets.QFormLayout.FieldRole, self.horizontalLayout_4)
+        self.label_13 = QtWidgets.QLabel(QSpectrumAnalyzerSettings)
+        self.label_13.setObjectName("label_13")
+        self.formLayout.setWidget(13, QtWidgets.QFormLayout.LabelRole, self.label_13)
+        self.horizontalLayout_5 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_5.setObjectName("horizontalLayout_5")
+        self.historyDecimationSpinBox = QtWidgets.QSpinBox(QSpectrumAnalyzerSettings)
+        self.historyDecimationSpinBox.setMinimum(1)
+        self.historyDecimationSpinBox.setMaximum(10000)
+        self.historyDecimationSpinBox.setProperty("value", 1)
+        self.historyDecimationSpinBox.setObjectName("historyDecimationSpinBox")
+        self.horizontalLayout_5.addWidget(self.historyDecimationSpinBox)
+        self.historyReducerComboBox = QtWidgets.QComboBox(QSpectrumAnalyzerSettings)
+        self.historyReducerComboBox.setObjectName("historyReducerComboBox")
+        self.historyReducerComboBox.addItem("")
+        self.historyReducerComboBox.addItem("")
+        self.horizontalLayout_5.addWidget(self.historyReducerComboBox)
+        self.formLayout.setLayout(13, QtWidgets.QFormLayout.FieldRole, self.horizontalLayout_5)
+        self.label_14 = QtWidgets.QLabel(QSpectrumAnalyzerSettings)
+        self.label_14.setObjectName("label_14")
+        self.formLayout.setWidget(14, QtWidgets.QFormLayout.LabelRole, self.label_14)
+        self.multiBackendComboBox = QtWidgets.QComboBox(QSpectrumAnalyzerSettings)
+        self.multiBackendComboBox.setObjectName("multiBackendComboBox")
+        self.formLayout.setWidget(14, QtWidgets.QFormLayout.FieldRole, self.multiBackendComboBox)
+        self.label_15 = QtWidgets.QLabel(QSpectrumAnalyzerSettings)
+        self.label_15.setObjectName("label_15")
+        self.formLayout.setWidget(15, QtWidgets.QFormLayout.LabelRole, self.label_15)
+        self.horizontalLayout_6 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_6.setObjectName("horizontalLayout_6")
+        self.historyRangeMinSpinBox = QtWidgets.QDoubleSpinBox(QSpectrumAnalyzerSettings)
+        self.historyRangeMinSpinBox.setDecimals(1)
+        self.historyRangeMinSpinBox.setMinimum(-300.0)
+        self.historyRangeMinSpinBox.setMaximum(300.0)
+        self.historyRangeMinSpinBox.setProperty("value", -150.0)
+        self.historyRangeMinSpinBox.setObjectName("historyRangeMinSpinBox")
+        self.horizontalLayout_6.addWidget(self.historyRangeMinSpinBox)
+        self.historyRangeMaxSpinBox = QtWidgets.QDoubleSpinBox(QSpectrumAnalyzerSettings)
+        self.historyRangeMaxSpinBox.setDecimals(1)
+        self.historyRangeMaxSpinBox.setMinimum(-300.0)
+        self.historyRangeMaxSpinBox.setMaximum(300.0)
+        self.historyRangeMaxSpinBox.setProperty("value", 50.0)
+        self.historyRangeMaxSpinBox.setObjectName("historyRangeMaxSpinBox")
+        self.horizontalLayout_6.addWidget(self.historyRangeMaxSpinBox)
+        self.formLayout.setLayout(15, QtWidgets.QFormLayout.FieldRole, self.horizontalLayout_6)
+        self.keepHistoryCheckBox = QtWidgets.QCheckBox(QSpectrumAnalyzerSettings)
+        self.keepHistoryCheckBox.setObjectName("keepHistoryCheckBox")
+        self.formLayout.setWidget(16, QtWidgets.QFormLayout.FieldRole, self.keepHistoryCheckBox)
         self.verticalLayout.addLayout(self.formLayout)
         spacerItem = QtWidgets.QSpacerItem(20, 21, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Expanding)
         self.verticalLayout.addItem(spacerItem)
@@ -127,6 +220,13 @@ class Ui_QSpectrumAnalyzerSettings(object):
         self.label_7.setBuddy(self.bandwidthSpinBox)
         self.label_8.setBuddy(self.lnbSpinBox)
         self.label_6.setBuddy(self.paramsEdit)
+        self.label_9.setBuddy(self.precisionComboBox)
+        self.label_10.setBuddy(self.historyStorageComboBox)
+        self.label_11.setBuddy(self.processingThreadsSpinBox)
+        self.label_12.setBuddy(self.rebinSizeSpinBox)
+        self.label_13.setBuddy(self.historyDecimationSpinBox)
+        self.label_14.setBuddy(self.multiBackendComboBox)
+        self.label_15.setBuddy(self.historyRangeMinSpinBox)
 
         self.retranslateUi(QSpectrumAnalyzerSettings)
         self.buttonBox.accepted.connect(QSpectrumAnalyzerSettings.accept)
@@ -142,6 +242,18 @@ class Ui_QSpectrumAnalyzerSettings(object):
         QSpectrumAnalyzerSettings.setTabOrder(self.sampleRateSpinBox, self.bandwidthSpinBox)
         QSpectrumAnalyzerSettings.setTabOrder(self.bandwidthSpinBox, self.lnbSpinBox)
         QSpectrumAnalyzerSettings.setTabOrder(self.lnbSpinBox, self.waterfallHistorySizeSpinBox)
+        QSpectrumAnalyzerSettings.setTabOrder(self.waterfallHistorySizeSpinBox, self.precisionComboBox)
+        QSpectrumAnalyzerSettings.setTabOrder(self.precisionComboBox, self.historyStorageComboBox)
+        QSpectrumAnalyzerSettings.setTabOrder(self.historyStorageComboBox, self.parseProcessCheckBox)
+        QSpectrumAnalyzerSettings.setTabOrder(self.parseProcessCheckBox, self.processingThreadsSpinBox)
+        QSpectrumAnalyzerSettings.setTabOrder(self.processingThreadsSpinBox, self.rebinSizeSpinBox)
+        QSpectrumAnalyzerSettings.setTabOrder(self.rebinSizeSpinBox, self.rebinReducerComboBox)
+        QSpectrumAnalyzerSettings.setTabOrder(self.rebinReducerComboBox, self.historyDecimationSpinBox)
+        QSpectrumAnalyzerSettings.setTabOrder(self.historyDecimationSpinBox, self.historyReducerComboBox)
+        QSpectrumAnalyzerSettings.setTabOrder(self.historyReducerComboBox, self.multiBackendComboBox)
+        QSpectrumAnalyzerSettings.setTabOrder(self.multiBackendComboBox, self.historyRangeMinSpinBox)
+        QSpectrumAnalyzerSettings.setTabOrder(self.historyRangeMinSpinBox, self.historyRangeMaxSpinBox)
+        QSpectrumAnalyzerSettings.setTabOrder(self.historyRangeMaxSpinBox, self.keepHistoryCheckBox)
 
     def retranslateUi(self, QSpectrumAnalyzerSettings):
         _translate = QtCore.QCoreApplication.translate
@@ -168,4 +280,48 @@ class Ui_QSpectrumAnalyzerSettings(object):
         self.bandwidthSpinBox.setSuffix(_translate("QSpectrumAnalyzerSettings", " MHz"))
         self.lnbSpinBox.setToolTip(_translate("QSpectrumAnalyzerSettings", "Negative frequency for upconverters, positive frequency for downconverters."))
         self.lnbSpinBox.setSuffix(_translate("QSpectrumAnalyzerSettings", " MHz"))
+        self.label_9.setToolTip(_translate("QSpectrumAnalyzerSettings", "Floating point precision of spectrum data (float32 needs half of memory)."))
+        self.label_9.setText(_translate("QSpectrumAnalyzerSettings", "Data &precision:"))
+        self.precisionComboBox.setToolTip(_translate("QSpectrumAnalyzerSettings", "Floating point precision of spectrum data (float32 needs half of memory)."))
+        self.precisionComboBox.setItemText(0, _translate("QSpectrumAnalyzerSettings", "float64"))
+        self.precisionComboBox.setItemText(1, _translate("QSpectrumAnalyzerSettings", "float32"))
+        self.label_10.setToolTip(_translate("QSpectrumAnalyzerSettings", "Store waterfall history as 16-bit or 8-bit integers (values outside of quantization range are clipped) to keep more sweeps in the same memory."))
+        self.label_10.setText(_translate("QSpectrumAnalyzerSettings", "Waterfall history &storage:"))
+        self.historyStorageComboBox.setToolTip(_translate("QSpectrumAnalyzerSettings", "Store waterfall history as 16-bit or 8-bit integers (values outside of quantization range are clipped) to keep more sweeps in the same memory."))
+        self.historyStorageComboBox.setItemText(0, _translate("QSpectrumAnalyzerSettings", "full"))
+        self.historyStorageComboBox.setItemText(1, _translate("QSpectrumAnalyzerSettings", "int16"))
+        self.historyStorageComboBox.setItemText(2, _translate("QSpectrumAnalyzerSettings", "uint8"))
+        self.parseProcessCheckBox.setToolTip(_translate("QSpectrumAnalyzerSettings", "Run backend and parse its output in separate process (sweeps are passed through shared memory), so that parsing can run on another CPU core than processing and plotting."))
+        self.parseProcessCheckBox.setText(_translate("QSpectrumAnalyzerSettings", "Parse backend output in separate pro&cess"))
+        self.label_11.setToolTip(_translate("QSpectrumAnalyzerSettings", "Split very wide sweeps to chunks processed in parallel by given number of threads (auto = number of CPU cores). Only sweeps with more than 65536 bins per thread are split."))
+        self.label_11.setText(_translate("QSpectrumAnalyzerSettings", "Processing &threads:"))
+        self.processingThreadsSpinBox.setToolTip(_translate("QSpectrumAnalyzerSettings", "Split very wide sweeps to chunks processed in parallel by given number of threads (auto = number of CPU cores). Only sweeps with more than 65536 bins per thread are split."))
+        self.processingThreadsSpinBox.setSpecialValueText(_translate("QSpectrumAnalyzerSettings", "auto"))
+        self.label_12.setToolTip(_translate("QSpectrumAnalyzerSettings", "Rebin sweeps to coarser resolution before any other processing (off = keep resolution of backend). Every output bin is reduced from input bins by maximum, mean or mean of linear power."))
+        self.label_12.setText(_translate("QSpectrumAnalyzerSettings", "Output bin si&ze:"))
+        self.rebinSizeSpinBox.setToolTip(_translate("QSpectrumAnalyzerSettings", "Rebin sweeps to coarser resolution before any other processing (off = keep resolution of backend). Every output bin is reduced from input bins by maximum, mean or mean of linear power."))
+        self.rebinSizeSpinBox.setSpecialValueText(_translate("QSpectrumAnalyzerSettings", "off"))
+        self.rebinSizeSpinBox.setSuffix(_translate("QSpectrumAnalyzerSettings", " kHz"))
+        self.rebinReducerComboBox.setToolTip(_translate("QSpectrumAnalyzerSettings", "Rebin sweeps to coarser resolution before any other processing (off = keep resolution of backend). Every output bin is reduced from input bins by maximum, mean or mean of linear power."))
+        self.rebinReducerComboBox.setItemText(0, _translate("QSpectrumAnalyzerSettings", "max"))
+        self.rebinReducerComboBox.setItemText(1, _translate("QSpectrumAnalyzerSettings", "mean"))
+        self.rebinReducerComboBox.setItemText(2, _translate("QSpectrumAnalyzerSettings", "power_mean"))
+        self.label_13.setToolTip(_translate("QSpectrumAnalyzerSettings", "Reduce given number of consecutive sweeps to one row of waterfall history (by maximum or mean), so that the same history size spans longer time."))
+        self.label_13.setText(_translate("QSpectrumAnalyzerSettings", "Waterfall &decimation:"))
+        self.historyDecimationSpinBox.setToolTip(_translate("QSpectrumAnalyzerSettings", "Reduce given number of consecutive sweeps to one row of waterfall history (by maximum or mean), so that the same history size spans longer time."))
+        self.historyDecimationSpinBox.setSuffix(_translate("QSpectrumAnalyzerSettings", " sweeps/row"))
+        self.historyReducerComboBox.setToolTip(_translate("QSpectrumAnalyzerSettings", "Reduce given number of consecutive sweeps to one row of waterfall history (by maximum or mean), so that the same history size spans longer time."))
+        self.historyReducerComboBox.setItemText(0, _translate("QSpectrumAnalyzerSettings", "max"))
+        self.historyReducerComboBox.setItemText(1, _translate("QSpectrumAnalyzerSettings", "mean"))
+        self.label_14.setToolTip(_translate("QSpectrumAnalyzerSettings", "Backend used for every device by multi backend (devices are separated by ';' and frequency range is split between them)."))
+        self.label_14.setText(_translate("QSpectrumAnalyzerSettings", "&Multi-device backend:"))
+        self.multiBackendComboBox.setToolTip(_translate("QSpectrumAnalyzerSettings", "Backend used for every device by multi backend (devices are separated by ';' and frequency range is split between them)."))
+        self.label_15.setToolTip(_translate("QSpectrumAnalyzerSettings", "Range of values stored in 16-bit or 8-bit waterfall history (values outside of this range are clipped)."))
+        self.label_15.setText(_translate("QSpectrumAnalyzerSettings", "&Quantization range:"))
+        self.historyRangeMinSpinBox.setToolTip(_translate("QSpectrumAnalyzerSettings", "Range of values stored in 16-bit or 8-bit waterfall history (values outside of this range are clipped)."))
+        self.historyRangeMinSpinBox.setSuffix(_translate("QSpectrumAnalyzerSettings", " dB"))
+        self.historyRangeMaxSpinBox.setToolTip(_translate("QSpectrumAnalyzerSettings", "Range of values stored in 16-bit or 8-bit waterfall history (values outside of this range are clipped)."))
+        self.historyRangeMaxSpinBox.setSuffix(_translate("QSpectrumAnalyzerSettings", " dB"))
+        self.keepHistoryCheckBox.setToolTip(_translate("QSpectrumAnalyzerSettings", "Keep waterfall history when measurement is restarted (it is mapped onto new frequency range). Peak hold and average are always started from scratch."))
+        self.keepHistoryCheckBox.setText(_translate("QSpectrumAnalyzerSettings", "&Keep history on restart"))
 
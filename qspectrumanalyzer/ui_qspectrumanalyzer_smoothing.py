@@ -26,6 +26,8 @@ class Ui_QSpectrumAnalyzerSmoothing(object):
         self.windowFunctionComboBox.addItem("")
         self.windowFunctionComboBox.addItem("")
         self.windowFunctionComboBox.addItem("")
+        self.windowFunctionComboBox.addItem("")
+        self.windowFunctionComboBox.addItem("")
         self.formLayout.setWidget(0, QtWidgets.QFormLayout.FieldRole, self.windowFunctionComboBox)
         self.label_2 = QtWidgets.QLabel(QSpectrumAnalyzerSmoothing)
         self.label_2.setObjectName("label_2")
@@ -64,5 +66,7 @@ class Ui_QSpectrumAnalyzerSmoothing(object):
         self.windowFunctionComboBox.setItemText(2, _translate("QSpectrumAnalyzerSmoothing", "hamming"))
         self.windowFunctionComboBox.setItemText(3, _translate("QSpectrumAnalyzerSmoothing", "bartlett"))
         self.windowFunctionComboBox.setItemText(4, _translate("QSpectrumAnalyzerSmoothing", "blackman"))
+        self.windowFunctionComboBox.setItemText(5, _translate("QSpectrumAnalyzerSmoothing", "median"))
+        self.windowFunctionComboBox.setItemText(6, _translate("QSpectrumAnalyzerSmoothing", "savitzky-golay"))
         self.label_2.setText(_translate("QSpectrumAnalyzerSmoothing", "Window len&gth:"))
 
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'qspectrumanalyzer/qspectrumanalyzer_trend.ui'
+#
+# Created by: PyQt5 UI code generator 5.8
+#
+# WARNING! All changes made in this file will be lost!
+
+from Qt import QtCore, QtGui, QtWidgets
+
+class Ui_QSpectrumAnalyzerTrend(object):
+    def setupUi(self, QSpectrumAnalyzerTrend):
+        QSpectrumAnalyzerTrend.setObjectName("QSpectrumAnalyzerTrend")
+        QSpectrumAnalyzerTrend.resize(800, 500)
+        self.verticalLayout = QtWidgets.QVBoxLayout(QSpectrumAnalyzerTrend)
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.horizontalLayout = QtWidgets.QHBoxLayout()
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.label = QtWidgets.QLabel(QSpectrumAnalyzerTrend)
+        self.label.setObjectName("label")
+        self.horizontalLayout.addWidget(self.label)
+        self.spanComboBox = QtWidgets.QComboBox(QSpectrumAnalyzerTrend)
+        self.spanComboBox.setObjectName("spanComboBox")
+        self.spanComboBox.addItem("")
+        self.spanComboBox.addItem("")
+        self.spanComboBox.addItem("")
+        self.spanComboBox.addItem("")
+        self.spanComboBox.addItem("")
+        self.horizontalLayout.addWidget(self.spanComboBox)
+        self.label_2 = QtWidgets.QLabel(QSpectrumAnalyzerTrend)
+        self.label_2.setObjectName("label_2")
+        self.horizontalLayout.addWidget(self.label_2)
+        self.statisticComboBox = QtWidgets.QComboBox(QSpectrumAnalyzerTrend)
+        self.statisticComboBox.setObjectName("statisticComboBox")
+        self.statisticComboBox.addItem("")
+        self.statisticComboBox.addItem("")
+        self.statisticComboBox.addItem("")
+        self.horizontalLayout.addWidget(self.statisticComboBox)
+        self.refreshButton = QtWidgets.QPushButton(QSpectrumAnalyzerTrend)
+        self.refreshButton.setObjectName("refreshButton")
+        self.horizontalLayout.addWidget(self.refreshButton)
+        spacerItem = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
+        self.horizontalLayout.addItem(spacerItem)
+        self.tierLabel = QtWidgets.QLabel(QSpectrumAnalyzerTrend)
+        self.tierLabel.setText("")
+        self.tierLabel.setObjectName("tierLabel")
+        self.horizontalLayout.addWidget(self.tierLabel)
+        self.verticalLayout.addLayout(self.horizontalLayout)
+        self.trendPlotLayout = GraphicsLayoutWidget(QSpectrumAnalyzerTrend)
+        self.trendPlotLayout.setObjectName("trendPlotLayout")
+        self.verticalLayout.addWidget(self.trendPlotLayout)
+        self.buttonBox = QtWidgets.QDialogButtonBox(QSpectrumAnalyzerTrend)
+        self.buttonBox.setOrientation(QtCore.Qt.Horizontal)
+        self.buttonBox.setStandardButtons(QtWidgets.QDialogButtonBox.Close)
+        self.buttonBox.setObjectName("buttonBox")
+        self.verticalLayout.addWidget(self.buttonBox)
+        self.label.setBuddy(self.spanComboBox)
+        self.label_2.setBuddy(self.statisticComboBox)
+
+        self.retranslateUi(QSpectrumAnalyzerTrend)
+        self.spanComboBox.setCurrentIndex(2)
+        self.buttonBox.rejected.connect(QSpectrumAnalyzerTrend.reject)
+        QtCore.QMetaObject.connectSlotsByName(QSpectrumAnalyzerTrend)
+        QSpectrumAnalyzerTrend.setTabOrder(self.spanComboBox, self.statisticComboBox)
+        QSpectrumAnalyzerTrend.setTabOrder(self.statisticComboBox, self.refreshButton)
+        QSpectrumAnalyzerTrend.setTabOrder(self.refreshButton, self.trendPlotLayout)
+        QSpectrumAnalyzerTrend.setTabOrder(self.trendPlotLayout, self.buttonBox)
+
+    def retranslateUi(self, QSpectrumAnalyzerTrend):
+        _translate = QtCore.QCoreApplication.translate
+        QSpectrumAnalyzerTrend.setWindowTitle(_translate("QSpectrumAnalyzerTrend", "Rollup trend - QSpectrumAnalyzer"))
+        self.label.setText(_translate("QSpectrumAnalyzerTrend", "Time &span:"))
+        self.spanComboBox.setItemText(0, _translate("QSpectrumAnalyzerTrend", "1 hour"))
+        self.spanComboBox.setItemText(1, _translate("QSpectrumAnalyzerTrend", "6 hours"))
+        self.spanComboBox.setItemText(2, _translate("QSpectrumAnalyzerTrend", "1 day"))
+        self.spanComboBox.setItemText(3, _translate("QSpectrumAnalyzerTrend", "1 week"))
+        self.spanComboBox.setItemText(4, _translate("QSpectrumAnalyzerTrend", "30 days"))
+        self.label_2.setText(_translate("QSpectrumAnalyzerTrend", "S&tatistic:"))
+        self.statisticComboBox.setItemText(0, _translate("QSpectrumAnalyzerTrend", "max"))
+        self.statisticComboBox.setItemText(1, _translate("QSpectrumAnalyzerTrend", "mean"))
+        self.statisticComboBox.setItemText(2, _translate("QSpectrumAnalyzerTrend", "min"))
+        self.refreshButton.setText(_translate("QSpectrumAnalyzerTrend", "&Refresh"))
+
+from pyqtgraph import GraphicsLayoutWidget
@@ -1,30 +1,130 @@
+import functools
+
 import numpy as np
 
 from Qt import QtGui
 
 
-def smooth(x, window_len=11, window='hanning'):
-    """Smooth 1D signal using specified window with given size"""
-    x = np.array(x)
-    if window_len < 3:
-        return x
+# Window functions accepted by smooth()
+smooth_windows = ('rectangular', 'hanning', 'hamming', 'bartlett', 'blackman', 'median', 'savitzky-golay')
 
-    if x.size < window_len:
-        raise ValueError("Input data length must be greater than window size")
+# Kernels longer than this are convolved with FFT instead of direct convolution
+fft_kernel_threshold = 64
+
+# Max. number of elements in sliding window view processed at once by median filter
+median_chunk_size = 2**22
 
-    if window not in ['rectangular', 'hanning', 'hamming', 'bartlett', 'blackman']:
-        raise ValueError("Window must be 'rectangular', 'hanning', 'hamming', 'bartlett' or 'blackman'")
 
+@functools.lru_cache(maxsize=32)
+def smooth_kernel(window, window_len, polyorder=2):
+    """Return normalized (read-only) convolution kernel for given window function and size"""
     if window == 'rectangular':
-        # Moving average
         w = np.ones(window_len, 'd')
+    elif window == 'savitzky-golay':
+        # Coefficients of least-squares fit of polynomial evaluated in the middle of window
+        positions = np.arange(window_len) - (window_len - 1) / 2
+        w = np.linalg.pinv(np.vander(positions, min(polyorder, window_len - 1) + 1, increasing=True))[0]
     else:
         w = getattr(np, window)(window_len)
+        w = w / w.sum()
+    w.setflags(write=False)
+    return w
+
+
+@functools.lru_cache(maxsize=32)
+def smooth_kernel_fft(window, window_len, n):
+    """Return real FFT of smoothing kernel zero-padded to length n"""
+    w_fft = np.fft.rfft(smooth_kernel(window, window_len), n)
+    w_fft.setflags(write=False)
+    return w_fft
+
+
+def pad_edges(x, window_len):
+    """Extend signal on both sides by its reflection around first and last sample"""
+    pad = window_len - 1
+    s = np.empty(x.size + 2 * pad, dtype=np.float64)
+    s[pad:-pad] = x
+    s[:pad] = 2 * x[0] - x[window_len:1:-1]
+    s[-pad:] = 2 * x[-1] - x[-1:-window_len:-1]
+    return s
+
+
+def moving_average(s, window_len):
+    """Moving average of signal (O(N) regardless of window size, computed from cumulative sum)"""
+    c = np.empty(s.size + 1, dtype=np.float64)
+    c[0] = 0
+    np.cumsum(s, out=c[1:])
+    result = c[window_len:]
+    result -= c[:-window_len]
+    result /= window_len
+    return result
+
+
+def moving_median(s, window_len):
+    """Moving median of signal (processed in chunks to limit size of temporary arrays)"""
+    n = s.size - window_len + 1
+    windows = np.lib.stride_tricks.as_strided(s, shape=(n, window_len), strides=(s.strides[0], s.strides[0]),
+                                              writeable=False)
+    result = np.empty(n, dtype=np.float64)
+    chunk = max(median_chunk_size // window_len, 1)
+    for i in range(0, n, chunk):
+        np.median(windows[i:i + chunk], axis=1, out=result[i:i + chunk])
+    return result
+
+
+def convolve_valid(s, window, window_len):
+    """Convolve signal with smoothing kernel (FFT convolution is used for large kernels)"""
+    if window_len < fft_kernel_threshold:
+        return np.convolve(s, smooth_kernel(window, window_len), mode='valid')
+
+    # Overlap-save: signal is split to overlapping blocks which are all transformed at once,
+    # FFT of kernel is cached for given block size
+    n = 1 << (max(16 * window_len, 4096) - 1).bit_length()
+    step = n - window_len + 1
+    result_size = s.size - window_len + 1
+    blocks = -(-result_size // step)
+    padded = np.zeros(blocks * step + window_len - 1, dtype=np.float64)
+    padded[:s.size] = s
+    segments = np.lib.stride_tricks.as_strided(padded, shape=(blocks, n),
+                                               strides=(step * padded.strides[0], padded.strides[0]),
+                                               writeable=False)
+    result = np.fft.irfft(np.fft.rfft(segments, axis=1) * smooth_kernel_fft(window, window_len, n), n, axis=1)
+    return result[:, window_len - 1:].ravel()[:result_size]
+
+
+def smooth(x, window_len=11, window='hanning', out=None):
+    """Smooth 1D signal using specified window with given size
+
+    Result is written to out array (if given) instead of newly allocated array.
+    """
+    x = np.asarray(x)
+    if window_len < 3:
+        if out is None:
+            return x.copy()
+        out[...] = x
+        return out
 
-    s = np.r_[2 * x[0] - x[window_len:1:-1], x, 2 * x[-1] - x[-1:-window_len:-1]]
-    y = np.convolve(w / w.sum(), s, mode='same')
+    if x.size < window_len:
+        raise ValueError("Input data length must be greater than window size")
+
+    if window not in smooth_windows:
+        raise ValueError("Window must be one of: {}".format(", ".join(smooth_windows)))
 
-    return y[window_len - 1:-window_len + 1]
+    s = pad_edges(x, window_len)
+    if window == 'rectangular':
+        y = moving_average(s, window_len)
+    elif window == 'median':
+        y = moving_median(s, window_len)
+    else:
+        y = convolve_valid(s, window, window_len)
+
+    # Samples centered on original signal
+    offset = (window_len - 1) // 2
+    y = y[offset:offset + x.size]
+    if out is None:
+        return y.astype(x.dtype if x.dtype.kind == 'f' else np.float64)
+    out[...] = y
+    return out
 
 
 def str_to_color(color_string):
@@ -10,6 +10,10 @@ setup_entry_points = {
     "gui_scripts": [
         "qspectrumanalyzer=qspectrumanalyzer.__main__:main",
     ],
+    "console_scripts": [
+        "qspectrumanalyzer-analyze=qspectrumanalyzer.analyze:main",
+        "qspectrumanalyzer-headless=qspectrumanalyzer.headless:main",
+    ],
 }
 
 # Allow compilation of Qt .qrc, .ui and .ts files (build_qt command)
@@ -26,6 +30,10 @@ try:
         "console_scripts": [
             Executable('qspectrumanalyzer=qspectrumanalyzer.__main__:main',
                        console=True, icon_file='qspectrumanalyzer.ico'),
+            Executable('qspectrumanalyzer-analyze=qspectrumanalyzer.analyze:main',
+                       console=True),
+            Executable('qspectrumanalyzer-headless=qspectrumanalyzer.headless:main',
+                       console=True),
             Executable('soapy_power=soapypower.__main__:main',
                        console=True),
         ],
@@ -44,7 +52,7 @@ setup(
     author_email="m.krenek@gmail.com",
     url="https://github.com/xmikos/qspectrumanalyzer",
     license="GNU GPLv3",
-    packages=["qspectrumanalyzer", "qspectrumanalyzer.backends"],
+    packages=["qspectrumanalyzer", "qspectrumanalyzer.backends", "qspectrumanalyzer.benchmarks"],
     package_data={
         "qspectrumanalyzer": [
             "qspectrumanalyzer.svg",
@@ -0,0 +1,237 @@
+import numpy as np
+import pytest
+
+from qspectrumanalyzer.backends import multi
+from qspectrumanalyzer.backends.multi import SweepStitcher, split_span
+from qspectrumanalyzer.grid import FrequencyGrid
+
+
+class Clock:
+    """Fake time module (stitcher measures sweep periods with time.time)"""
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(multi, "time", clock)
+    return clock
+
+
+def segment_sweep(start, stop, bins, value=None, timestamp=0.0, read=None):
+    """Create synthetic sweep of one segment (value of every bin is its frequency unless value is given)"""
+    grid = FrequencyGrid.linspace(start, stop, bins)
+    y = grid.x.copy() if value is None else np.full(bins, value, dtype=np.float64)
+    return {"timestamp": timestamp, "grid": grid, "x": grid.x, "y": y, "trace": {"read": read}}
+
+
+def test_split_span_is_contiguous_and_aligned():
+    segments = split_span(87.0, 108.0, 3, 100)
+    assert segments[0][0] == 87.0
+    assert segments[-1][1] == 108.0
+    for (start, stop), (next_start, next_stop) in zip(segments, segments[1:]):
+        assert stop == next_start
+        assert round((stop - 87.0) / 0.1, 6) == round((stop - 87.0) / 0.1)
+
+
+def test_split_span_single_segment():
+    assert split_span(87.0, 108.0, 1, 100) == [(87.0, 108.0)]
+
+
+def test_sweep_is_emitted_when_all_segments_are_complete():
+    stitcher = SweepStitcher(2)
+    assert stitcher.update(0, segment_sweep(0, 10, 11)) is None
+    assert stitcher.update(0, segment_sweep(0, 10, 11)) is None
+    assert stitcher.update(1, segment_sweep(11, 20, 10)) is not None
+
+    # Every segment has to complete new sweep again before next stitched sweep
+    assert stitcher.update(1, segment_sweep(11, 20, 10)) is None
+    assert stitcher.update(0, segment_sweep(0, 10, 11)) is not None
+    assert stitcher.sweeps_total == [3, 2]
+
+
+def test_overlapping_bins_are_cropped():
+    stitcher = SweepStitcher(2)
+    stitcher.update(0, segment_sweep(0, 10, 11, value=-50))
+    data = stitcher.update(1, segment_sweep(8, 20, 13, value=-60))
+
+    # Bins of second segment up to last frequency of first segment are dropped
+    np.testing.assert_array_equal(data["x"], np.arange(21, dtype=np.float64))
+    np.testing.assert_array_equal(data["y"], [-50] * 11 + [-60] * 10)
+    assert data["grid"].matches(data["x"])
+
+
+def test_fully_overlapped_segment_is_dropped():
+    stitcher = SweepStitcher(3)
+    stitcher.update(0, segment_sweep(0, 10, 11))
+    stitcher.update(1, segment_sweep(2, 8, 7))
+    data = stitcher.update(2, segment_sweep(11, 15, 5))
+    np.testing.assert_array_equal(data["x"], np.arange(16, dtype=np.float64))
+    np.testing.assert_array_equal(data["y"], data["x"])
+
+
+def test_segments_are_ordered_by_index_not_by_arrival(clock):
+    stitcher = SweepStitcher(3)
+    stitcher.update(2, segment_sweep(20, 29, 10, timestamp=3.0, read=30.0))
+    clock.now += 1
+    stitcher.update(0, segment_sweep(0, 9, 10, timestamp=1.0, read=10.0))
+    clock.now += 1
+    data = stitcher.update(1, segment_sweep(10, 19, 10, timestamp=2.0, read=20.0))
+
+    np.testing.assert_array_equal(data["x"], np.arange(30, dtype=np.float64))
+    np.testing.assert_array_equal(data["y"], data["x"])
+
+    # Timestamp is taken from last completed segment, read time from first read segment
+    assert data["timestamp"] == 2.0
+    assert data["segment_timestamps"] == [1001.0, 1002.0, 1000.0]
+    assert data["trace"]["read"] == 10.0
+
+
+def test_layout_is_cached_for_segment_grids():
+    stitcher = SweepStitcher(2)
+    first, second = segment_sweep(0, 10, 11), segment_sweep(8, 20, 13)
+    stitcher.update(0, first)
+    grid = stitcher.update(1, second)["grid"]
+    stitcher.update(0, first)
+    assert stitcher.update(1, second)["grid"] is grid
+    assert len(stitcher.layouts) == 1
+
+
+def test_layout_cache_is_limited():
+    stitcher = SweepStitcher(1)
+    for i in range(stitcher.max_layouts + 1):
+        stitcher.update(0, segment_sweep(i, i + 10, 11))
+    assert len(stitcher.layouts) <= stitcher.max_layouts
+
+
+def test_reset_forgets_received_sweeps():
+    stitcher = SweepStitcher(2)
+    stitcher.update(0, segment_sweep(0, 9, 10))
+    stitcher.reset()
+    assert stitcher.update(1, segment_sweep(10, 19, 10)) is None
+    assert stitcher.sweeps_total == [0, 1]
+
+
+def test_stalled_segment_is_detected(clock):
+    stitcher = SweepStitcher(2)
+    stitcher.min_stall_timeout = 0
+    for i in range(3):
+        stitcher.update(0, segment_sweep(0, 9, 10))
+        stitcher.update(1, segment_sweep(10, 19, 10))
+        clock.now += 1
+    assert stitcher.stalled() == []
+
+    # Segment 1 stops sweeping (sweep period is 1 s, so it is stalled after 10 s)
+    for i in range(9):
+        stitcher.update(0, segment_sweep(0, 9, 10))
+        clock.now += 1
+    assert stitcher.stalled() == []
+    clock.now += 1
+    assert stitcher.stalled() == [1]
+
+
+def test_segment_which_never_started_is_stalled(clock):
+    stitcher = SweepStitcher(2)
+    assert stitcher.stalled() == []
+
+    stitcher.update(0, segment_sweep(0, 9, 10))
+    clock.now += 1
+    stitcher.update(0, segment_sweep(0, 9, 10))
+
+    # Segment 1 is stalled when it doesn't complete any sweep in min_stall_timeout since start
+    clock.now += stitcher.min_stall_timeout - 1
+    assert stitcher.stalled() == []
+    clock.now += 1
+    assert stitcher.stalled() == [1]
+
+
+class FakeThread:
+    """Sub-backend thread which finishes after given number of checks of its state (or never)"""
+    def __init__(self, checks=None):
+        self.checks = checks
+        self.finished = False
+        self.stopped = False
+
+    def start(self):
+        pass
+
+    def stop(self):
+        self.stopped = True
+        self.finished = True
+
+    def check(self):
+        if self.checks is not None:
+            self.checks -= 1
+            if self.checks <= 0:
+                self.finished = True
+        return self.finished
+
+    def wait(self, timeout=None):
+        return self.check()
+
+    def isFinished(self):
+        return self.check()
+
+
+class FakeDataStorage:
+    tracer = None
+
+    def update(self, data):
+        pass
+
+
+def run_power_thread(threads, single_shot=False):
+    power_thread = multi.PowerThread(FakeDataStorage())
+    power_thread.check_interval = 0
+    power_thread.threads = threads
+    power_thread.stitcher = SweepStitcher(len(threads))
+    power_thread.params = {
+        "backend": "rtl_power",
+        "devices": [str(i) for i in range(len(threads))],
+        "segments": [(i, i + 1) for i in range(len(threads))],
+        "single_shot": single_shot,
+    }
+    stopped = []
+    power_thread.powerThreadStopped.connect(lambda: stopped.append(True))
+    power_thread.run()
+    assert stopped == [True]
+    assert not power_thread.alive
+    return power_thread
+
+
+def test_all_devices_are_stopped_when_one_exits(capsys):
+    threads = [FakeThread(), FakeThread(checks=2), FakeThread()]
+    run_power_thread(threads)
+    assert all(thread.stopped for thread in threads)
+    assert "Device 1 stopped sweeping" in capsys.readouterr().out
+
+
+def test_devices_are_not_stopped_when_one_finishes_single_shot():
+    threads = [FakeThread(checks=5), FakeThread(checks=2)]
+    run_power_thread(threads, single_shot=True)
+    assert not any(thread.stopped for thread in threads)
+
+
+def test_all_devices_are_stopped_when_one_stalls(clock, capsys):
+    threads = [FakeThread(), FakeThread()]
+    power_thread = multi.PowerThread(FakeDataStorage())
+    stitcher = SweepStitcher(2)
+    stitcher.update(0, segment_sweep(0, 9, 10))
+    clock.now += 1
+    stitcher.update(0, segment_sweep(0, 9, 10))
+    clock.now += stitcher.min_stall_timeout + 1
+
+    # Stitcher is reset at start of run, so stall is checked by stitcher with already received sweeps
+    stitcher.reset = lambda: None
+    power_thread.check_interval = 0
+    power_thread.threads = threads
+    power_thread.stitcher = stitcher
+    power_thread.params = {"backend": "rtl_power", "devices": ["a", "b"], "segments": [(0, 1), (1, 2)],
+                           "single_shot": False}
+    power_thread.run()
+    assert all(thread.stopped for thread in threads)
+    assert "Device b stopped sweeping (0 sweeps received)" in capsys.readouterr().out